@@ -2,9 +2,43 @@
 Program created to read a file that is assumed to contain words
 """
 # filename: print_numbers.py
+import argparse
+import array
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import functools
+import heapq
+import http.client
+import http.server
+import itertools
 import json
+import mmap
+import multiprocessing
+import operator
 import os
+import queue
+import random
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+import unicodedata
 import unittest
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
 
 
 class IDShouldBeIntException(Exception):
@@ -15,13 +49,24 @@ class IDShouldBeIntException(Exception):
         self.message = message
 
 
+class InvalidRoomsException(Exception):
+    """A custom exception."""
+    def __init__(self, rooms):
+        message = f"Rooms {rooms}, rooms should be a positive integer"
+        super().__init__(message)
+        self.message = message
+
+
 class Hotel():
     '''
     Class to store product information
     '''
+    __slots__ = ('_hotel_id', '_hotel_name', '_rooms')
+
     def __init__(self):
         self._hotel_id = None
         self._hotel_name = None
+        self._rooms = 1
 
     @property
     def hotel_id(self):
@@ -49,15 +94,48 @@ class Hotel():
     def hotel_name(self, value):
         self._hotel_name = value
 
+    @property
+    def rooms(self):
+        '''
+        Method to return the number of rooms of the hotel
+        '''
+        return self._rooms
+
+    @rooms.setter
+    def rooms(self, value):
+        try:
+            int_value = int(value)
+        except (TypeError, ValueError) as exc:
+            raise InvalidRoomsException(value) from exc
+        if int_value < 1:
+            raise InvalidRoomsException(value)
+        self._rooms = int_value
+
     @staticmethod
     def from_json(json_object):
         '''
-        Static factory method to map json to object
+        Static factory method to map json to object, hotels written
+        before rooms existed have a single room
         '''
         hotel = Hotel()
 
         hotel.hotel_id = json_object['hotel_id']
         hotel.hotel_name = json_object['hotel_name']
+        hotel.rooms = json_object.get('rooms', 1)
+
+        return hotel
+
+    @staticmethod
+    def from_trusted_json(json_object):
+        '''
+        Static factory method to map json read back from the database
+        to object, the fields were validated when written
+        '''
+        hotel = Hotel.__new__(Hotel)
+
+        hotel._hotel_id = json_object['hotel_id']
+        hotel._hotel_name = json_object['hotel_name']
+        hotel._rooms = json_object.get('rooms', 1)
 
         return hotel
 
@@ -69,7 +147,10 @@ class HotelEncoder(json.JSONEncoder):
 
     def default(self, o):
         if isinstance(o, Hotel):
-            return {"hotel_id": o.hotel_id, "hotel_name": o.hotel_name}
+            return {
+                "hotel_id": o.hotel_id, "hotel_name": o.hotel_name,
+                "rooms": o.rooms
+            }
         return json.JSONEncoder.default(self, o)
 
 
@@ -77,6 +158,8 @@ class Customer():
     '''
     Class to store product information
     '''
+    __slots__ = ('_customer_id', '_customer_name')
+
     def __init__(self):
         self._customer_id = None
         self._customer_name = None
@@ -119,6 +202,19 @@ class Customer():
 
         return customer
 
+    @staticmethod
+    def from_trusted_json(json_object):
+        '''
+        Static factory method to map json read back from the database
+        to object, the fields were validated when written
+        '''
+        customer = Customer.__new__(Customer)
+
+        customer._customer_id = json_object['customer_id']
+        customer._customer_name = json_object['customer_name']
+
+        return customer
+
 
 class CustomerEncoder(json.JSONEncoder):
     '''
@@ -138,6 +234,8 @@ class Reservation():
     '''
     Class to store product information
     '''
+    __slots__ = ('_hotel_id', '_customer_id', '_from_date', '_to_date')
+
     def __init__(self):
         self._hotel_id = None
         self._customer_id = None
@@ -210,6 +308,75 @@ class Reservation():
 
         return reservation
 
+    @staticmethod
+    def from_trusted_json(json_object):
+        '''
+        Static factory method to map json read back from the database
+        to object, the fields were validated when written
+        '''
+        reservation = Reservation.__new__(Reservation)
+
+        reservation._hotel_id = json_object['hotel_id']
+        reservation._customer_id = json_object['customer_id']
+        reservation._from_date = json_object['from_date']
+        reservation._to_date = json_object['to_date']
+
+        return reservation
+
+
+def key_date(value):
+    """
+    Return the date of an ISO date string, values which are not
+    valid dates are returned unchanged
+    """
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class ReservationKey(collections.namedtuple(
+    "ReservationKey", ("hotel_id", "customer_id", "from_date", "to_date")
+)):
+    '''
+    Typed composite key of a reservation
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, hotel_id, customer_id, from_date, to_date):
+        '''
+        Static factory method to build the key from raw values
+        '''
+        try:
+            return cls(
+                int(hotel_id), int(customer_id),
+                key_date(from_date), key_date(to_date)
+            )
+        except (TypeError, ValueError) as exc:
+            raise IDShouldBeIntException() from exc
+
+    def days(self):
+        '''
+        Method to return the half-open day ordinal interval
+        or None if the dates are not a valid interval
+        '''
+        if not (
+            isinstance(self.from_date, datetime.date)
+            and isinstance(self.to_date, datetime.date)
+            and self.from_date < self.to_date
+        ):
+            return None
+        return self.from_date.toordinal(), self.to_date.toordinal()
+
+    def __str__(self):
+        return (
+            f"{self.hotel_id}_{self.customer_id}_"
+            f"{self.from_date}_{self.to_date}"
+        )
+
 
 class ReservationEncoder(json.JSONEncoder):
     '''
@@ -242,807 +409,7385 @@ class HotelNotFoundException(Exception):
         self.message = message
 
 
-class HotelArray(list):
-    """
-    Custom class which extends list and
-    does required computation of it's elements
-    """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._hotels_json_file_name = "hotels.json"
-
-    @property
-    def hotels_json_file_name(self):
-        """
-        Method to get the hotels json file name
-        """
-        return self._hotels_json_file_name
-
-    @hotels_json_file_name.setter
-    def hotels_json_file_name(self, value):
-        self._hotels_json_file_name = value
-
-    def create_hotel(self, hotel_name):
-        """
-        Create another hotel in the json file
-        """
-        self.clear()
-        last_id = 0
-
-        try:
-            if not os.path.exists(self.hotels_json_file_name):
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self), file=file)
-            else:
-                with open(
-                    self.hotels_json_file_name, 'r', encoding="utf-8"
-                ) as file:
-                    hotels_list_json = json.load(file)
-                    if len(hotels_list_json) > 0:
-                        hotel_list = list(map(
-                            Hotel.from_json,
-                            hotels_list_json
-                        ))
-                        sorted_hotel_list = sorted(
-                            hotel_list,
-                            key=lambda x: x.hotel_id
-                        )
-                        self.extend(sorted_hotel_list)
-                        last_id = self[len(self) - 1].hotel_id
-
-            hotel = Hotel()
-            hotel.hotel_id = last_id + 1
-            hotel.hotel_name = hotel_name
-            self.append(hotel)
-
-            with open(
-                self.hotels_json_file_name, "w", encoding="utf-8"
-            ) as file:
-                print(json.dumps(self, cls=HotelEncoder), file=file)
-
-            return hotel
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+STORAGE_MODE_JSON = "json"
+STORAGE_MODE_WAL = "wal"
+STORAGE_MODE_SQLITE = "sqlite"
+STORAGE_MODE_SNAPSHOT = "snapshot"
+STORAGE_MODES = (
+    STORAGE_MODE_JSON, STORAGE_MODE_WAL, STORAGE_MODE_SQLITE,
+    STORAGE_MODE_SNAPSHOT
+)
 
-    def delete_hotel(self, hotel_id):
-        """
-        Delete hotel in the json file by given id
-        Throws custom exception if no hotel found by given id
-        """
-        try:
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise HotelNotFoundException(hotel_id)
-
-                self.clear()
-                hotel_list = list(map(Hotel.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict((hotel.hotel_id, hotel) for hotel in self)
-                if hotel_id not in hotel_dict:
-                    raise HotelNotFoundException(hotel_id)
-
-                self.clear()
-                del hotel_dict[hotel_id]
-                self.extend(list(hotel_dict.values()))
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self), file=file)
-        except FileNotFoundError as exc:
-            raise HotelNotFoundException(hotel_id) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+LOG_OP_PUT = "put"
+LOG_OP_DELETE = "delete"
 
-    def display_hotel_information(self, hotel_id):
-        """
-        Return hotel information for a given id
-        Throws custom exception if no hotel found by given id
-        """
-        try:
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise HotelNotFoundException(hotel_id)
 
-                self.clear()
-                hotel_list = list(map(Hotel.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict((hotel.hotel_id, hotel) for hotel in self)
-                if hotel_id not in hotel_dict:
-                    raise HotelNotFoundException(hotel_id)
+class InvalidStorageModeException(Exception):
+    """A custom exception."""
+    def __init__(self, storage_mode):
+        message = (
+            f"Storage mode {storage_mode} is not valid, "
+            f"please use {', '.join(STORAGE_MODES)}"
+        )
+        super().__init__(message)
+        self.message = message
 
-                return hotel_dict.get(hotel_id)
-        except FileNotFoundError as exc:
-            raise HotelNotFoundException(hotel_id) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
 
-    def modify_hotel_information(self, hotel_id, hotel_name):
-        """
-        modify hotel information for a given id
-        Throws custom exception if no hotel found by given id
-        """
-        try:
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise HotelNotFoundException(hotel_id)
-
-                self.clear()
-                hotel_list = list(map(Hotel.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict((hotel.hotel_id, hotel) for hotel in self)
-                if hotel_id not in hotel_dict:
-                    raise HotelNotFoundException(hotel_id)
-
-                self.clear()
-                hotel_obj = Hotel()
-                hotel_obj.hotel_id = hotel_id
-                hotel_obj.hotel_name = hotel_name
-                hotel_dict[hotel_id] = hotel_obj
-                self.extend(list(hotel_dict.values()))
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self, cls=HotelEncoder), file=file)
-
-                return hotel_obj
-        except FileNotFoundError as exc:
-            raise HotelNotFoundException(hotel_id) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+DURABILITY_NONE = "none"
+DURABILITY_FSYNC = "fsync"
+DURABILITY_FSYNC_DIRECTORY = "fsync_dir"
+DURABILITY_LEVELS = (
+    DURABILITY_NONE, DURABILITY_FSYNC, DURABILITY_FSYNC_DIRECTORY
+)
 
 
-class CustomerNotFoundException(Exception):
+class InvalidDurabilityException(Exception):
     """A custom exception."""
-    def __init__(self, identificator):
-        message = f"Customer not found for ID {identificator}"
+    def __init__(self, durability):
+        message = (
+            f"Durability {durability} is not valid, "
+            f"please use one of {', '.join(DURABILITY_LEVELS)}"
+        )
         super().__init__(message)
         self.message = message
 
 
-class CustomerArray(list):
+def fsync_directory(file_name):
     """
-    Custom class which extends list and
-    does required computation of it's elements
+    Flush the directory entry of a created or renamed file to disk
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._hotels_json_file_name = "customers.json"
+    directory = os.path.dirname(os.path.abspath(file_name))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # directories cannot be opened on every platform
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_temporary_file(file_name, data, durability=DURABILITY_NONE):
+    """
+    Write data to a new file next to file_name and return its name,
+    it is flushed to disk unless durability is none
+    """
+    temporary_file_name = (
+        f"{file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(temporary_file_name, "wb") as file:
+            file.write(data)
+            if durability != DURABILITY_NONE:
+                file.flush()
+                os.fsync(file.fileno())
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporary_file_name)
+        raise
+    return temporary_file_name
+
+
+def replace_file(temporary_file_name, file_name,
+                 durability=DURABILITY_NONE):
+    """
+    Rename a temporary file over file_name in one atomic step, readers
+    and crashes see either the old or the new content
+    """
+    os.replace(temporary_file_name, file_name)
+    if durability == DURABILITY_FSYNC_DIRECTORY:
+        fsync_directory(file_name)
 
-    @property
-    def hotels_json_file_name(self):
-        """
-        Method to get the hotels json file name
-        """
-        return self._hotels_json_file_name
 
-    @hotels_json_file_name.setter
-    def hotels_json_file_name(self, value):
-        self._hotels_json_file_name = value
+def write_file_atomically(file_name, data, durability=DURABILITY_NONE):
+    """
+    Replace the content of file_name with data without ever leaving
+    a truncated file behind
+    """
+    replace_file(
+        write_temporary_file(file_name, data, durability), file_name,
+        durability
+    )
 
-    def create_customer(self, hotel_name):
-        """
-        Create another hotel in the json file
-        """
-        self.clear()
-        last_id = 0
 
-        try:
-            if not os.path.exists(self.hotels_json_file_name):
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self), file=file)
-            else:
-                with open(
-                    self.hotels_json_file_name, 'r', encoding="utf-8"
-                ) as file:
-                    hotels_list_json = json.load(file)
-                    if len(hotels_list_json) > 0:
-                        hotel_list = list(map(
-                            Customer.from_json, hotels_list_json
-                        ))
-                        sorted_hotel_list = sorted(
-                            hotel_list,
-                            key=lambda x: x.customer_id
-                        )
-                        self.extend(sorted_hotel_list)
-                        last_id = self[len(self) - 1].customer_id
+def file_stamp(file_name):
+    """
+    Return the stat signature of a file or None if it does not exist
+    """
+    try:
+        stat = os.stat(file_name)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
-            hotel = Customer()
-            hotel.customer_id = last_id + 1
-            hotel.customer_name = hotel_name
-            self.append(hotel)
 
-            with open(
-                self.hotels_json_file_name, "w", encoding="utf-8"
-            ) as file:
-                print(json.dumps(self, cls=CustomerEncoder), file=file)
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+JSON_DELIMITER = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
 
-            return hotel
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
 
-    def delete_customer(self, hotel_id):
-        """
-        Delete hotel in the json file by given id
-        Throws custom exception if no hotel found by given id
-        """
+def iter_json_array(file, chunk_size=65536):
+    """
+    Yield the elements of the json array in a text file one at a time,
+    reading chunk_size characters at a time so the memory used stays
+    bounded by the largest element, stop iterating to stop reading
+    Throws json.JSONDecodeError if the file is not a json array
+    """
+    # the scanner behind raw_decode, without its wrapper per element
+    scan = json.JSONDecoder().scan_once
+    match_delimiter = JSON_DELIMITER.match
+    buffer = ""
+    position = 0
+
+    def read_more():
+        nonlocal buffer, position
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def next_character():
+        # the first character which is not whitespace, "" at the end
+        nonlocal position
+        while True:
+            position = JSON_WHITESPACE.match(buffer, position).end()
+            if position < len(buffer) or not read_more():
+                return buffer[position:position + 1]
+
+    def check_end(end):
+        nonlocal position
+        position = end
+        if next_character():
+            raise json.JSONDecodeError("Extra data", buffer, position)
+
+    if next_character() != "[":
+        raise json.JSONDecodeError("Expecting '['", buffer, position)
+    position += 1
+    if next_character() == "]":
+        check_end(position + 1)
+        return
+    while True:
         try:
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise CustomerNotFoundException(hotel_id)
-
-                self.clear()
-                hotel_list = list(map(Customer.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict((hotel.customer_id, hotel) for hotel in self)
-                if hotel_id not in hotel_dict:
-                    raise CustomerNotFoundException(hotel_id)
-
-                self.clear()
-                del hotel_dict[hotel_id]
-                self.extend(list(hotel_dict.values()))
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self), file=file)
-        except FileNotFoundError as exc:
-            raise CustomerNotFoundException(hotel_id) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+            element, end = scan(buffer, position)
+            # only a delimiter proves a number was not cut by the chunk
+            delimiter = match_delimiter(buffer, end)
+        except (StopIteration, json.JSONDecodeError) as e:
+            if read_more():
+                position = JSON_WHITESPACE.match(buffer, position).end()
+                continue
+            if isinstance(e, StopIteration):
+                raise json.JSONDecodeError(
+                    "Expecting value", buffer, position
+                ) from None
+            raise
+        if delimiter is None:
+            if read_more():
+                continue
+            raise json.JSONDecodeError(
+                "Expecting ',' delimiter", buffer, end
+            )
+        yield element
+        if delimiter.group(1) == "]":
+            check_end(delimiter.end())
+            return
+        position = delimiter.end()
 
-    def display_customer_information(self, hotel_id):
-        """
-        Return hotel information for a given id
-        Throws custom exception if no hotel found by given id
-        """
+
+def iter_json_records(json_file_name, record_class, chunk_size=65536):
+    """
+    Yield the records of a json file one at a time, the file is closed
+    when the iteration ends or is stopped
+    """
+    with open(json_file_name, 'r', encoding="utf-8") as file:
         try:
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise CustomerNotFoundException(hotel_id)
+            yield from map(
+                record_class.from_trusted_json,
+                iter_json_array(file, chunk_size)
+            )
+        except json.JSONDecodeError as e:
+            raise CorruptedJsonDBException(json_file_name) from e
 
-                self.clear()
-                hotel_list = list(map(Customer.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict((hotel.customer_id, hotel) for hotel in self)
-                if hotel_id not in hotel_dict:
-                    raise CustomerNotFoundException(hotel_id)
 
-                return hotel_dict.get(hotel_id)
-        except FileNotFoundError as exc:
-            raise CustomerNotFoundException(hotel_id) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+def find_json_record(json_file_name, array_class, key):
+    """
+    Return the record of the array class with the key from a json
+    file, reading it only until the record is found, or None
+    """
+    records = iter_json_records(json_file_name, array_class.record_class)
+    with contextlib.closing(records):
+        for record in records:
+            if array_class.record_key(record) == key:
+                return record
+    return None
 
-    def modify_customer_information(self, hotel_id, hotel_name):
-        """
-        modify hotel information for a given id
-        Throws custom exception if no hotel found by given id
-        """
-        try:
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise CustomerNotFoundException(hotel_id)
-
-                self.clear()
-                hotel_list = list(map(Customer.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict((hotel.customer_id, hotel) for hotel in self)
-                if hotel_id not in hotel_dict:
-                    raise CustomerNotFoundException(hotel_id)
-
-                self.clear()
-                hotel_obj = Customer()
-                hotel_obj.customer_id = hotel_id
-                hotel_obj.customer_name = hotel_name
-                hotel_dict[hotel_id] = hotel_obj
-                self.extend(list(hotel_dict.values()))
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self, cls=CustomerEncoder), file=file)
-
-                return hotel_obj
-        except FileNotFoundError as exc:
-            raise CustomerNotFoundException(hotel_id) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
 
+class BulkRowError():
+    '''
+    Class to store why one row of a bulk create was rejected
+    '''
+    def __init__(self, row_number, row, exception):
+        self.row_number = row_number
+        self.row = row
+        self.exception = exception
 
-class InvalidHotelArrayParamException(Exception):
-    """A custom exception."""
-    def __init__(self):
-        message = "Please provide a valid hotel array in the params"
-        super().__init__(message)
-        self.message = message
+    def __repr__(self):
+        return f"BulkRowError({self.row_number}, {self.exception!r})"
 
 
-class InvalidCustomerArrayParamException(Exception):
-    """A custom exception."""
+class BulkCreateResult():
+    '''
+    Class to store the records created by a bulk create
+    and the errors of the rows that were rejected
+    '''
     def __init__(self):
-        message = "Please provide a valid customer array in the params"
-        super().__init__(message)
-        self.message = message
+        self.created = []
+        self.errors = []
 
 
-class InvalidHotelForReservException(Exception):
-    """A custom exception."""
-    def __init__(self, hotel_id):
-        message = (
-            f"Hotel id {hotel_id}, "
-            f"please provide a valid hotel id for the reservation"
-        )
-        super().__init__(message)
-        self.message = message
+def iter_bulk_rows(source):
+    """
+    Yield (row_number, row) for a JSONL file name or an iterable of
+    mappings or JSON lines, blank lines are skipped and lines that are
+    not valid JSON are yielded as the decoding error
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding="utf-8") as file:
+            yield from iter_bulk_rows(file)
+        return
+
+    for row_number, row in enumerate(source, start=1):
+        if isinstance(row, (str, bytes)):
+            if not row.strip():
+                continue
+            try:
+                row = json.loads(row)
+            except ValueError as exc:
+                row = exc
+        yield row_number, row
 
 
-class InvalidCustomerForReservException(Exception):
+class VersionConflictException(Exception):
     """A custom exception."""
-    def __init__(self, hotel_id):
+    def __init__(self, json_file_name, expected_version, version):
         message = (
-            f"Customer id {hotel_id}, "
-            f"please provide a valid customer id for the reservation"
+            f"DB file {json_file_name} is at version {version}, "
+            f"expected version {expected_version}, please load it again"
         )
         super().__init__(message)
         self.message = message
 
 
-class ReservationNotFoundException(Exception):
-    """A custom exception."""
-    def __init__(self, identificator):
-        message = f"Reservation not found for ID {identificator}"
-        super().__init__(message)
-        self.message = message
+class FileLock():
+    '''
+    Class to hold reader/writer locks shared by processes on a lock
+    file, which also stores the version counter of a database file
 
+    Readers take the shared lock and writers the exclusive one, both
+    are flock locks so they are released if the process dies. Nested
+    sections reuse the outer lock, an exclusive lock covers readers
+    '''
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self._fd = None
+        self._pid = None
+        self._exclusive = False
+        self._depth = 0
+
+    def _open(self):
+        if self._fd is None or self._pid != os.getpid():
+            # descriptors inherited through fork share the parent lock
+            self._fd = os.open(self.file_name, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive):
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError(
+                    f"cannot upgrade the shared lock on {self.file_name}"
+                )
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+
+        fd = self._open()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._exclusive = exclusive
+        self._depth = 1
+        try:
+            yield
+        finally:
+            self._depth = 0
+            self._exclusive = False
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def shared(self):
+        '''
+        Method to return a context manager holding the shared lock
+        '''
+        return self._locked(False)
 
-class ReservationArray(list):
-    """
-    Custom class which extends list and
-    does required computation of it's elements
-    """
-    def __init__(self, hotel_array, customer_array, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if not isinstance(hotel_array, HotelArray):
-            raise InvalidHotelArrayParamException()
-        if not isinstance(customer_array, CustomerArray):
-            raise InvalidCustomerArrayParamException()
+    def exclusive(self):
+        '''
+        Method to return a context manager holding the exclusive lock
+        '''
+        return self._locked(True)
 
-        self.hotel_array = hotel_array
-        self.customer_array = customer_array
-        self._hotels_json_file_name = "reservations.json"
+    def read_version(self):
+        '''
+        Method to return the version counter, 0 for a new lock file
+        '''
+        fd = self._open()
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            return int(os.read(fd, 32) or 0)
+        except ValueError:
+            return 0
 
-    @property
-    def hotels_json_file_name(self):
-        """
-        Method to get the hotels json file name
-        """
-        return self._hotels_json_file_name
+    def write_version(self, version):
+        '''
+        Method to store the version counter, call it holding
+        the exclusive lock
+        '''
+        fd = self._open()
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, str(version).encode("ascii"))
 
-    @hotels_json_file_name.setter
-    def hotels_json_file_name(self, value):
-        self._hotels_json_file_name = value
 
-    def create_reservation(self, hotel_id, customer_id, from_date, to_date):
-        """
-        Create another hotel in the json file
-        """
-        self.clear()
+class IdSequence(FileLock):
+    '''
+    Class to hand out increasing ids from a counter persisted in a
+    file, so ids are never handed out twice, across processes and
+    restarts, they are only skipped
+
+    Processes reserve blocks of block_size ids under the exclusive
+    lock of the file and hand them out from memory (hi/lo), the
+    counter is written in place with a fixed width so it is never
+    seen truncated
+    '''
+    width = 20
+
+    def __init__(self, file_name, block_size=1):
+        super().__init__(file_name)
+        self.block_size = block_size
+        self._next_id = 1
+        self._last_id = 0
+        self._block_pid = None
+
+    def read_high(self):
+        '''
+        Method to return the highest id reserved by any process
+        '''
+        data = os.pread(self._open(), self.width, 0)
+        try:
+            return int(data or 0)
+        except ValueError as e:
+            raise CorruptedJsonDBException(self.file_name) from e
+
+    def next_id(self, floor=0, durability=DURABILITY_NONE, reserve=1):
+        '''
+        Method to return an id never handed out before, a new block of
+        at least reserve ids above floor is reserved when needed
+        '''
+        if self._block_pid != os.getpid() or self._next_id > self._last_id:
+            # a forked child must not hand out the ids of its parent
+            with self.exclusive():
+                high = max(self.read_high(), floor)
+                last_id = high + max(self.block_size, reserve)
+                fd = self._open()
+                os.pwrite(
+                    fd, f"{last_id:0{self.width}d}".encode("ascii"), 0
+                )
+                if durability != DURABILITY_NONE:
+                    os.fsync(fd)
+            self._next_id = high + 1
+            self._last_id = last_id
+            self._block_pid = os.getpid()
+        next_id = self._next_id
+        self._next_id += 1
+        return next_id
+
+
+def snapshot_order(key):
+    """
+    Return a sort key ordering record keys in binary snapshots, parts
+    of different types, such as unparsed dates, compare by type name
+    """
+    parts = key if isinstance(key, tuple) else (key,)
+    return tuple((type(part).__name__, part) for part in parts)
+
 
+class BinarySnapshot():
+    '''
+    Class to read a binary snapshot of records through mmap, only the
+    records looked up or iterated are decoded
+
+    The file holds a header, the fixed-width records sorted by key, an
+    offset table with the start of every string and the utf-8 strings,
+    string fields hold the index of their string in the offset table
+    '''
+    magic = b"HRSNAP01"
+    header = struct.Struct("<8s16sQQ")
+    offset = struct.Struct("<Q")
+
+    def __init__(self, file_name, record_class, fields):
+        self.file_name = file_name
+        self.record_class = record_class
+        self._set_fields(fields)
+        self._mmap = None
+        self._records = 0
+        with open(file_name, "rb") as file:
+            if os.fstat(file.fileno()).st_size:
+                self._mmap = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        if self._mmap is None:
+            return
         try:
-            if not os.path.exists(self.hotels_json_file_name):
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self), file=file)
+            magic, record_format, self._records, strings = (
+                self.header.unpack_from(self._mmap, 0)
+            )
+            stored_format = record_format.rstrip(b"\0").decode("ascii")
+            if (
+                stored_format != self._record_struct.format
+                and self._record_struct.format.startswith(stored_format)
+            ):
+                # written before the last fields were declared, the
+                # records get their defaults for them
+                self._set_fields(fields[:len(stored_format) - 1])
+            self._offsets_start = (
+                self.header.size + self._records * self._record_struct.size
+            )
+            self._strings_start = (
+                self._offsets_start + (strings + 1) * self.offset.size
+            )
+            strings_size = self.offset.unpack_from(
+                self._mmap, self._strings_start - self.offset.size
+            )[0]
+        except (struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise CorruptedJsonDBException(file_name) from e
+        if (
+            magic != self.magic
+            or record_format.rstrip(b"\0")
+            != self._record_struct.format.encode("ascii")
+            or len(self._mmap) != self._strings_start + strings_size
+        ):
+            self.close()
+            raise CorruptedJsonDBException(file_name)
+
+    def _set_fields(self, fields):
+        '''
+        Method to decode the records with the given fields
+        '''
+        self._names = [name for name, _ in fields]
+        self._string_fields = [
+            position for position, (_, kind) in enumerate(fields)
+            if kind == "s"
+        ]
+        self._record_struct = self.record_struct(fields)
+
+    @staticmethod
+    def record_struct(fields):
+        """
+        Return the struct of the records with the given fields, string
+        fields are stored as indexes in the offset table
+        """
+        return struct.Struct("<" + "".join(
+            "I" if kind == "s" else kind for _, kind in fields
+        ))
+
+    @classmethod
+    def data(cls, records, fields, record_key, encoder):
+        """
+        Return the binary snapshot content of the records
+        """
+        record_struct = cls.record_struct(fields)
+        string_positions = {}
+        strings = []
+        packed = []
+        for record in sorted(
+                records, key=lambda record: snapshot_order(record_key(record))
+        ):
+            values = encoder.default(record)
+            row = []
+            for name, kind in fields:
+                value = values[name]
+                if kind == "s":
+                    position = string_positions.get(value)
+                    if position is None:
+                        position = len(strings)
+                        string_positions[value] = position
+                        strings.append(str(value).encode("utf-8"))
+                    value = position
+                row.append(value)
+            packed.append(record_struct.pack(*row))
+
+        offsets = [0]
+        for string in strings:
+            offsets.append(offsets[-1] + len(string))
+        return b"".join(itertools.chain(
+            (cls.header.pack(
+                cls.magic, record_struct.format.encode("ascii"),
+                len(packed), len(strings)
+            ),),
+            packed,
+            (struct.pack(f"<{len(offsets)}Q", *offsets),),
+            strings,
+        ))
+
+    def __len__(self):
+        return self._records
+
+    def _string(self, position):
+        start, end = struct.unpack_from(
+            "<QQ", self._mmap, self._offsets_start + position * 8
+        )
+        return self._mmap[
+            self._strings_start + start:self._strings_start + end
+        ].decode("utf-8")
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._records:
+            raise IndexError(position)
+        values = list(self._record_struct.unpack_from(
+            self._mmap,
+            self.header.size + position * self._record_struct.size
+        ))
+        for field in self._string_fields:
+            values[field] = self._string(values[field])
+        return self.record_class.from_trusted_json(
+            dict(zip(self._names, values))
+        )
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self._records))
+
+    def find(self, key, record_key):
+        """
+        Return the record with the key or None, by a binary search
+        decoding about log2(len) records
+        """
+        order = snapshot_order(key)
+        low, high = 0, self._records
+        while low < high:
+            middle = (low + high) // 2
+            record = self[middle]
+            middle_order = snapshot_order(record_key(record))
+            if middle_order == order:
+                return record
+            if middle_order < order:
+                low = middle + 1
             else:
-                with open(
-                    self.hotels_json_file_name, 'r', encoding="utf-8"
-                ) as file:
-                    hotels_list_json = json.load(file)
-                    if len(hotels_list_json) > 0:
-                        hotel_list = list(map(
-                            Reservation.from_json,
-                            hotels_list_json
-                        ))
-                        sorted_hotel_list = sorted(
-                            hotel_list,
-                            key=lambda x: x.hotel_id
+                high = middle
+        return None
+
+    def close(self):
+        """
+        Unmap the file, the records already read stay valid
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class StorageBackend():
+    '''
+    Class to persist the records of a JsonRecordArray, the array keeps
+    them in its resident index while the backend loads the changes
+    written by other processes and stores the ones of the array
+    '''
+    storage_mode = None
+
+    def __init__(self, record_array):
+        self.array = record_array
+
+    def stamp(self):
+        '''
+        Method to return a signature which changes whenever another
+        process writes the stored records
+        '''
+        raise NotImplementedError
+
+    def load(self, previous_stamp, stamp):
+        '''
+        Method to return the stored changes since previous_stamp as
+        records, a list replacing the index or None to keep it, and
+        changes, (operation, record) pairs to apply to it, call it
+        holding the file lock
+        '''
+        raise NotImplementedError
+
+    def commit(self, puts, deletes):
+        '''
+        Method to store the records put in or deleted from the index,
+        call it holding the write lock
+        '''
+        raise NotImplementedError
+
+    def lookup(self, key):
+        '''
+        Method to return (True, record or None) for the key read from
+        the stored records without loading the index, or (False, None)
+        when the backend cannot answer before the index is loaded
+        '''
+        return False, None
+
+    def compact(self):
+        '''
+        Method to shrink the stored changes, nothing to do by default
+        '''
+
+    def close(self):
+        '''
+        Method called before the array switches to another backend
+        '''
+
+
+class JsonStorageBackend(StorageBackend):
+    '''
+    Class to store the records as a json snapshot which every write
+    replaces as a whole
+    '''
+    storage_mode = STORAGE_MODE_JSON
+
+    def snapshot_file_name(self):
+        '''
+        Method to return the name of the snapshot file
+        '''
+        return self.array.hotels_json_file_name
+
+    def stamp(self):
+        return (file_stamp(self.snapshot_file_name()),)
+
+    def read_snapshot(self):
+        '''
+        Method to return the records stored in the json snapshot
+        '''
+        try:
+            return list(iter_json_records(
+                self.snapshot_file_name(), self.array.record_class
+            ))
+        except FileNotFoundError:
+            return []
+
+    def load(self, previous_stamp, stamp):
+        return self.read_snapshot(), ()
+
+    def snapshot_data(self, records):
+        '''
+        Method to return the json snapshot content of the given records
+        '''
+        return (
+            json.dumps(records, cls=self.array.encoder_class) + "\n"
+        ).encode("utf-8")
+
+    def write_snapshot(self, records):
+        '''
+        Method to replace the json snapshot with the given records
+        '''
+        write_file_atomically(
+            self.snapshot_file_name(), self.snapshot_data(records),
+            self.array.durability
+        )
+
+    def commit(self, puts, deletes):
+        self.write_snapshot(self.array)
+
+
+class WalStorageBackend(JsonStorageBackend):
+    '''
+    Class to append every change as one line to a log next to the json
+    snapshot, compact folds the log back into the snapshot
+    '''
+    storage_mode = STORAGE_MODE_WAL
+
+    def __init__(self, record_array):
+        super().__init__(record_array)
+        self._log_offset = 0
+        self._log_records = 0
+
+    def rotated_log_file_name(self):
+        '''
+        Method to return the name the log is moved to while being
+        compacted
+        '''
+        return f"{self.array.log_file_name}.1"
+
+    def stamp(self):
+        return (
+            file_stamp(self.snapshot_file_name()),
+            file_stamp(self.rotated_log_file_name()),
+            file_stamp(self.array.log_file_name)
+        )
+
+    def _log_was_appended(self, previous_stamp, stamp):
+        '''
+        Method to tell if only the log changed since the last load,
+        by appends
+        '''
+        if previous_stamp is None or len(previous_stamp) != 3:
+            return False
+        if stamp[:2] != previous_stamp[:2] or stamp[2] is None:
+            return False
+        if previous_stamp[2] is not None and (
+            previous_stamp[2][0] != stamp[2][0]
+        ):
+            return False
+        return stamp[2][2] >= self._log_offset
+
+    def load(self, previous_stamp, stamp):
+        if self._log_was_appended(previous_stamp, stamp):
+            return None, self._replay_log(
+                self.array.log_file_name, self._log_offset, True
+            )
+        self._log_offset = 0
+        self._log_records = 0
+        return self.read_snapshot(), itertools.chain(
+            self._replay_log(self.rotated_log_file_name(), 0, False),
+            self._replay_log(self.array.log_file_name, 0, True)
+        )
+
+    def _replay_log(self, log_file_name, offset, tracked):
+        '''
+        Method to yield the (operation, record) log entries found after
+        offset, the offset of a tracked log follows the entries yielded
+        '''
+        record_class = self.array.record_class
+        try:
+            with open(log_file_name, 'rb') as file:
+                file.seek(offset)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        # torn tail of an append that did not finish
+                        break
+                    try:
+                        entry = json.loads(line)
+                        change = (
+                            entry["op"],
+                            record_class.from_trusted_json(entry["record"])
                         )
-                        self.extend(sorted_hotel_list)
-            try:
-                self.hotel_array.display_hotel_information(hotel_id)
-            except HotelNotFoundException as ex:
-                raise InvalidHotelForReservException(hotel_id) from ex
+                    except (ValueError, KeyError, TypeError) as e:
+                        raise CorruptedJsonDBException(log_file_name) from e
+                    yield change
+                    offset += len(line)
+                    if tracked:
+                        self._log_offset = offset
+                        self._log_records += 1
+        except FileNotFoundError:
+            pass
+
+    def commit(self, puts, deletes):
+        self._append_log(
+            [(LOG_OP_PUT, record) for record in puts] +
+            [(LOG_OP_DELETE, record) for record in deletes]
+        )
+
+    def _append_log(self, entries):
+        '''
+        Method to append one log line per (operation, record) entry
+        '''
+        durability = self.array.durability
+        log_file_name = self.array.log_file_name
+        data = "".join(
+            json.dumps(
+                {"op": operation, "record": record},
+                cls=self.array.encoder_class
+            ) + "\n"
+            for operation, record in entries
+        ).encode("utf-8")
+        with open(log_file_name, "ab") as file:
+            created = file.tell() == 0
+            if file.tell() > self._log_offset:
+                # drop the torn tail of an append that did not finish
+                file.truncate(self._log_offset)
+            file.write(data)
+            self._log_offset = file.tell()
+            if durability != DURABILITY_NONE:
+                file.flush()
+                os.fsync(file.fileno())
+        if created and durability == DURABILITY_FSYNC_DIRECTORY:
+            fsync_directory(log_file_name)
+        self._log_records += len(entries)
+
+        if self._log_records >= self.array.compaction_threshold:
+            self.array.start_compaction()
+
+    def compact(self):
+        '''
+        Method to fold the write-ahead log back into the json snapshot
+
+        The log is rotated aside while the snapshot is written so that
+        writers can keep appending, replaying a log over a snapshot
+        that already contains it gives the same records
+        '''
+        record_array = self.array
+        rotated_log_file_name = self.rotated_log_file_name()
+        with record_array.write_lock():
+            if os.path.exists(record_array.log_file_name) and not (
+                os.path.exists(rotated_log_file_name)
+            ):
+                replace_file(
+                    record_array.log_file_name, rotated_log_file_name,
+                    record_array.durability
+                )
+                self._log_offset = 0
+                self._log_records = 0
+                record_array.index_written()
+            if not os.path.exists(rotated_log_file_name):
+                return
+            records = list(record_array)
+
+        temporary_file_name = write_temporary_file(
+            self.snapshot_file_name(), self.snapshot_data(records),
+            record_array.durability
+        )
+
+        with record_array.write_lock():
+            replace_file(
+                temporary_file_name, self.snapshot_file_name(),
+                record_array.durability
+            )
             try:
-                self.customer_array.display_customer_information(customer_id)
-            except HotelNotFoundException as ex:
-                raise InvalidCustomerForReservException(hotel_id) from ex
-
-            hotel = Reservation()
-            hotel.hotel_id = hotel_id
-            hotel.customer_id = customer_id
-            hotel.from_date = from_date
-            hotel.to_date = to_date
-            self.append(hotel)
-
-            with open(
-                self.hotels_json_file_name, "w", encoding="utf-8"
-            ) as file:
-                print(json.dumps(self, cls=ReservationEncoder), file=file)
+                os.remove(rotated_log_file_name)
+            except FileNotFoundError:
+                # another process compacted the same rotated log
+                pass
+            record_array.index_written()
 
-            return hotel
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+    def close(self):
+        self.array.compact()
 
-    def cancel_reservation(self, hotel_id, customer_id, from_date, to_date):
-        """
-        Delete hotel in the json file by given id
-        Throws custom exception if no hotel found by given id
-        """
+
+class SnapshotStorageBackend(WalStorageBackend):
+    '''
+    Class to keep the records in a BinarySnapshot next to the json
+    file with the changes appended to the write-ahead log, compact
+    folds the log back into the binary snapshot
+
+    While the log is empty, lookups read the mapped snapshot so the
+    first ones do not wait for the index to be loaded
+    '''
+    storage_mode = STORAGE_MODE_SNAPSHOT
+
+    def __init__(self, record_array):
+        super().__init__(record_array)
+        self._reader = None
+        self._reader_stamp = None
+
+    def snapshot_file_name(self):
+        return self.array.snapshot_file_name
+
+    def _snapshot(self):
+        '''
+        Method to return the BinarySnapshot of the current snapshot
+        file, None if there is none
+        '''
+        stamp = file_stamp(self.snapshot_file_name())
+        if stamp != self._reader_stamp or self._reader is None:
+            self._close_reader()
+            if stamp is not None:
+                self._reader = BinarySnapshot(
+                    self.snapshot_file_name(), self.array.record_class,
+                    self.array.snapshot_fields
+                )
+            self._reader_stamp = stamp
+        return self._reader
+
+    def _close_reader(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def read_snapshot(self):
         try:
-            reservation_composite_key = (
-                f"{hotel_id}_{customer_id}_"
-                f"{from_date}_{to_date}"
+            reader = self._snapshot()
+        except FileNotFoundError:
+            return []
+        return [] if reader is None else list(reader)
+
+    def snapshot_data(self, records):
+        return BinarySnapshot.data(
+            records, self.array.snapshot_fields, self.array.record_key,
+            self.array.encoder_class()
+        )
+
+    def lookup(self, key):
+        with self.array.file_lock.shared():
+            stamp = self.stamp()
+            if stamp[1] is not None or stamp[2] is not None:
+                return False, None
+            try:
+                reader = self._snapshot()
+            except FileNotFoundError:
+                return True, None
+            if reader is None:
+                return True, None
+            return True, reader.find(key, self.array.record_key)
+
+    def close(self):
+        super().close()
+        self._close_reader()
+
+
+class SqliteStorageBackend(StorageBackend):
+    '''
+    Class to store the records in a sqlite3 database next to the json
+    file, one row per record in a table indexed for the lookups of
+    the array, every write only touches the rows it changes
+
+    The database runs in WAL journal mode, the statements are cached
+    by the connection and PRAGMA data_version tells when another
+    process wrote. Each write also adds its changes to a changes table
+    so other processes load them instead of every row, the last
+    compaction_threshold changes are kept
+    '''
+    storage_mode = STORAGE_MODE_SQLITE
+    synchronous = {
+        DURABILITY_NONE: "OFF",
+        DURABILITY_FSYNC: "FULL",
+        DURABILITY_FSYNC_DIRECTORY: "EXTRA",
+    }
+
+    def __init__(self, record_array):
+        super().__init__(record_array)
+        self._connection = None
+        self._connection_key = None
+        self._synchronous = None
+        self._sequence = 0
+        table = record_array.sqlite_table
+        columns = [name for name, _ in record_array.sqlite_columns]
+        key = " AND ".join(f"{name} = ?" for name in record_array.sqlite_key)
+        self._column_names = columns
+        self._select_sql = f"SELECT {', '.join(columns)} FROM {table}"
+        self._put_sql = (
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        self._delete_sql = f"DELETE FROM {table} WHERE {key}"
+        self._encoder = record_array.encoder_class()
+
+    def _schema(self):
+        '''
+        Method to return the statements creating the tables and indexes
+        '''
+        record_array = self.array
+        table = record_array.sqlite_table
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            + ", ".join(f"{name} {kind} NOT NULL"
+                        for name, kind in record_array.sqlite_columns)
+            + f", PRIMARY KEY ({', '.join(record_array.sqlite_key)}))",
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "sequence INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "op TEXT NOT NULL, record TEXT NOT NULL)",
+        ]
+        for columns in record_array.sqlite_indexes:
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS "
+                f"{table}_{'_'.join(columns)} ON {table} "
+                f"({', '.join(columns)})"
             )
-            with open(
-                self.hotels_json_file_name, 'r', encoding="utf-8"
-            ) as file:
-                hotels_list_json = json.load(file)
-                if len(hotels_list_json) == 0:
-                    raise ReservationNotFoundException(
-                        reservation_composite_key
-                    )
+        return statements
 
-                self.clear()
-                hotel_list = list(map(Reservation.from_json, hotels_list_json))
-                self.extend(hotel_list)
-                hotel_dict = dict(
-                    (
-                        (
-                            f"{hotel.hotel_id}_{hotel.customer_id}_"
-                            f"{hotel.from_date}_{hotel.to_date}"
-                        ),
-                        hotel
-                    ) for hotel in self
+    def _add_columns(self, connection):
+        '''
+        Method to add the columns missing from a table created before
+        they were declared, they need a default
+        '''
+        table = self.array.sqlite_table
+        existing = {
+            row[1]
+            for row in connection.execute(f"PRAGMA table_info({table})")
+        }
+        for name, kind in self.array.sqlite_columns:
+            if name not in existing:
+                connection.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {name} {kind} NOT NULL"
                 )
-                if reservation_composite_key not in hotel_dict:
-                    raise ReservationNotFoundException(
-                        reservation_composite_key
+
+    def connection(self):
+        '''
+        Method to return the connection to the database of the array,
+        opened again for another file name or after a fork
+        '''
+        key = (self.array.database_file_name, os.getpid())
+        if self._connection is None or self._connection_key != key:
+            if self._connection is not None and (
+                self._connection_key[1] == key[1]
+            ):
+                self._connection.close()
+            connection = sqlite3.connect(
+                key[0], isolation_level=None, check_same_thread=False,
+                cached_statements=256
+            )
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                with connection:
+                    for statement in self._schema():
+                        connection.execute(statement)
+                    self._add_columns(connection)
+            except sqlite3.DatabaseError as e:
+                connection.close()
+                raise CorruptedJsonDBException(key[0]) from e
+            self._connection = connection
+            self._connection_key = key
+            self._synchronous = None
+            self._sequence = 0
+        return self._connection
+
+    def _last_sequence(self, connection):
+        row = connection.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def stamp(self):
+        connection = self.connection()
+        return (
+            self._connection_key,
+            connection.execute("PRAGMA data_version").fetchone()[0]
+        )
+
+    def _record(self, row):
+        return self.array.record_class.from_trusted_json(
+            dict(zip(self._column_names, row))
+        )
+
+    def load(self, previous_stamp, stamp):
+        connection = self.connection()
+        record_class = self.array.record_class
+        try:
+            connection.execute("BEGIN")
+            try:
+                last_sequence = self._last_sequence(connection)
+                first_sequence = connection.execute(
+                    "SELECT MIN(sequence) FROM changes"
+                ).fetchone()[0]
+                if first_sequence is None:
+                    first_sequence = last_sequence + 1
+                if previous_stamp is None or (
+                    self._sequence + 1 < first_sequence
+                ):
+                    records = list(map(
+                        self._record, connection.execute(self._select_sql)
+                    ))
+                    changes = ()
+                else:
+                    records = None
+                    changes = [
+                        (operation, record_class.from_trusted_json(
+                            json.loads(record)
+                        ))
+                        for operation, record in connection.execute(
+                            "SELECT op, record FROM changes "
+                            "WHERE sequence > ? ORDER BY sequence",
+                            (self._sequence,)
+                        )
+                    ]
+            finally:
+                connection.execute("COMMIT")
+        except (sqlite3.DatabaseError, ValueError, KeyError) as e:
+            raise CorruptedJsonDBException(
+                self.array.database_file_name
+            ) from e
+        self._sequence = last_sequence
+        return records, changes
+
+    def commit(self, puts, deletes):
+        connection = self.connection()
+        synchronous = self.synchronous[self.array.durability]
+        if synchronous != self._synchronous:
+            connection.execute(f"PRAGMA synchronous={synchronous}")
+            self._synchronous = synchronous
+        put_rows = []
+        delete_keys = []
+        changes = []
+        for operation, records in ((LOG_OP_PUT, puts),
+                                   (LOG_OP_DELETE, deletes)):
+            for record in records:
+                values = self._encoder.default(record)
+                if operation == LOG_OP_PUT:
+                    put_rows.append(
+                        tuple(values[name] for name in self._column_names)
                     )
+                else:
+                    delete_keys.append(
+                        tuple(values[name] for name in self.array.sqlite_key)
+                    )
+                changes.append(
+                    (operation, json.dumps(values, separators=(",", ":")))
+                )
 
-                self.clear()
-                del hotel_dict[reservation_composite_key]
-                self.extend(list(hotel_dict.values()))
-                with open(
-                    self.hotels_json_file_name, "w", encoding="utf-8"
-                ) as file:
-                    print(json.dumps(self), file=file)
-        except FileNotFoundError as exc:
-            raise ReservationNotFoundException(
-                reservation_composite_key
-            ) from exc
-        except json.JSONDecodeError as e:
-            raise CorruptedJsonDBException(self.hotels_json_file_name) from e
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(self._put_sql, put_rows)
+            connection.executemany(self._delete_sql, delete_keys)
+            connection.executemany(
+                "INSERT INTO changes (op, record) VALUES (?, ?)", changes
+            )
+            self._sequence = self._last_sequence(connection)
+            connection.execute(
+                "DELETE FROM changes WHERE sequence <= ?",
+                (self._sequence - self.array.compaction_threshold,)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
 
+    def compact(self):
+        '''
+        Method to checkpoint the sqlite write-ahead log into the database
+        '''
+        with self.array.write_lock():
+            self.connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
-class TestStringMethods(unittest.TestCase):
+    def close(self):
+        if self._connection is not None and (
+            self._connection_key[1] == os.getpid()
+        ):
+            self._connection.close()
+        self._connection = None
+        self._connection_key = None
+
+
+STORAGE_BACKENDS = {
+    backend.storage_mode: backend
+    for backend in (
+        JsonStorageBackend, WalStorageBackend, SnapshotStorageBackend,
+        SqliteStorageBackend
+    )
+}
+
+SEARCH_WORD = re.compile(r"[^\W_]+")
+
+
+def search_words(text):
+    """
+    Return the words of a name or of a search query folded for
+    search, lowercase and without accents
+    """
+    text = str(text)
+    if not text.isascii():
+        text = "".join(
+            character
+            for character in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(character)
+        )
+    return tuple(SEARCH_WORD.findall(text.casefold()))
+
+
+class NameIndex():
     '''
-    Class to test all of the classes above declared
+    Class to search records by name as it is typed
+
+    The folded names are kept sorted, so the names starting with the
+    query are found by bisection, in alphabetical order. The other
+    matches are found word by word: every distinct word of the names
+    keeps the keys of the names using it, and an inverted index maps
+    the trigrams of the words, padded with two spaces in front, to the
+    words. The trigrams "  t" and " tr" find the words starting with t
+    and tr, and longer query words are also found inside words. They
+    rank after the names starting with the query, by the query words
+    found inside rather than at the start of words, then by length
     '''
-
-    def setUp(self):
-        self.hotel_array = HotelArray()
-        if os.path.exists(self.hotel_array.hotels_json_file_name):
-            # Delete the file
-            os.remove(self.hotel_array.hotels_json_file_name)
-        else:
-            print("File does not exist")
-        self.customer_array = CustomerArray()
-        if os.path.exists(self.customer_array.hotels_json_file_name):
-            # Delete the file
-            os.remove(self.customer_array.hotels_json_file_name)
-        else:
-            print("File does not exist")
-        self.reservations_array = ReservationArray(
-            self.hotel_array, self.customer_array
+    __slots__ = ('_names', '_sorted', '_words', '_grams')
+
+    def __init__(self, names=()):
+        self._names = {}
+        self._words = collections.defaultdict(set)
+        self._grams = collections.defaultdict(set)
+        for key, name in names:
+            words = search_words(name)
+            self._names[key] = words
+            for word in words:
+                self._words[word].add(key)
+        for word in self._words:
+            for gram in self._word_grams(word):
+                self._grams[gram].add(word)
+        self._sorted = sorted(
+            (" ".join(words), key) for key, words in self._names.items()
         )
-        if os.path.exists(self.reservations_array.hotels_json_file_name):
-            # Delete the file
-            os.remove(self.reservations_array.hotels_json_file_name)
-        else:
-            print("File does not exist")
 
-    def test_create_hotel(self):
+    @staticmethod
+    def _word_grams(word):
         '''
-        Test if create hotel works
+        Method to return the trigrams of a padded word
         '''
-        result = self.hotel_array.create_hotel("Transilvania")
-        self.assertEqual(isinstance(result, Hotel), True,
-                         'wrong instance of variable')
+        padded = "  " + word
+        return {padded[start:start + 3] for start in range(len(word))}
 
-    def test_create_hotel_json_exists(self):
+    @staticmethod
+    def _query_grams(word):
         '''
-        Test if create hotel works
+        Method to return the trigrams every word matching a query word
+        has, short words only match at the start of words
         '''
-        self.hotel_array.create_hotel("Transilvania")
-        self.hotel_array.create_hotel("Luigi's mansion")
-        self.assertEqual(len(self.hotel_array), 2,
+        if len(word) < 3:
+            return {("  " + word)[len(word) - 1:len(word) + 2]}
+        return {word[start:start + 3] for start in range(len(word) - 2)}
+
+    @staticmethod
+    def rank(query_words, name_words):
+        '''
+        Method to return the sort key of a name for a query, lower
+        ranks first, or None if the name does not match
+        '''
+        name = " ".join(name_words)
+        if name.startswith(" ".join(query_words)):
+            return (False, 0, 0, name)
+        inside = 0
+        for query_word in query_words:
+            if any(word.startswith(query_word) for word in name_words):
+                continue
+            if len(query_word) < 3 or not any(
+                    query_word in word for word in name_words):
+                return None
+            inside += 1
+        return (True, inside, len(name), name)
+
+    def add(self, key, name):
+        '''
+        Method to index the name of a record
+        '''
+        self.remove(key)
+        words = search_words(name)
+        self._names[key] = words
+        bisect.insort(self._sorted, (" ".join(words), key))
+        for word in words:
+            if word not in self._words:
+                for gram in self._word_grams(word):
+                    self._grams[gram].add(word)
+            self._words[word].add(key)
+
+    def remove(self, key):
+        '''
+        Method to forget the name of a record
+        '''
+        words = self._names.pop(key, None)
+        if words is None:
+            return
+        entry = (" ".join(words), key)
+        del self._sorted[bisect.bisect_left(self._sorted, entry)]
+        for word in set(words):
+            keys = self._words[word]
+            keys.discard(key)
+            if keys:
+                continue
+            del self._words[word]
+            for gram in self._word_grams(word):
+                self._grams[gram].discard(word)
+                if not self._grams[gram]:
+                    del self._grams[gram]
+
+    def _matching_keys(self, query_word):
+        '''
+        Method to return the keys of the names with a word matching
+        a query word
+        '''
+        words = [self._grams.get(gram) for gram in
+                 self._query_grams(query_word)]
+        if not all(words):
+            return set()
+        words.sort(key=len)
+        return set().union(*(
+            self._words[word] for word in words[0].intersection(*words[1:])
+            if query_word in word
+        ))
+
+    def search(self, query, limit=10):
+        '''
+        Method to return the keys of the limit best matches of query
+        '''
+        query_words = search_words(query)
+        if not query_words:
+            return []
+        prefix = " ".join(query_words)
+        start = bisect.bisect_left(self._sorted, (prefix,))
+        found = [
+            key for name, key in self._sorted[start:start + limit]
+            if name.startswith(prefix)
+        ]
+        if len(found) == limit:
+            return found
+
+        candidates = sorted(map(self._matching_keys, set(query_words)),
+                            key=len)
+        ranked = []
+        for key in candidates[0].intersection(*candidates[1:]):
+            rank = self.rank(query_words, self._names[key])
+            if rank is not None and rank[0]:
+                ranked.append((rank, key))
+        return found + [
+            key for _, key in heapq.nsmallest(limit - len(found), ranked)
+        ]
+
+
+class JsonRecordArray(list):
+    """
+    Custom class which extends list and keeps its elements
+    in a resident index persisted by a StorageBackend
+
+    The stored records are only read again when the stamp of the
+    backend changes, which means another process has written them. In
+    the json storage mode every write rewrites the whole file, in the
+    wal storage mode every mutation is appended as one line to a log
+    next to the json file and compact folds the log back into the json
+    snapshot, the snapshot storage mode works the same way with a
+    memory mapped BinarySnapshot instead of the json snapshot and in
+    the sqlite storage mode every write only changes its rows of a
+    sqlite3 database next to the json file
+
+    Processes coordinate through a FileLock next to the json file,
+    loads take its shared lock and writes its exclusive lock, every
+    write bumps the version counter stored in it
+    """
+    record_class = None
+    encoder_class = None
+    default_json_file_name = None
+    compaction_threshold = 10000
+    id_block_size = 1
+    id_shard = 0
+    id_shards = 1
+    search_field = None
+    snapshot_fields = ()
+    sqlite_table = None
+    sqlite_columns = ()
+    sqlite_key = ()
+    sqlite_indexes = ()
+    bulk_row_exceptions = (
+        KeyError, TypeError, ValueError, IDShouldBeIntException
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hotels_json_file_name = self.default_json_file_name
+        self._backend = JsonStorageBackend(self)
+        self._record_index = {}
+        self._record_positions = {}
+        self._index_stamp = None
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread = None
+        self._referencing_arrays = []
+        self._file_lock = None
+        self._id_sequence = None
+        self._ids_wanted = 1
+        self._name_index = None
+        self._version = 0
+        self._durability = DURABILITY_NONE
+
+    @property
+    def hotels_json_file_name(self):
+        """
+        Method to get the hotels json file name
+        """
+        return self._hotels_json_file_name
+
+    @hotels_json_file_name.setter
+    def hotels_json_file_name(self, value):
+        with self._lock:
+            self._hotels_json_file_name = value
+            self._index_stamp = None
+
+    @property
+    def durability(self):
+        """
+        Method to get the durability of the writes: none leaves
+        flushing to the OS, fsync flushes the written file and
+        fsync_dir also flushes the directory entry of renamed files
+        """
+        return self._durability
+
+    @durability.setter
+    def durability(self, value):
+        if value not in DURABILITY_LEVELS:
+            raise InvalidDurabilityException(value)
+        self._durability = value
+
+    @property
+    def lock_file_name(self):
+        """
+        Method to get the lock file name
+        """
+        return f"{self.hotels_json_file_name}.lock"
+
+    @property
+    def file_lock(self):
+        """
+        Method to get the FileLock of the json file
+        """
+        with self._lock:
+            if (
+                self._file_lock is None
+                or self._file_lock.file_name != self.lock_file_name
+            ):
+                self._file_lock = FileLock(self.lock_file_name)
+            return self._file_lock
+
+    @property
+    def sequence_file_name(self):
+        """
+        Method to get the id sequence file name
+        """
+        return f"{self.hotels_json_file_name}.seq"
+
+    @property
+    def id_sequence(self):
+        """
+        Method to get the IdSequence handing out the record ids, it
+        reserves id_block_size ids at a time
+        """
+        with self._lock:
+            if (
+                self._id_sequence is None
+                or self._id_sequence.file_name != self.sequence_file_name
+            ):
+                self._id_sequence = IdSequence(self.sequence_file_name)
+            self._id_sequence.block_size = self.id_block_size
+            return self._id_sequence
+
+    def _highest_id(self):
+        """
+        Return the highest id of the loaded records, files written
+        before the id sequence existed start it from there
+        """
+        raise NotImplementedError
+
+    def _new_id(self):
+        """
+        Return the id of a new record, call it holding the write lock,
+        the arrays of shard id_shard of id_shards only hand out the ids
+        of that shard, see shard_of
+        """
+        floor = (self._highest_id() - 1 - self.id_shard) // self.id_shards
+        new_id = self.id_sequence.next_id(
+            floor + 1, self._durability, self._ids_wanted
+        )
+        self._ids_wanted = max(1, self._ids_wanted - 1)
+        return (new_id - 1) * self.id_shards + self.id_shard + 1
+
+    @property
+    def version(self):
+        """
+        Method to get the version of the loaded records, pass it as
+        expected_version to only write if nobody wrote since
+        """
+        with self._lock:
+            self._load_index()
+            return self._version
+
+    @contextlib.contextmanager
+    def write_lock(self, expected_version=None):
+        """
+        Context manager holding this array for writing, in this
+        process and in every other one, with the index loaded
+        Throws custom exception if the version is not expected_version
+        """
+        with self._lock, self.file_lock.exclusive():
+            self._load_index()
+            version = self.file_lock.read_version()
+            if version != self._version:
+                # written within the resolution of the stat signature
+                self._index_stamp = None
+                self._load_index()
+            if expected_version is not None and expected_version != version:
+                raise VersionConflictException(
+                    self.hotels_json_file_name, expected_version, version
+                )
+            yield
+
+    def _referencing_write_locks(self):
+        """
+        Return a context manager holding the arrays referencing this
+        one for writing, they are always locked before it
+        """
+        stack = contextlib.ExitStack()
+        try:
+            for record_array in self._live_referencing_arrays():
+                stack.enter_context(record_array.write_lock())
+        except BaseException:
+            stack.close()
+            raise
+        return stack
+
+    @property
+    def log_file_name(self):
+        """
+        Method to get the write-ahead log file name
+        """
+        return f"{self.hotels_json_file_name}.log"
+
+    @property
+    def snapshot_file_name(self):
+        """
+        Method to get the binary snapshot file name
+        """
+        return f"{self.hotels_json_file_name}.snap"
+
+    @property
+    def database_file_name(self):
+        """
+        Method to get the sqlite database file name
+        """
+        return f"{self.hotels_json_file_name}.sqlite3"
+
+    @property
+    def storage_mode(self):
+        """
+        Method to get the storage mode, json, wal, snapshot or sqlite
+        """
+        return self._backend.storage_mode
+
+    @storage_mode.setter
+    def storage_mode(self, value):
+        if value not in STORAGE_BACKENDS:
+            raise InvalidStorageModeException(value)
+        with self._lock:
+            self._backend.close()
+            self._backend = STORAGE_BACKENDS[value](self)
+            self._index_stamp = None
+
+    def migrate_storage(self, storage_mode):
+        """
+        Switch to the storage mode and store the loaded records in it,
+        replacing the ones it held, the json and wal storage modes
+        share their files while sqlite uses its own database
+        """
+        with self._lock:
+            records = list(self._load_index().values())
+            self.storage_mode = storage_mode
+            with self.write_lock():
+                keys = set(map(self.record_key, records))
+                stale = [
+                    self._index_delete(key)
+                    for key in list(self._record_index) if key not in keys
+                ]
+                for record in records:
+                    self._index_put(record)
+                self._commit(puts=records, deletes=stale)
+
+    @staticmethod
+    def record_key(record):
+        """
+        Return the key the record is indexed by
+        """
+        raise NotImplementedError
+
+    def _not_found(self, key):
+        """
+        Return the exception raised when no record matches the key
+        """
+        raise NotImplementedError
+
+    def _index_reset(self):
+        """
+        Hook called before the index is rebuilt from the files
+        """
+
+    def _index_added(self, record):
+        """
+        Hook called after a record is added to the index
+        """
+
+    def _index_removed(self, record):
+        """
+        Hook called after a record is removed from the index
+        """
+
+    def _name_added(self, record):
+        """
+        Index the search_field of a record added to the index, once
+        the name index was built by a search
+        """
+        if self._name_index is not None:
+            self._name_index.add(
+                self.record_key(record), getattr(record, self.search_field)
+            )
+
+    def _name_removed(self, record):
+        """
+        Forget the search_field of a record removed from the index
+        """
+        if self._name_index is not None:
+            self._name_index.remove(self.record_key(record))
+
+    def _search(self, query, limit):
+        """
+        Return the records whose search_field best matches query, the
+        NameIndex is built on the first search and then kept up to
+        date with the index, ranked first to last
+        """
+        with self._lock:
+            record_index = self._load_index()
+            if self._name_index is None:
+                self._name_index = NameIndex(
+                    (key, getattr(record, self.search_field))
+                    for key, record in record_index.items()
+                )
+            return [
+                record_index[key]
+                for key in self._name_index.search(query, limit)
+            ]
+
+    def _stamp(self):
+        """
+        Return the signature of the stored records backing the index
+        """
+        return self._backend.stamp()
+
+    def index_written(self):
+        """
+        Record that the index matches the stored records, the storage
+        backends call it after writing them
+        """
+        self._index_stamp = self._stamp()
+
+    def _load_index(self):
+        """
+        Return the record index, reading the stored records only when
+        they changed since the last load or write
+        """
+        with self._lock:
+            stamp = self._stamp()
+            if stamp == self._index_stamp:
+                return self._record_index
+
+            with self.file_lock.shared():
+                self._reload_index()
+            return self._record_index
+
+    def _reload_index(self):
+        """
+        Read the changes of the stored records into the index, call it
+        holding the file lock
+        """
+        stamp = self._stamp()
+        if stamp != self._index_stamp:
+            self._version = self.file_lock.read_version()
+            records, changes = self._backend.load(self._index_stamp, stamp)
+            if records is not None:
+                self._rebuild_index(records)
+            for operation, record in changes:
+                if operation == LOG_OP_DELETE:
+                    key = self.record_key(record)
+                    if key in self._record_index:
+                        self._index_delete(key)
+                else:
+                    self._index_put(record)
+            self._index_stamp = stamp
+
+    def _rebuild_index(self, records):
+        """
+        Build the index again from the given records
+        """
+        self.clear()
+        # cleared in place so that record_ids views stay valid
+        self._record_index.clear()
+        self._record_positions = {}
+        self._index_reset()
+        for record in records:
+            self._index_put(record)
+
+    def _index_put(self, record):
+        """
+        Add the record to the index or replace the one with its key
+        """
+        key = self.record_key(record)
+        previous = self._record_index.get(key)
+        if previous is None:
+            self._record_positions[key] = len(self)
+            self.append(record)
+        else:
+            self[self._record_positions[key]] = record
+            self._index_removed(previous)
+        self._record_index[key] = record
+        self._index_added(record)
+
+    def _index_delete(self, key):
+        """
+        Remove and return the record indexed by the key
+        """
+        record = self._record_index.pop(key)
+        position = self._record_positions.pop(key)
+        # the last record fills the hole so no element has to shift
+        last_record = self.pop()
+        if position < len(self):
+            self[position] = last_record
+            self._record_positions[self.record_key(last_record)] = position
+        self._index_removed(record)
+        return record
+
+    def add_referencing_array(self, record_array):
+        """
+        Register an array holding references to the records of this
+        one, it is only weakly referenced
+        """
+        self._referencing_arrays = [
+            reference for reference in self._referencing_arrays
+            if reference() is not None
+        ]
+        self._referencing_arrays.append(weakref.ref(record_array))
+
+    def _live_referencing_arrays(self):
+        """
+        Return the referencing arrays which were not collected
+        """
+        referencing_arrays = [
+            reference() for reference in self._referencing_arrays
+        ]
+        return [array for array in referencing_arrays if array is not None]
+
+    def _release_references(self, key, cascade):
+        """
+        Ask the arrays referencing this one to release the record key,
+        they either raise or, with cascade, delete their references
+        """
+        referencing_arrays = self._live_referencing_arrays()
+        if not cascade:
+            for record_array in referencing_arrays:
+                record_array.check_references(self, key)
+        for record_array in referencing_arrays:
+            record_array.release_references(self, key)
+
+    def record_ids(self):
+        """
+        Return a live, set-like view of the keys of the records
+
+        The view follows every change of the index, including the ones
+        loaded when another process changed the files
+        """
+        return self._load_index().keys()
+
+    def records(self, keys=None):
+        """
+        Return the records of the given keys which exist, in their
+        order, or every record
+        """
+        with self._lock:
+            record_index = self._load_index()
+            if keys is None:
+                return list(record_index.values())
+            # records are never falsy, missing keys map to None
+            return list(filter(None, map(record_index.get, keys)))
+
+    def _get_record(self, key):
+        """
+        Return the indexed record for the given key, before the index
+        is loaded the storage backend may look it up on its own
+        Throws custom exception if no record found by given key
+        """
+        with self._lock:
+            answered, record = (
+                self._backend.lookup(key) if self._index_stamp is None
+                else (False, None)
+            )
+        if not answered:
+            record = self._load_index().get(key)
+        if record is None:
+            raise self._not_found(key)
+        return record
+
+    def _commit(self, puts=(), deletes=()):
+        """
+        Persist the records put in or deleted from the index, if that
+        fails the index is loaded again from the files on next use
+        """
+        try:
+            self._backend.commit(puts, deletes)
+            self.index_written()
+        except BaseException:
+            self._index_stamp = None
+            raise
+        self._version += 1
+        self.file_lock.write_version(self._version)
+
+    def _bulk_record(self, row):
+        """
+        Return the validated record for a bulk create row
+        """
+        raise NotImplementedError
+
+    def _bulk_batch_started(self):
+        """
+        Hook called before the rows of a bulk create batch are validated
+        """
+
+    def _bulk_create(self, source, batch_size):
+        """
+        Validate and index the rows of source batch by batch and
+        persist every accepted record with a single write
+        """
+        result = BulkCreateResult()
+        rows = iter_bulk_rows(source)
+        with self.write_lock():
+            batch = list(itertools.islice(rows, batch_size))
+            while batch:
+                self._bulk_batch_started()
+                # new ids are reserved once for the rows of the batch
+                self._ids_wanted = len(batch)
+                for row_number, row in batch:
+                    try:
+                        if isinstance(row, Exception):
+                            raise row
+                        record = self._bulk_record(row)
+                    except self.bulk_row_exceptions as exc:
+                        result.errors.append(
+                            BulkRowError(row_number, row, exc)
+                        )
+                        continue
+                    self._index_put(record)
+                    result.created.append(record)
+                batch = list(itertools.islice(rows, batch_size))
+            self._ids_wanted = 1
+
+            if result.created:
+                self._commit(puts=result.created)
+        return result
+
+    def start_compaction(self):
+        """
+        Run compact in a background thread unless one is running
+        Returns the compaction thread
+        """
+        with self._lock:
+            thread = self._compaction_thread
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self.compact, daemon=True)
+                self._compaction_thread = thread
+                thread.start()
+            return thread
+
+    def compact(self):
+        """
+        Shrink the changes kept by the storage backend, in the wal
+        storage mode the log is folded back into the json snapshot
+        """
+        with self._compaction_lock:
+            self._backend.compact()
+
+
+class HotelArray(JsonRecordArray):
+    """
+    Custom class which extends list and
+    does required computation of it's elements
+    """
+    record_class = Hotel
+    encoder_class = HotelEncoder
+    default_json_file_name = "hotels.json"
+    snapshot_fields = (
+        ("hotel_id", "q"), ("hotel_name", "s"), ("rooms", "q")
+    )
+    sqlite_table = "hotels"
+    sqlite_columns = (
+        ("hotel_id", "INTEGER"), ("hotel_name", "TEXT"),
+        ("rooms", "INTEGER DEFAULT 1")
+    )
+    sqlite_key = ("hotel_id",)
+    search_field = "hotel_name"
+    bulk_row_exceptions = JsonRecordArray.bulk_row_exceptions + (
+        InvalidRoomsException,
+    )
+
+    def __init__(self, *args, **kwargs):
+        self._last_hotel_id = 0
+        self._hotel_ids_by_rooms = {}
+        self._hotel_rooms = {}
+        self._sorted_hotel_ids = []
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def record_key(record):
+        return record.hotel_id
+
+    def _not_found(self, key):
+        return HotelNotFoundException(key)
+
+    def _index_reset(self):
+        self._last_hotel_id = 0
+        self._hotel_ids_by_rooms = {}
+        # cleared in place so that hotel_rooms views stay valid
+        self._hotel_rooms.clear()
+        self._sorted_hotel_ids = []
+        self._name_index = None
+
+    def _index_added(self, record):
+        self._last_hotel_id = max(self._last_hotel_id, record.hotel_id)
+        self._hotel_ids_by_rooms.setdefault(record.rooms, set()).add(
+            record.hotel_id
+        )
+        self._hotel_rooms[record.hotel_id] = record.rooms
+        sorted_hotel_ids = self._sorted_hotel_ids
+        if not sorted_hotel_ids or record.hotel_id > sorted_hotel_ids[-1]:
+            sorted_hotel_ids.append(record.hotel_id)
+        else:
+            position = bisect.bisect_left(sorted_hotel_ids, record.hotel_id)
+            if sorted_hotel_ids[position] != record.hotel_id:
+                sorted_hotel_ids.insert(position, record.hotel_id)
+        self._name_added(record)
+
+    def _index_removed(self, record):
+        hotel_ids = self._hotel_ids_by_rooms[record.rooms]
+        hotel_ids.discard(record.hotel_id)
+        if not hotel_ids:
+            del self._hotel_ids_by_rooms[record.rooms]
+        del self._hotel_rooms[record.hotel_id]
+        # a replaced hotel keeps its place in the sorted ids
+        if record.hotel_id not in self._record_index:
+            position = bisect.bisect_left(
+                self._sorted_hotel_ids, record.hotel_id
+            )
+            del self._sorted_hotel_ids[position]
+        self._name_removed(record)
+
+    def _highest_id(self):
+        return self._last_hotel_id
+
+    def _bulk_record(self, row):
+        hotel = Hotel()
+        hotel.hotel_name = row["hotel_name"]
+        hotel.rooms = row.get("rooms", 1)
+        hotel.hotel_id = self._new_id()
+        return hotel
+
+    def bulk_create(self, source, batch_size=1000):
+        """
+        Create the hotels of a JSONL file or an iterable of rows with
+        a hotel_name and optionally rooms, ids are handed out in order
+        and the json file is written once, rejected rows are reported
+        in the result errors
+        """
+        return self._bulk_create(source, batch_size)
+
+    def create_hotel(self, hotel_name, rooms=1):
+        """
+        Create another hotel in the json file
+        Throws custom exception if rooms is not a positive integer
+        """
+        with self.write_lock():
+            hotel = Hotel()
+            hotel.hotel_name = hotel_name
+            hotel.rooms = rooms
+            hotel.hotel_id = self._new_id()
+            self._index_put(hotel)
+            self._commit(puts=[hotel])
+
+            return hotel
+
+    def delete_hotel(self, hotel_id, cascade=False):
+        """
+        Delete hotel in the json file by given id
+        Throws custom exception if no hotel found by given id or if
+        it still has reservations, cascade cancels them instead
+        """
+        with self._referencing_write_locks(), self.write_lock():
+            self._get_record(hotel_id)
+            self._release_references(hotel_id, cascade)
+            hotel = self._index_delete(hotel_id)
+            self._commit(deletes=[hotel])
+
+    def display_hotel_information(self, hotel_id):
+        """
+        Return hotel information for a given id
+        Throws custom exception if no hotel found by given id
+        """
+        return self._get_record(hotel_id)
+
+    def hotel_ids_in(self, first_id=None, end_id=None):
+        """
+        Return the ids of the hotels from first_id up to but not
+        including end_id in order, of every hotel by default
+        """
+        with self._lock:
+            self._load_index()
+            hotel_ids = self._sorted_hotel_ids
+            return hotel_ids[
+                0 if first_id is None
+                else bisect.bisect_left(hotel_ids, first_id):
+                len(hotel_ids) if end_id is None
+                else bisect.bisect_left(hotel_ids, end_id)
+            ]
+
+    def hotel_ids_with_fewer_rooms(self, rooms):
+        """
+        Return a new set of the ids of the hotels with less than rooms
+        rooms
+        """
+        with self._lock:
+            self._load_index()
+            return set().union(*(
+                hotel_ids
+                for hotel_rooms, hotel_ids in self._hotel_ids_by_rooms.items()
+                if hotel_rooms < rooms
+            ))
+
+    def hotel_rooms(self):
+        """
+        Return a live, read-only mapping of the hotel ids to their
+        rooms
+        """
+        self._load_index()
+        return types.MappingProxyType(self._hotel_rooms)
+
+    def search_hotels(self, query, limit=10):
+        """
+        Return the hotels whose name best matches a query as it is
+        typed, names starting with it first
+        """
+        return self._search(query, limit)
+
+    def modify_hotel_information(self, hotel_id, hotel_name,
+                                 expected_version=None, rooms=None):
+        """
+        modify hotel information for a given id, rooms are kept unless
+        given
+        Throws custom exception if no hotel found by given id, if
+        another writer changed the file since expected_version or if
+        more rooms are reserved on a night than given
+        """
+        with contextlib.ExitStack() as stack:
+            if rooms is not None:
+                stack.enter_context(self._referencing_write_locks())
+            stack.enter_context(self.write_lock(expected_version))
+            hotel = self._get_record(hotel_id)
+
+            hotel_obj = Hotel()
+            hotel_obj.hotel_id = hotel_id
+            hotel_obj.hotel_name = hotel_name
+            hotel_obj.rooms = hotel.rooms if rooms is None else rooms
+            if hotel_obj.rooms < hotel.rooms:
+                for record_array in self._live_referencing_arrays():
+                    record_array.check_rooms(self, hotel_id, hotel_obj.rooms)
+            self._index_put(hotel_obj)
+            self._commit(puts=[hotel_obj])
+
+            return hotel_obj
+
+
+class CustomerNotFoundException(Exception):
+    """A custom exception."""
+    def __init__(self, identificator):
+        message = f"Customer not found for ID {identificator}"
+        super().__init__(message)
+        self.message = message
+
+
+class CustomerArray(JsonRecordArray):
+    """
+    Custom class which extends list and
+    does required computation of it's elements
+    """
+    record_class = Customer
+    encoder_class = CustomerEncoder
+    default_json_file_name = "customers.json"
+    snapshot_fields = (("customer_id", "q"), ("customer_name", "s"))
+    sqlite_table = "customers"
+    sqlite_columns = (("customer_id", "INTEGER"), ("customer_name", "TEXT"))
+    sqlite_key = ("customer_id",)
+    search_field = "customer_name"
+
+    def __init__(self, *args, **kwargs):
+        self._last_customer_id = 0
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def record_key(record):
+        return record.customer_id
+
+    def _not_found(self, key):
+        return CustomerNotFoundException(key)
+
+    def _index_reset(self):
+        self._last_customer_id = 0
+        self._name_index = None
+
+    def _index_added(self, record):
+        self._last_customer_id = max(
+            self._last_customer_id, record.customer_id
+        )
+        self._name_added(record)
+
+    def _index_removed(self, record):
+        self._name_removed(record)
+
+    def _highest_id(self):
+        return self._last_customer_id
+
+    def _bulk_record(self, row):
+        customer = Customer()
+        customer.customer_name = row["customer_name"]
+        customer.customer_id = self._new_id()
+        return customer
+
+    def bulk_create(self, source, batch_size=1000):
+        """
+        Create the customers of a JSONL file or an iterable of rows with
+        a customer_name, ids are handed out in order and the json file is
+        written once, rejected rows are reported in the result errors
+        """
+        return self._bulk_create(source, batch_size)
+
+    def create_customer(self, hotel_name):
+        """
+        Create another hotel in the json file
+        """
+        with self.write_lock():
+            hotel = Customer()
+            hotel.customer_name = hotel_name
+            hotel.customer_id = self._new_id()
+            self._index_put(hotel)
+            self._commit(puts=[hotel])
+
+            return hotel
+
+    def delete_customer(self, hotel_id, cascade=False):
+        """
+        Delete hotel in the json file by given id
+        Throws custom exception if no hotel found by given id or if
+        it still has reservations, cascade cancels them instead
+        """
+        with self._referencing_write_locks(), self.write_lock():
+            self._get_record(hotel_id)
+            self._release_references(hotel_id, cascade)
+            hotel = self._index_delete(hotel_id)
+            self._commit(deletes=[hotel])
+
+    def display_customer_information(self, hotel_id):
+        """
+        Return hotel information for a given id
+        Throws custom exception if no hotel found by given id
+        """
+        return self._get_record(hotel_id)
+
+    def search_customers(self, query, limit=10):
+        """
+        Return the customers whose name best matches a query as it is
+        typed, names starting with it first
+        """
+        return self._search(query, limit)
+
+    def modify_customer_information(self, hotel_id, hotel_name,
+                                    expected_version=None):
+        """
+        modify hotel information for a given id
+        Throws custom exception if no hotel found by given id or if
+        another writer changed the file since expected_version
+        """
+        with self.write_lock(expected_version):
+            self._get_record(hotel_id)
+
+            hotel_obj = Customer()
+            hotel_obj.customer_id = hotel_id
+            hotel_obj.customer_name = hotel_name
+            self._index_put(hotel_obj)
+            self._commit(puts=[hotel_obj])
+
+            return hotel_obj
+
+
+class InvalidHotelArrayParamException(Exception):
+    """A custom exception."""
+    def __init__(self):
+        message = "Please provide a valid hotel array in the params"
+        super().__init__(message)
+        self.message = message
+
+
+class InvalidCustomerArrayParamException(Exception):
+    """A custom exception."""
+    def __init__(self):
+        message = "Please provide a valid customer array in the params"
+        super().__init__(message)
+        self.message = message
+
+
+class InvalidHotelForReservException(Exception):
+    """A custom exception."""
+    def __init__(self, hotel_id):
+        message = (
+            f"Hotel id {hotel_id}, "
+            f"please provide a valid hotel id for the reservation"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class InvalidCustomerForReservException(Exception):
+    """A custom exception."""
+    def __init__(self, hotel_id):
+        message = (
+            f"Customer id {hotel_id}, "
+            f"please provide a valid customer id for the reservation"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class HotelHasReservationsException(Exception):
+    """A custom exception."""
+    def __init__(self, hotel_id, reservations):
+        message = (
+            f"Hotel id {hotel_id} has {reservations} reservations, "
+            f"please cancel them before deleting the hotel"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class CustomerHasReservationsException(Exception):
+    """A custom exception."""
+    def __init__(self, customer_id, reservations):
+        message = (
+            f"Customer id {customer_id} has {reservations} reservations, "
+            f"please cancel them before deleting the customer"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class InvalidReservationMaskException(Exception):
+    """A custom exception."""
+    def __init__(self, mask_length, reservations):
+        message = (
+            f"Mask of {mask_length} rows does not match the "
+            f"{reservations} reservations, please build it again"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class ReservationNotFoundException(Exception):
+    """A custom exception."""
+    def __init__(self, identificator):
+        message = f"Reservation not found for ID {identificator}"
+        super().__init__(message)
+        self.message = message
+
+
+class InvalidReservationDatesException(Exception):
+    """A custom exception."""
+    def __init__(self, from_date, to_date):
+        message = (
+            f"Dates {from_date} to {to_date}, please provide ISO dates "
+            f"with the to date after the from date for the reservation"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class ReservationOverlapException(Exception):
+    """A custom exception."""
+    def __init__(self, hotel_id, from_date, to_date):
+        message = (
+            f"Hotel id {hotel_id} has no room left "
+            f"between {from_date} and {to_date}"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class ReservationExistsException(Exception):
+    """A custom exception."""
+    def __init__(self, hotel_id, customer_id, from_date, to_date):
+        message = (
+            f"Customer id {customer_id} already has a reservation in "
+            f"hotel id {hotel_id} between {from_date} and {to_date}"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class HotelRoomsReservedException(Exception):
+    """A custom exception."""
+    def __init__(self, hotel_id, rooms, reserved):
+        message = (
+            f"Hotel id {hotel_id} has {reserved} rooms reserved on a "
+            f"night, it cannot have only {rooms} rooms"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+def reservation_day(value):
+    """
+    Return the day ordinal of an ISO date string or date
+    """
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    return datetime.date.fromisoformat(value).toordinal()
+
+
+def reservation_days(from_date, to_date):
+    """
+    Return the half-open day ordinal interval of a reservation
+    Throws custom exception if the dates are not a valid interval
+    """
+    try:
+        from_day = reservation_day(from_date)
+        to_day = reservation_day(to_date)
+    except (TypeError, ValueError) as exc:
+        raise InvalidReservationDatesException(from_date, to_date) from exc
+    if to_day <= from_day:
+        raise InvalidReservationDatesException(from_date, to_date)
+    return from_day, to_day
+
+
+def remove_length(lengths, length, longest):
+    """
+    Remove one length from a Counter of lengths and return the longest
+    length left, lengths are few so it is only looked for again when
+    the last of the longest ones goes
+    """
+    lengths[length] -= 1
+    if lengths[length] > 0:
+        return longest
+    del lengths[length]
+    if length < longest:
+        return longest
+    return max(lengths, default=0)
+
+
+class ReservationIntervals():
+    '''
+    Sorted array of the reserved day intervals of one hotel
+
+    Entries are (from_day, to_day, key) tuples ordered by from_day.
+    Keeping the longest interval length bounds the entries that can
+    overlap a window to those starting less than that many days
+    before it, so overlap queries are a bisect plus the matches. The
+    intervals are counted by length so the longest one is known again
+    when it is removed
+    '''
+    def __init__(self):
+        self._entries = []
+        self._lengths = collections.Counter()
+        self._max_length = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def add(self, from_day, to_day, key):
+        '''
+        Method to add a reserved interval
+        '''
+        bisect.insort(self._entries, (from_day, to_day, key))
+        self._lengths[to_day - from_day] += 1
+        self._max_length = max(self._max_length, to_day - from_day)
+
+    def remove(self, from_day, to_day, key):
+        '''
+        Method to remove a reserved interval
+        '''
+        entry = (from_day, to_day, key)
+        position = bisect.bisect_left(self._entries, entry)
+        if (
+            position < len(self._entries)
+            and self._entries[position] == entry
+        ):
+            del self._entries[position]
+            self._max_length = remove_length(
+                self._lengths, to_day - from_day, self._max_length
+            )
+
+    def overlapping(self, from_day, to_day):
+        '''
+        Method to yield the keys of the intervals overlapping
+        the half-open window [from_day, to_day)
+        '''
+        entries = self._entries
+        position = bisect.bisect_left(
+            entries, (from_day - self._max_length + 1,)
+        )
+        while position < len(entries) and entries[position][0] < to_day:
+            if entries[position][1] > from_day:
+                yield entries[position][2]
+            position += 1
+
+    def is_free(self, from_day, to_day):
+        '''
+        Method to tell if no interval overlaps the window
+        '''
+        return next(self.overlapping(from_day, to_day), None) is None
+
+
+class OccupancyTree():
+    '''
+    Reserved rooms of one hotel per day, a dynamic segment tree over
+    the day ordinals with range add and range max
+
+    Nodes are only created for the days reserved, a node keeps the
+    rooms added to its whole range and the highest count within it,
+    adds included, so neither updates nor queries push anything down
+    '''
+    __slots__ = ('_left', '_right', '_added', '_highest')
+    size = 1 << 22  # past the ordinal of 9999-12-31
+
+    def __init__(self):
+        self._left = [0]
+        self._right = [0]
+        self._added = [0]
+        self._highest = [0]
+
+    def _child(self, children, node):
+        '''
+        Method to return a child of a node, created when missing,
+        node 0 is the root so it means no child
+        '''
+        child = children[node]
+        if not child:
+            child = len(self._added)
+            children[node] = child
+            for values in (self._left, self._right, self._added,
+                           self._highest):
+                values.append(0)
+        return child
+
+    def add(self, from_day, to_day, rooms):
+        '''
+        Method to add rooms to every day of [from_day, to_day),
+        negative rooms release them
+        '''
+        self._add(0, 0, self.size, from_day, to_day, rooms)
+
+    def _add(self, node, low, high, from_day, to_day, rooms):
+        if from_day <= low and high <= to_day:
+            self._added[node] += rooms
+            self._highest[node] += rooms
+            return
+        middle = (low + high) // 2
+        if from_day < middle:
+            self._add(self._child(self._left, node), low, middle,
+                      from_day, to_day, rooms)
+        if to_day > middle:
+            self._add(self._child(self._right, node), middle, high,
+                      from_day, to_day, rooms)
+        self._highest[node] = self._added[node] + max(
+            self._highest[self._left[node]] if self._left[node] else 0,
+            self._highest[self._right[node]] if self._right[node] else 0
+        )
+
+    def peak(self):
+        '''
+        Method to return the most rooms reserved on any day
+        '''
+        return self._highest[0]
+
+    def highest(self, from_day=0, to_day=size):
+        '''
+        Method to return the most rooms reserved on a day of
+        [from_day, to_day)
+        '''
+        return self._highest_in(0, 0, self.size, from_day, to_day)
+
+    def _highest_in(self, node, low, high, from_day, to_day):
+        if from_day <= low and high <= to_day:
+            return self._highest[node]
+        middle = (low + high) // 2
+        highest = []
+        for child, child_low, child_high in (
+                (self._left[node], low, middle),
+                (self._right[node], middle, high)):
+            if from_day < child_high and to_day > child_low:
+                # days without a child have nothing reserved below node
+                highest.append(self._highest_in(
+                    child, child_low, child_high, from_day, to_day
+                ) if child else 0)
+        return self._added[node] + max(highest)
+
+
+class ReservationColumns():
+    '''
+    Class to store reservations as parallel typed columns
+
+    hotel_ids and customer_ids hold the ids, from_days and to_days the
+    half-open day ordinal interval, row i of every column is the same
+    reservation. Queries are bulk operations over whole columns done
+    by map, compress and Counter in C, masks are bytes with one 0 or 1
+    per row
+    '''
+    def __init__(self, hotel_ids=(), customer_ids=(), from_days=(),
+                 to_days=()):
+        self.hotel_ids = array.array('q', hotel_ids)
+        self.customer_ids = array.array('q', customer_ids)
+        self.from_days = array.array('i', from_days)
+        self.to_days = array.array('i', to_days)
+
+    def __len__(self):
+        return len(self.hotel_ids)
+
+    def _columns(self):
+        return self.hotel_ids, self.customer_ids, self.from_days, self.to_days
+
+    def append(self, hotel_id, customer_id, from_date, to_date):
+        '''
+        Method to add a row, dates which are not a valid interval are
+        stored as the empty interval 0 to 0 which overlaps nothing
+        '''
+        try:
+            from_day, to_day = reservation_days(from_date, to_date)
+        except InvalidReservationDatesException:
+            from_day, to_day = 0, 0
+        self.set_row(len(self), hotel_id, customer_id, from_day, to_day)
+
+    def set_row(self, position, hotel_id, customer_id, from_day, to_day):
+        '''
+        Method to replace the row at position, or to add it when
+        position is the number of rows
+        '''
+        row = (hotel_id, customer_id, from_day, to_day)
+        if position == len(self):
+            for column, value in zip(self._columns(), row):
+                column.append(value)
+        else:
+            for column, value in zip(self._columns(), row):
+                column[position] = value
+
+    def delete_row(self, position):
+        '''
+        Method to drop the row at position, the last row fills the hole
+        the same way the records of a JsonRecordArray do
+        '''
+        for column in self._columns():
+            column[position] = column[-1]
+            column.pop()
+
+    @staticmethod
+    def from_records(records):
+        '''
+        Static factory method to map reservations or their json objects
+        to columns
+        '''
+        columns = ReservationColumns()
+        for record in records:
+            if isinstance(record, Reservation):
+                columns.append(
+                    record.hotel_id, record.customer_id,
+                    record.from_date, record.to_date
+                )
+            else:
+                columns.append(
+                    record['hotel_id'], record['customer_id'],
+                    record['from_date'], record['to_date']
+                )
+        return columns
+
+    @staticmethod
+    def from_json_file(json_file_name):
+        '''
+        Static factory method to map a reservations json file to
+        columns without keeping a Reservation per row
+        '''
+        try:
+            with open(json_file_name, 'r', encoding="utf-8") as file:
+                return ReservationColumns.from_records(
+                    iter_json_array(file)
+                )
+        except json.JSONDecodeError as e:
+            raise CorruptedJsonDBException(json_file_name) from e
+
+    def overlap_mask(self, from_date, to_date, hotel_id=None):
+        '''
+        Method to return the mask of the rows overlapping the dates,
+        only rows of hotel_id when given
+        '''
+        from_day, to_day = reservation_days(from_date, to_date)
+        mask = map(
+            operator.and_,
+            map(operator.lt, self.from_days, itertools.repeat(to_day)),
+            map(operator.gt, self.to_days, itertools.repeat(from_day))
+        )
+        if hotel_id is not None:
+            mask = map(
+                operator.and_, mask,
+                map(operator.eq, self.hotel_ids, itertools.repeat(hotel_id))
+            )
+        return bytes(mask)
+
+    def select(self, mask):
+        '''
+        Method to return the columns of the rows selected by the mask
+        '''
+        return ReservationColumns(*(
+            itertools.compress(column, mask) for column in self._columns()
+        ))
+
+    def cancel_where(self, mask):
+        '''
+        Method to drop the rows selected by the mask
+        Returns the number of rows dropped
+        '''
+        kept = self.select(bytes(map(operator.not_, mask)))
+        cancelled = len(self) - len(kept)
+        self.hotel_ids = kept.hotel_ids
+        self.customer_ids = kept.customer_ids
+        self.from_days = kept.from_days
+        self.to_days = kept.to_days
+        return cancelled
+
+    def occupancy(self, from_date, to_date, hotel_id=None):
+        '''
+        Method to return, per hotel, the array of reserved rooms for
+        every day of the half-open window, built from a difference
+        array of the clipped stays
+        '''
+        from_day, to_day = reservation_days(from_date, to_date)
+        window = self.select(self.overlap_mask(from_date, to_date, hotel_id))
+        starts = collections.Counter(zip(
+            window.hotel_ids,
+            map(max, window.from_days, itertools.repeat(from_day))
+        ))
+        ends = collections.Counter(zip(
+            window.hotel_ids,
+            map(min, window.to_days, itertools.repeat(to_day))
+        ))
+
+        differences = {}
+        for sign, counts in ((1, starts), (-1, ends)):
+            for (hotel, day), count in counts.items():
+                if hotel not in differences:
+                    differences[hotel] = [0] * (to_day - from_day + 1)
+                differences[hotel][day - from_day] += sign * count
+        return dict(
+            (hotel, array.array('i', itertools.accumulate(difference[:-1])))
+            for hotel, difference in differences.items()
+        )
+
+
+class ReservationReport():
+    '''
+    Class to aggregate occupancy and booking figures of reservations
+
+    Each reservation adds +1 at its first day and -1 at its last day
+    to a per hotel difference map, daily occupancy is the running sum
+    over it. All the figures are kept as counters so reservations can
+    be added and removed incrementally
+    '''
+    def __init__(self):
+        self._day_changes = {}
+        self._hotel_reservations = collections.Counter()
+        self._hotel_nights = collections.Counter()
+        self._customer_bookings = collections.Counter()
+
+    def add(self, hotel_id, customer_id, from_date, to_date, count=1):
+        '''
+        Method to add a reservation to the figures, a negative count
+        removes it
+        '''
+        self._customer_bookings[customer_id] += count
+        if not self._customer_bookings[customer_id]:
+            del self._customer_bookings[customer_id]
+        try:
+            from_day, to_day = reservation_days(from_date, to_date)
+        except InvalidReservationDatesException:
+            return
+
+        changes = self._day_changes.setdefault(
+            hotel_id, collections.Counter()
+        )
+        changes[from_day] += count
+        changes[to_day] -= count
+        for day in (from_day, to_day):
+            if not changes[day]:
+                del changes[day]
+        if not changes:
+            del self._day_changes[hotel_id]
+
+        self._hotel_reservations[hotel_id] += count
+        self._hotel_nights[hotel_id] += count * (to_day - from_day)
+        if not self._hotel_reservations[hotel_id]:
+            del self._hotel_reservations[hotel_id]
+            del self._hotel_nights[hotel_id]
+
+    def remove(self, hotel_id, customer_id, from_date, to_date):
+        '''
+        Method to remove a reservation from the figures
+        '''
+        self.add(hotel_id, customer_id, from_date, to_date, count=-1)
+
+    @staticmethod
+    def from_records(records):
+        '''
+        Static factory method to aggregate reservations or their
+        json objects in a single pass
+        '''
+        report = ReservationReport()
+        for record in records:
+            if isinstance(record, Reservation):
+                report.add(
+                    record.hotel_id, record.customer_id,
+                    record.from_date, record.to_date
+                )
+            else:
+                report.add(
+                    record['hotel_id'], record['customer_id'],
+                    record['from_date'], record['to_date']
+                )
+        return report
+
+    @staticmethod
+    def from_json_file(json_file_name):
+        '''
+        Static factory method to aggregate a reservations json file
+        '''
+        try:
+            with open(json_file_name, 'r', encoding="utf-8") as file:
+                return ReservationReport.from_records(
+                    iter_json_array(file)
+                )
+        except json.JSONDecodeError as e:
+            raise CorruptedJsonDBException(json_file_name) from e
+
+    def daily_occupancy(self, hotel_id):
+        '''
+        Method to return the (date, reserved rooms) pairs of a hotel for
+        every day from its first to its last reserved night
+        '''
+        changes = self._day_changes.get(hotel_id)
+        if not changes:
+            return []
+        first_day = min(changes)
+        differences = [0] * (max(changes) - first_day)
+        for day, change in changes.items():
+            if day - first_day < len(differences):
+                differences[day - first_day] = change
+        return [
+            (datetime.date.fromordinal(first_day + offset), occupied)
+            for offset, occupied in enumerate(
+                itertools.accumulate(differences)
+            )
+        ]
+
+    def occupancy_by_hotel(self):
+        '''
+        Method to return the daily occupancy of every hotel
+        '''
+        return dict(
+            (hotel_id, self.daily_occupancy(hotel_id))
+            for hotel_id in self._day_changes
+        )
+
+    def bookings_per_customer(self):
+        '''
+        Method to return the number of reservations of every customer
+        '''
+        return dict(self._customer_bookings)
+
+    def average_length_of_stay(self, hotel_id=None):
+        '''
+        Method to return the average nights per reservation of a hotel,
+        or of all of them, None when there are no reservations
+        '''
+        if hotel_id is None:
+            reservations = sum(self._hotel_reservations.values())
+            nights = sum(self._hotel_nights.values())
+        else:
+            reservations = self._hotel_reservations[hotel_id]
+            nights = self._hotel_nights[hotel_id]
+        if not reservations:
+            return None
+        return nights / reservations
+
+
+class ReservationArray(JsonRecordArray):
+    """
+    Custom class which extends list and
+    does required computation of it's elements
+    """
+    record_class = Reservation
+    encoder_class = ReservationEncoder
+    default_json_file_name = "reservations.json"
+    snapshot_fields = (
+        ("hotel_id", "q"), ("customer_id", "q"),
+        ("from_date", "s"), ("to_date", "s"),
+    )
+    sqlite_table = "reservations"
+    sqlite_columns = (
+        ("hotel_id", "INTEGER"), ("customer_id", "INTEGER"),
+        ("from_date", "TEXT"), ("to_date", "TEXT"),
+    )
+    sqlite_key = ("hotel_id", "customer_id", "from_date", "to_date")
+    sqlite_indexes = (
+        ("hotel_id", "from_date", "to_date"),
+        ("customer_id", "from_date"),
+        ("from_date", "to_date"),
+    )
+
+    bulk_row_exceptions = JsonRecordArray.bulk_row_exceptions + (
+        InvalidHotelForReservException, InvalidCustomerForReservException,
+        InvalidReservationDatesException, ReservationOverlapException,
+        ReservationExistsException
+    )
+
+    def __init__(self, hotel_array, customer_array, *args, **kwargs):
+        self._columns = None
+        self._report = None
+        self._hotel_intervals = {}
+        self._hotel_occupancy = {}
+        self._reserved_nights = None
+        self._hotel_reservations = {}
+        self._customer_reservations = {}
+        super().__init__(*args, **kwargs)
+        if not isinstance(hotel_array, HotelArray):
+            raise InvalidHotelArrayParamException()
+        if not isinstance(customer_array, CustomerArray):
+            raise InvalidCustomerArrayParamException()
+
+        self.hotel_array = hotel_array
+        self.customer_array = customer_array
+        hotel_array.add_referencing_array(self)
+        customer_array.add_referencing_array(self)
+        self._hotel_ids = frozenset()
+        self._customer_ids = frozenset()
+        self._group_commit_lock = threading.Lock()
+        self._group_commit_queue = None
+        self._group_commit_thread = None
+
+    @staticmethod
+    def record_key(record):
+        return ReservationKey.of(
+            record.hotel_id, record.customer_id,
+            record.from_date, record.to_date
+        )
+
+    def _not_found(self, key):
+        return ReservationNotFoundException(key)
+
+    def _index_reset(self):
+        self._hotel_intervals = {}
+        self._hotel_occupancy = {}
+        self._reserved_nights = None
+        self._hotel_reservations = {}
+        self._customer_reservations = {}
+        self._columns = None
+        if self._report is not None:
+            self._report = ReservationReport()
+
+    @staticmethod
+    def _secondary_entry(key, other_id):
+        """
+        Return the sort entry of a key in a secondary index, ordered by
+        dates so mixed date and legacy string values stay comparable
+        """
+        return (str(key.from_date), str(key.to_date), other_id, key)
+
+    def _index_added(self, record):
+        if self._report is not None:
+            self._report.add(
+                record.hotel_id, record.customer_id,
+                record.from_date, record.to_date
+            )
+        key = self.record_key(record)
+        bisect.insort(
+            self._hotel_reservations.setdefault(key.hotel_id, []),
+            self._secondary_entry(key, key.customer_id)
+        )
+        bisect.insort(
+            self._customer_reservations.setdefault(key.customer_id, []),
+            self._secondary_entry(key, key.hotel_id)
+        )
+        days = key.days()
+        if self._columns is not None:
+            self._columns.set_row(
+                self._record_positions[key], key.hotel_id, key.customer_id,
+                *(days or (0, 0))
+            )
+        if days is None:
+            return
+        intervals = self._hotel_intervals.get(key.hotel_id)
+        if intervals is None:
+            intervals = ReservationIntervals()
+            self._hotel_intervals[key.hotel_id] = intervals
+        intervals.add(days[0], days[1], key)
+        occupancy = self._hotel_occupancy.get(key.hotel_id)
+        if occupancy is not None:
+            occupancy.add(days[0], days[1], 1)
+        if self._reserved_nights is not None:
+            self._reserve_nights(key.hotel_id, days, 1)
+
+    @staticmethod
+    def _secondary_remove(secondary_index, record_id, entry):
+        """
+        Remove an entry from the sorted list of a secondary index
+        """
+        entries = secondary_index.get(record_id)
+        if entries is None:
+            return
+        position = bisect.bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+        if not entries:
+            del secondary_index[record_id]
+
+    def _index_removed(self, record):
+        if self._report is not None:
+            self._report.remove(
+                record.hotel_id, record.customer_id,
+                record.from_date, record.to_date
+            )
+        key = self.record_key(record)
+        self._secondary_remove(
+            self._hotel_reservations, key.hotel_id,
+            self._secondary_entry(key, key.customer_id)
+        )
+        self._secondary_remove(
+            self._customer_reservations, key.customer_id,
+            self._secondary_entry(key, key.hotel_id)
+        )
+        intervals = self._hotel_intervals.get(key.hotel_id)
+        days = key.days()
+        if intervals is None or days is None:
+            return
+        intervals.remove(days[0], days[1], key)
+        occupancy = self._hotel_occupancy.get(key.hotel_id)
+        if occupancy is not None:
+            occupancy.add(days[0], days[1], -1)
+        if self._reserved_nights is not None:
+            self._reserve_nights(key.hotel_id, days, -1)
+        if not intervals:
+            del self._hotel_intervals[key.hotel_id]
+            self._hotel_occupancy.pop(key.hotel_id, None)
+
+    def _reserve_nights(self, hotel_id, days, rooms):
+        """
+        Add rooms, less than 0 to take them away, to the rooms reserved
+        in the hotel on every night of the half-open days interval
+        """
+        reserved_nights = self._reserved_nights
+        for day in range(*days):
+            night = reserved_nights.get(day)
+            if night is None:
+                night = reserved_nights[day] = {}
+            reserved = night.get(hotel_id, 0) + rooms
+            if reserved:
+                night[hotel_id] = reserved
+                continue
+            del night[hotel_id]
+            if not night:
+                del reserved_nights[day]
+
+    def _nights(self):
+        """
+        Return the rooms reserved per hotel by night, built from the
+        reserved intervals on the first call and then kept up to date
+        with every reservation created, cancelled or replayed from the
+        log
+        """
+        if self._reserved_nights is None:
+            self._reserved_nights = {}
+            for hotel_id, intervals in self._hotel_intervals.items():
+                for from_day, to_day, _ in intervals:
+                    self._reserve_nights(hotel_id, (from_day, to_day), 1)
+        return self._reserved_nights
+
+    def _index_delete(self, key):
+        position = self._record_positions[key]
+        record = super()._index_delete(key)
+        if self._columns is not None:
+            self._columns.delete_row(position)
+        return record
+
+    def reservations_for_hotel(self, hotel_id):
+        """
+        Return the reservations of a hotel ordered by dates
+        """
+        with self._lock:
+            record_index = self._load_index()
+            return [
+                record_index[entry[-1]]
+                for entry in self._hotel_reservations.get(hotel_id, ())
+            ]
+
+    def reservations_for_customer(self, customer_id):
+        """
+        Return the reservations of a customer ordered by dates
+        """
+        with self._lock:
+            record_index = self._load_index()
+            return [
+                record_index[entry[-1]]
+                for entry in self._customer_reservations.get(customer_id, ())
+            ]
+
+    def _referencing_keys(self, record_array, record_id):
+        """
+        Return the keys of the reservations referencing a record
+        of the hotel or customer array
+        """
+        self._load_index()
+        if record_array is self.hotel_array:
+            entries = self._hotel_reservations.get(record_id, ())
+        else:
+            entries = self._customer_reservations.get(record_id, ())
+        return [entry[-1] for entry in entries]
+
+    def check_references(self, record_array, record_id):
+        """
+        Throws custom exception if a reservation references the
+        hotel or customer about to be deleted from record_array
+        """
+        with self._lock:
+            keys = self._referencing_keys(record_array, record_id)
+            if not keys:
+                return
+            if record_array is self.hotel_array:
+                raise HotelHasReservationsException(record_id, len(keys))
+            raise CustomerHasReservationsException(record_id, len(keys))
+
+    def release_references(self, record_array, record_id):
+        """
+        Cancel the reservations referencing the hotel or customer
+        about to be deleted from record_array
+        """
+        with self.write_lock():
+            keys = self._referencing_keys(record_array, record_id)
+            if keys:
+                self._commit(deletes=[self._index_delete(key) for key in keys])
+
+    def columns(self):
+        """
+        Return the reservations as ReservationColumns, row i is the
+        reservation at position i, they are built from the index on the
+        first call and then kept up to date with every reservation
+        created, cancelled or replayed from the log
+        """
+        with self._lock:
+            self._load_index()
+            if self._columns is None:
+                self._columns = ReservationColumns.from_records(self)
+            return self._columns
+
+    def report(self):
+        """
+        Return the ReservationReport of the reservations, aggregated in
+        one pass on the first call and then kept up to date with every
+        reservation created, cancelled or replayed from the log
+        """
+        with self._lock:
+            self._load_index()
+            if self._report is None:
+                self._report = ReservationReport.from_records(self)
+            return self._report
+
+    def overlap_mask(self, from_date, to_date, hotel_id=None):
+        """
+        Return the mask of the reservations overlapping the dates
+        """
+        return self.columns().overlap_mask(from_date, to_date, hotel_id)
+
+    def occupancy(self, from_date, to_date, hotel_id=None):
+        """
+        Return the reserved rooms per hotel for every day of the dates
+        """
+        return self.columns().occupancy(from_date, to_date, hotel_id)
+
+    def cancel_where(self, mask):
+        """
+        Cancel the reservations selected by a mask of columns(),
+        persisted with a single write
+        Returns the cancelled reservations
+        """
+        with self.write_lock():
+            if len(mask) != len(self):
+                raise InvalidReservationMaskException(len(mask), len(self))
+            keys = [
+                self.record_key(record)
+                for record in itertools.compress(self, mask)
+            ]
+            cancelled = [self._index_delete(key) for key in keys]
+            if cancelled:
+                self._commit(deletes=cancelled)
+            return cancelled
+
+    def overlapping_reservations(self, hotel_id, from_date, to_date):
+        """
+        Return the reservations of a hotel overlapping the dates
+        Throws custom exception if the dates are not a valid interval
+        """
+        from_day, to_day = reservation_days(from_date, to_date)
+        with self._lock:
+            record_index = self._load_index()
+            intervals = self._hotel_intervals.get(hotel_id)
+            if intervals is None:
+                return []
+            return [
+                record_index[key]
+                for key in intervals.overlapping(from_day, to_day)
+            ]
+
+    def _occupancy(self, hotel_id):
+        """
+        Return the OccupancyTree of a hotel or None if it has no
+        reservation, trees are built from the intervals the first time
+        a hotel is asked about and then follow its reservations
+        """
+        occupancy = self._hotel_occupancy.get(hotel_id)
+        if occupancy is None:
+            intervals = self._hotel_intervals.get(hotel_id)
+            if intervals is None:
+                return None
+            occupancy = OccupancyTree()
+            for from_day, to_day, _ in intervals:
+                occupancy.add(from_day, to_day, 1)
+            self._hotel_occupancy[hotel_id] = occupancy
+        return occupancy
+
+    def reserved_rooms(self, hotel_id, from_date, to_date):
+        """
+        Return the most rooms of the hotel reserved on a night between
+        the dates
+        Throws custom exception if the dates are not a valid interval
+        """
+        from_day, to_day = reservation_days(from_date, to_date)
+        with self._lock:
+            self._load_index()
+            occupancy = self._occupancy(hotel_id)
+            if occupancy is None:
+                return 0
+            return occupancy.highest(from_day, to_day)
+
+    def is_hotel_available(self, hotel_id, from_date, to_date, rooms=1):
+        """
+        Return whether the hotel has rooms free rooms on every night
+        between the dates
+        Throws custom exception if the dates are not a valid interval
+        or if no hotel found by given id
+        """
+        from_day, to_day = reservation_days(from_date, to_date)
+        with self._lock:
+            self._load_index()
+            free_rooms = (
+                self.hotel_array.display_hotel_information(hotel_id).rooms
+                - rooms
+            )
+            intervals = self._hotel_intervals.get(hotel_id)
+            if free_rooms < 0 or intervals is None:
+                return free_rooms >= 0
+            # a few overlapping stays are counted, the tree answers
+            # for hotels with more of them than that
+            counted = min(free_rooms + 1, 8)
+            overlapping = sum(1 for _ in itertools.islice(
+                intervals.overlapping(from_day, to_day), counted
+            ))
+            if overlapping < counted:
+                return True
+            return (
+                self._occupancy(hotel_id).highest(from_day, to_day)
+                <= free_rooms
+            )
+
+    def check_rooms(self, record_array, hotel_id, rooms):
+        """
+        Throws custom exception if the hotel of record_array about to be left
+        with rooms rooms has more reserved on a night
+        """
+        if record_array is not self.hotel_array:
+            return
+        with self._lock:
+            self._load_index()
+            occupancy = self._occupancy(hotel_id)
+            reserved = 0 if occupancy is None else occupancy.peak()
+            if reserved > rooms:
+                raise HotelRoomsReservedException(hotel_id, rooms, reserved)
+
+    def available_hotel_ids(self, from_date, to_date, min_rooms=1,
+                            first_id=None, end_id=None):
+        """
+        Return the ids of the hotels with min_rooms free rooms on every
+        night between the dates in order, only of the hotels from
+        first_id up to but not including end_id when given
+
+        The rooms reserved per hotel on every night are kept up to date
+        with the reservations, so only the hotels of the range reserved
+        on the nights of the dates are compared with their rooms
+        Throws custom exception if the dates are not a valid interval
+        """
+        from_day, to_day = reservation_days(from_date, to_date)
+        with self._lock:
+            self._load_index()
+            reserved_nights = self._nights()
+            hotel_ids = self.hotel_array.hotel_ids_in(first_id, end_id)
+            if not hotel_ids:
+                return hotel_ids
+            first_id, last_id = hotel_ids[0], hotel_ids[-1]
+            hotel_rooms = self.hotel_array.hotel_rooms()
+            unavailable = self.hotel_array.hotel_ids_with_fewer_rooms(
+                min_rooms
+            )
+            for day in range(from_day, to_day):
+                for hotel_id, reserved in reserved_nights.get(
+                        day, {}).items():
+                    if (first_id <= hotel_id <= last_id
+                            and hotel_rooms.get(hotel_id, 0) - reserved
+                            < min_rooms):
+                        unavailable.add(hotel_id)
+        return list(itertools.filterfalse(unavailable.__contains__,
+                                          hotel_ids))
+
+    def available_hotels(self, from_date, to_date, min_rooms=1,
+                         executor=None, parts=None):
+        """
+        Return the hotels with min_rooms free rooms on every night
+        between the dates ordered by id, with an executor such as a
+        ProcessPoolExecutor the hotels are split in parts, by default
+        one per processor, ranges of ids with as many hotels each
+        searched by its workers on their own copy of the arrays
+        Throws custom exception if the dates are not a valid interval
+        """
+        reservation_days(from_date, to_date)
+        if executor is None:
+            hotel_ids = self.available_hotel_ids(
+                from_date, to_date, min_rooms
+            )
+        else:
+            parts = parts or os.cpu_count() or 1
+            hotel_ids = self.hotel_array.hotel_ids_in()
+            if hotel_ids:
+                bounds = [
+                    hotel_ids[len(hotel_ids) * part // parts]
+                    for part in range(parts)
+                ] + [hotel_ids[-1] + 1]
+                hotel_ids = itertools.chain.from_iterable(executor.map(
+                    functools.partial(
+                        _available_hotel_ids, self.array_files(),
+                        from_date, to_date, min_rooms
+                    ),
+                    bounds[:-1], bounds[1:]
+                ))
+        return self.hotel_array.records(hotel_ids)
+
+    def array_files(self):
+        """
+        Return the json file names and the storage modes of the hotel,
+        customer and reservation arrays
+        """
+        return tuple(
+            (record_array.hotels_json_file_name, record_array.storage_mode)
+            for record_array in (self.hotel_array, self.customer_array, self)
+        )
+
+    def _refresh_referenced_ids(self):
+        """
+        Revalidate the hotel and customer indexes against their files,
+        the id views are shared with the arrays and follow their deletes
+        """
+        self._hotel_ids = self.hotel_array.record_ids()
+        self._customer_ids = self.customer_array.record_ids()
+
+    def _check_references(self, hotel_id, customer_id):
+        """
+        Throws custom exception if the hotel or the customer do not exist
+        """
+        if hotel_id not in self._hotel_ids:
+            raise InvalidHotelForReservException(hotel_id)
+        if customer_id not in self._customer_ids:
+            raise InvalidCustomerForReservException(customer_id)
+
+    def _bulk_batch_started(self):
+        self._refresh_referenced_ids()
+
+    def _check_new(self, reservation):
+        """
+        Throws custom exception if the same customer already reserved
+        the hotel for the same dates, the reservation would replace it
+        instead of taking another room
+        """
+        if self.record_key(reservation) in self._record_index:
+            raise ReservationExistsException(
+                reservation.hotel_id, reservation.customer_id,
+                reservation.from_date, reservation.to_date
+            )
+
+    def _bulk_record(self, row):
+        reservation = Reservation.from_json(row)
+        self._check_references(reservation.hotel_id, reservation.customer_id)
+        self._check_new(reservation)
+        if not self.is_hotel_available(
+            reservation.hotel_id, reservation.from_date, reservation.to_date
+        ):
+            raise ReservationOverlapException(
+                reservation.hotel_id, reservation.from_date,
+                reservation.to_date
+            )
+        return reservation
+
+    def bulk_create(self, source, batch_size=1000):
+        """
+        Create the reservations of a JSONL file or an iterable of rows,
+        rows referencing unknown hotels or customers or overlapping an
+        existing booking are reported in the result errors, the json
+        file is written once
+        """
+        return self._bulk_create(source, batch_size)
+
+    def _new_reservation(self, hotel_id, customer_id, from_date, to_date):
+        """
+        Return a validated reservation, call it holding the write lock
+        with the referenced ids refreshed
+        """
+        self._check_references(hotel_id, customer_id)
+        hotel = Reservation()
+        hotel.hotel_id = hotel_id
+        hotel.customer_id = customer_id
+        hotel.from_date = from_date
+        hotel.to_date = to_date
+        self._check_new(hotel)
+        if not self.is_hotel_available(hotel_id, from_date, to_date):
+            raise ReservationOverlapException(hotel_id, from_date, to_date)
+        return hotel
+
+    def create_reservation(self, hotel_id, customer_id, from_date, to_date):
+        """
+        Create another hotel in the json file
+        """
+        if self.group_commit_enabled:
+            return self.submit_reservation(
+                hotel_id, customer_id, from_date, to_date
+            ).result()
+
+        with self.write_lock():
+            self._refresh_referenced_ids()
+            hotel = self._new_reservation(
+                hotel_id, customer_id, from_date, to_date
+            )
+            self._index_put(hotel)
+            self._commit(puts=[hotel])
+
+            return hotel
+
+    @property
+    def group_commit_enabled(self):
+        """
+        Whether create_reservation calls are queued for group commit
+        """
+        return self._group_commit_queue is not None
+
+    def enable_group_commit(self, max_delay=0.005, max_batch=256):
+        """
+        Queue create_reservation calls and persist them together, a
+        batch is written once it holds max_batch reservations or
+        max_delay seconds after its first one was queued
+        """
+        self.disable_group_commit()
+        with self._group_commit_lock:
+            self._group_commit_queue = queue.Queue()
+            self._group_commit_thread = threading.Thread(
+                target=self._group_commit_loop,
+                args=(self._group_commit_queue, max_delay, max_batch),
+                daemon=True
+            )
+            self._group_commit_thread.start()
+
+    def disable_group_commit(self):
+        """
+        Write the queued reservations and go back to one write per call
+        """
+        with self._group_commit_lock:
+            pending_queue = self._group_commit_queue
+            thread = self._group_commit_thread
+            self._group_commit_queue = None
+            self._group_commit_thread = None
+            if pending_queue is not None:
+                pending_queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def submit_reservation(self, hotel_id, customer_id, from_date, to_date):
+        """
+        Return a Future of the created reservation, with group commit
+        it is resolved once the batch holding it is written with the
+        configured durability
+        """
+        future = concurrent.futures.Future()
+        with self._group_commit_lock:
+            if self._group_commit_queue is not None:
+                self._group_commit_queue.put(
+                    ((hotel_id, customer_id, from_date, to_date), future)
+                )
+                return future
+
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(self.create_reservation(
+                hotel_id, customer_id, from_date, to_date
+            ))
+        except self.bulk_row_exceptions as exc:
+            future.set_exception(exc)
+        return future
+
+    def _group_commit_loop(self, pending_queue, max_delay, max_batch):
+        """
+        Collect the queued reservations into batches and commit them
+        until the queue is closed with None
+        """
+        closed = False
+        while not closed:
+            request = pending_queue.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + max_delay
+            while len(batch) < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = pending_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    closed = True
+                    break
+                batch.append(request)
+            self._commit_group(batch)
+
+    def _commit_group(self, batch):
+        """
+        Validate a batch of queued reservations and persist the valid
+        ones with a single write, then resolve their futures
+        """
+        accepted = []
+        try:
+            with self.write_lock():
+                self._refresh_referenced_ids()
+                for arguments, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        reservation = self._new_reservation(*arguments)
+                    except self.bulk_row_exceptions as exc:
+                        future.set_exception(exc)
+                        continue
+                    self._index_put(reservation)
+                    accepted.append((reservation, future))
+                if accepted:
+                    self._commit(
+                        puts=[reservation for reservation, _ in accepted]
+                    )
+        except Exception as exc:  # pylint: disable=broad-except
+            # the callers get the error, the index is loaded again
+            self._index_stamp = None
+            for _, future in batch:
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(exc)
+            return
+        for reservation, future in accepted:
+            future.set_result(reservation)
+
+    def cancel_reservation(self, hotel_id, customer_id, from_date, to_date):
+        """
+        Delete hotel in the json file by given id
+        Throws custom exception if no hotel found by given id
+        """
+        try:
+            reservation_composite_key = ReservationKey.of(
+                hotel_id, customer_id, from_date, to_date
+            )
+        except IDShouldBeIntException as exc:
+            raise ReservationNotFoundException(
+                f"{hotel_id}_{customer_id}_{from_date}_{to_date}"
+            ) from exc
+        with self.write_lock():
+            self._get_record(reservation_composite_key)
+            hotel = self._index_delete(reservation_composite_key)
+            self._commit(deletes=[hotel])
+
+
+ARRAY_CLASSES = {
+    "hotels": HotelArray,
+    "customers": CustomerArray,
+    "reservations": ReservationArray,
+}
+
+
+def json_to_binary_snapshot(array_class, json_file_name,
+                            snapshot_file_name):
+    """
+    Write the records of a json file of the array class as a binary
+    snapshot, returns the number of records
+    """
+    records = list(
+        iter_json_records(json_file_name, array_class.record_class)
+    )
+    write_file_atomically(snapshot_file_name, BinarySnapshot.data(
+        records, array_class.snapshot_fields, array_class.record_key,
+        array_class.encoder_class()
+    ))
+    return len(records)
+
+
+def binary_snapshot_to_json(array_class, snapshot_file_name,
+                            json_file_name):
+    """
+    Write the records of a binary snapshot of the array class as a
+    json file, returns the number of records
+    """
+    snapshot = BinarySnapshot(
+        snapshot_file_name, array_class.record_class,
+        array_class.snapshot_fields
+    )
+    try:
+        records = list(snapshot)
+    finally:
+        snapshot.close()
+    write_file_atomically(json_file_name, (
+        json.dumps(records, cls=array_class.encoder_class) + "\n"
+    ).encode("utf-8"))
+    return len(records)
+
+
+class AsyncReadWriteLock():
+    """
+    Asyncio lock shared by any number of readers or a single writer,
+    waiting writers go ahead of new readers
+    """
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        """
+        Hold the lock shared with the other readers
+        """
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: not self._writer and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        """
+        Hold the lock exclusively
+        """
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(
+                    lambda: not self._writer and not self._readers
+                )
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class AsyncJsonRecordArray():
+    """
+    Awaitable front of a record array, the blocking file I/O and json
+    parsing run in an executor so the event loop keeps serving
+    """
+
+    def __init__(self, record_array, executor=None):
+        self.array = record_array
+        self.executor = executor
+        self._rw_lock = AsyncReadWriteLock()
+
+    async def _run(self, function, *args):
+        """
+        Return the result of function run in the executor
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(function, *args)
+        )
+
+    async def _read(self, function, *args):
+        """
+        Run a read only method, concurrently with the other readers
+        """
+        async with self._rw_lock.read():
+            return await self._run(function, *args)
+
+    async def _write(self, function, *args):
+        """
+        Run a method changing the records, one writer at a time
+        """
+        async with self._rw_lock.write():
+            return await self._run(function, *args)
+
+    async def record_ids(self):
+        """
+        Return the keys of the stored records
+        """
+        return await self._read(self.array.record_ids)
+
+    async def bulk_create(self, source, batch_size=1000):
+        """
+        Create records from rows of json objects
+        """
+        return await self._write(self.array.bulk_create, source, batch_size)
+
+    async def compact(self):
+        """
+        Fold the write ahead log into the json snapshot
+        """
+        return await self._write(self.array.compact)
+
+
+class AsyncHotelArray(AsyncJsonRecordArray):
+    """
+    Awaitable front of a HotelArray
+    """
+
+    def __init__(self, hotel_array=None, executor=None):
+        super().__init__(
+            HotelArray() if hotel_array is None else hotel_array, executor
+        )
+
+    async def create_hotel(self, hotel_name, rooms=1):
+        """
+        Create another hotel in the json file
+        """
+        return await self._write(self.array.create_hotel, hotel_name, rooms)
+
+    async def delete_hotel(self, hotel_id, cascade=False):
+        """
+        Delete hotel in the json file by given id
+        """
+        return await self._write(self.array.delete_hotel, hotel_id, cascade)
+
+    async def display_hotel_information(self, hotel_id):
+        """
+        Return hotel information for a given id
+        """
+        return await self._read(
+            self.array.display_hotel_information, hotel_id
+        )
+
+    async def search_hotels(self, query, limit=10):
+        """
+        Return the hotels whose name best matches a query
+        """
+        return await self._read(self.array.search_hotels, query, limit)
+
+    async def modify_hotel_information(self, hotel_id, hotel_name,
+                                       expected_version=None, rooms=None):
+        """
+        modify hotel information for a given id
+        """
+        return await self._write(
+            self.array.modify_hotel_information, hotel_id, hotel_name,
+            expected_version, rooms
+        )
+
+
+class AsyncCustomerArray(AsyncJsonRecordArray):
+    """
+    Awaitable front of a CustomerArray
+    """
+
+    def __init__(self, customer_array=None, executor=None):
+        super().__init__(
+            CustomerArray() if customer_array is None else customer_array,
+            executor
+        )
+
+    async def create_customer(self, customer_name):
+        """
+        Create another customer in the json file
+        """
+        return await self._write(self.array.create_customer, customer_name)
+
+    async def delete_customer(self, customer_id, cascade=False):
+        """
+        Delete customer in the json file by given id
+        """
+        return await self._write(
+            self.array.delete_customer, customer_id, cascade
+        )
+
+    async def display_customer_information(self, customer_id):
+        """
+        Return customer information for a given id
+        """
+        return await self._read(
+            self.array.display_customer_information, customer_id
+        )
+
+    async def search_customers(self, query, limit=10):
+        """
+        Return the customers whose name best matches a query
+        """
+        return await self._read(self.array.search_customers, query, limit)
+
+    async def modify_customer_information(self, customer_id, customer_name,
+                                          expected_version=None):
+        """
+        modify customer information for a given id
+        """
+        return await self._write(
+            self.array.modify_customer_information, customer_id,
+            customer_name, expected_version
+        )
+
+
+class AsyncReservationArray(AsyncJsonRecordArray):
+    """
+    Awaitable front of a ReservationArray
+    """
+
+    async def create_reservation(self, hotel_id, customer_id, from_date,
+                                 to_date):
+        """
+        Create another reservation, with group commit enabled the
+        reservation joins the pending batch instead of taking the lock
+        """
+        arguments = (hotel_id, customer_id, from_date, to_date)
+        if self.array.group_commit_enabled:
+            return await asyncio.wrap_future(
+                self.array.submit_reservation(*arguments)
+            )
+        return await self._write(self.array.create_reservation, *arguments)
+
+    async def cancel_reservation(self, hotel_id, customer_id, from_date,
+                                 to_date):
+        """
+        Delete the reservation with the given key
+        """
+        return await self._write(
+            self.array.cancel_reservation, hotel_id, customer_id,
+            from_date, to_date
+        )
+
+    async def cancel_where(self, mask):
+        """
+        Cancel the reservations selected by a columns mask
+        """
+        return await self._write(self.array.cancel_where, mask)
+
+    async def reservations_for_hotel(self, hotel_id):
+        """
+        Return the reservations of a hotel ordered by date
+        """
+        return await self._read(self.array.reservations_for_hotel, hotel_id)
+
+    async def reservations_for_customer(self, customer_id):
+        """
+        Return the reservations of a customer ordered by date
+        """
+        return await self._read(
+            self.array.reservations_for_customer, customer_id
+        )
+
+    async def overlapping_reservations(self, hotel_id, from_date, to_date):
+        """
+        Return the reservations of a hotel overlapping the dates
+        """
+        return await self._read(
+            self.array.overlapping_reservations, hotel_id, from_date, to_date
+        )
+
+    async def is_hotel_available(self, hotel_id, from_date, to_date,
+                                 rooms=1):
+        """
+        Return whether the hotel has rooms free between the dates
+        """
+        return await self._read(
+            self.array.is_hotel_available, hotel_id, from_date, to_date,
+            rooms
+        )
+
+    async def reserved_rooms(self, hotel_id, from_date, to_date):
+        """
+        Return the most rooms of the hotel reserved on a night
+        """
+        return await self._read(
+            self.array.reserved_rooms, hotel_id, from_date, to_date
+        )
+
+    async def available_hotels(self, from_date, to_date, min_rooms=1):
+        """
+        Return the hotels with min_rooms free rooms between the dates
+        """
+        return await self._read(
+            self.array.available_hotels, from_date, to_date, min_rooms
+        )
+
+    async def occupancy(self, from_date, to_date, hotel_id=None):
+        """
+        Return the reserved rooms per hotel for every day of the dates
+        """
+        return await self._read(
+            self.array.occupancy, from_date, to_date, hotel_id
+        )
+
+    async def report(self):
+        """
+        Return the reservation report, refreshed with the changes
+        """
+        return await self._read(self.array.report)
+
+
+class UnknownOperationException(Exception):
+    """A custom exception."""
+    def __init__(self, operation):
+        message = (
+            f"Operation {operation} is unknown, please use one of "
+            f"{', '.join(sorted(ReservationService.OPERATIONS))}"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class ServiceEncoder(json.JSONEncoder):
+    '''
+    Encoder for the results of the reservation service
+    '''
+
+    def default(self, o):
+        for encoder_class in (HotelEncoder, CustomerEncoder,
+                              ReservationEncoder):
+            try:
+                return encoder_class.default(self, o)
+            except TypeError:
+                pass
+        return json.JSONEncoder.default(self, o)
+
+
+class ReservationService():
+    """
+    Operations on warm hotel, customer and reservation arrays, each
+    request is a json object {"request_id": ..., "op": ..., "params":
+    {...}} answered with {"request_id": ..., "ok": ..., "result" or
+    "error" and "message"}
+
+    OPERATIONS maps every operation to its array, its method and the
+    parameter holding the hotel or customer id it works on, None for
+    the operations which are not about a single record
+    """
+    OPERATIONS = {
+        "create_hotel": ("hotels", "create_hotel", None),
+        "delete_hotel": ("hotels", "delete_hotel", "hotel_id"),
+        "display_hotel_information": (
+            "hotels", "display_hotel_information", "hotel_id"
+        ),
+        "modify_hotel_information": (
+            "hotels", "modify_hotel_information", "hotel_id"
+        ),
+        "search_hotels": ("hotels", "search_hotels", None),
+        "create_customer": ("customers", "create_customer", None),
+        "delete_customer": ("customers", "delete_customer", "customer_id"),
+        "display_customer_information": (
+            "customers", "display_customer_information", "customer_id"
+        ),
+        "modify_customer_information": (
+            "customers", "modify_customer_information", "customer_id"
+        ),
+        "search_customers": ("customers", "search_customers", None),
+        "create_reservation": (
+            "reservations", "create_reservation", "hotel_id"
+        ),
+        "cancel_reservation": (
+            "reservations", "cancel_reservation", "hotel_id"
+        ),
+        "reservations_for_hotel": (
+            "reservations", "reservations_for_hotel", "hotel_id"
+        ),
+        "reservations_for_customer": (
+            "reservations", "reservations_for_customer", None
+        ),
+        "overlapping_reservations": (
+            "reservations", "overlapping_reservations", "hotel_id"
+        ),
+        "is_hotel_available": (
+            "reservations", "is_hotel_available", "hotel_id"
+        ),
+        "reserved_rooms": ("reservations", "reserved_rooms", "hotel_id"),
+        "available_hotels": ("reservations", "available_hotels", None),
+    }
+
+    def __init__(self, hotels=None, customers=None, reservations=None):
+        self.hotels = HotelArray() if hotels is None else hotels
+        self.customers = CustomerArray() if customers is None else customers
+        self.reservations = (
+            ReservationArray(self.hotels, self.customers)
+            if reservations is None else reservations
+        )
+
+    def _method(self, operation):
+        """
+        Return the array method running an operation
+        """
+        try:
+            attribute, method_name, _ = self.OPERATIONS[operation]
+        except (KeyError, TypeError) as exc:
+            raise UnknownOperationException(operation) from exc
+        return getattr(getattr(self, attribute), method_name)
+
+    @staticmethod
+    def response(request_id, result=None, exception=None):
+        """
+        Return the response object of a request
+        """
+        if exception is None:
+            return {"request_id": request_id, "ok": True, "result": result}
+        return {
+            "request_id": request_id, "ok": False,
+            "error": type(exception).__name__,
+            "message": getattr(exception, "message", str(exception)),
+        }
+
+    def apply(self, request):
+        """
+        Run one request and return its response
+        """
+        request_id = None
+        try:
+            request_id = request.get("request_id")
+            method = self._method(request.get("op"))
+            result = method(**request.get("params", {}))
+        except Exception as exc:  # pylint: disable=broad-except
+            # every failure is reported to the client in the response
+            return self.response(request_id, exception=exc)
+        return self.response(request_id, result)
+
+    def apply_batch(self, requests):
+        """
+        Run the requests in order and return their responses, with
+        group commit enabled consecutive create_reservation requests
+        are written together
+        """
+        responses = []
+        pending = []
+
+        def resolve_pending():
+            for request_id, future in pending:
+                try:
+                    responses.append(
+                        self.response(request_id, future.result())
+                    )
+                except Exception as exc:  # pylint: disable=broad-except
+                    responses.append(self.response(request_id,
+                                                   exception=exc))
+            pending.clear()
+
+        for request in requests:
+            if (self.reservations.group_commit_enabled
+                    and isinstance(request, dict)
+                    and request.get("op") == "create_reservation"):
+                try:
+                    future = self.reservations.submit_reservation(
+                        **request.get("params", {})
+                    )
+                except TypeError as exc:
+                    future = concurrent.futures.Future()
+                    future.set_exception(exc)
+                pending.append((request.get("request_id"), future))
+                continue
+            resolve_pending()
+            if not isinstance(request, dict):
+                responses.append(self.response(
+                    None, exception=UnknownOperationException(request)
+                ))
+                continue
+            responses.append(self.apply(request))
+        resolve_pending()
+        return responses
+
+    @staticmethod
+    def dumps(response):
+        """
+        Return a response as a line of json
+        """
+        return json.dumps(response, cls=ServiceEncoder)
+
+
+class ReservationRequestHandler(http.server.BaseHTTPRequestHandler):
+    '''
+    Handler of the reservation service, POST /op takes one request as
+    json and POST /batch takes requests as json lines
+    '''
+    protocol_version = "HTTP/1.1"
+    # headers and body are written apart, keep-alive would wait on acks
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length < 0:
+            raise ValueError(f"Content-Length {length} is negative")
+        return self.rfile.read(length).decode("utf-8")
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        '''
+        Answer the health check
+        '''
+        if self.path == "/health":
+            self._send(200, json.dumps({"ok": True}))
+        else:
+            self._send(404, json.dumps({"ok": False, "error": "NotFound"}))
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        '''
+        Run a request or a batch of requests
+        '''
+        service = self.server.service
+        try:
+            body = self._body()
+        except ValueError as exc:
+            # a Content-Length which is not a number or a body which is
+            # not utf-8, what is left of it cannot be told from the next
+            # request so the connection is closed
+            self.close_connection = True
+            self._send(400, service.dumps(
+                service.response(None, exception=exc)
+            ))
+            return
+        if self.path == "/op":
+            try:
+                request = json.loads(body)
+            except ValueError as exc:
+                self._send(400, service.dumps(
+                    service.response(None, exception=exc)
+                ))
+                return
+            self._send(200, service.dumps(service.apply(request)))
+        elif self.path == "/batch":
+            requests = []
+            for line in body.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    requests.append(json.loads(line))
+                except ValueError:
+                    requests.append(line)
+            self._send(200, "".join(
+                service.dumps(response) + "\n"
+                for response in service.apply_batch(requests)
+            ), "application/x-ndjson")
+        else:
+            self._send(404, json.dumps({"ok": False, "error": "NotFound"}))
+
+
+def make_server(host="127.0.0.1", port=8080, service=None):
+    """
+    Return a threading http server of the reservation service, the
+    arrays stay loaded between requests
+    """
+    server = http.server.ThreadingHTTPServer(
+        (host, port), ReservationRequestHandler
+    )
+    server.daemon_threads = True
+    server.service = ReservationService() if service is None else service
+    return server
+
+
+def serve(host="127.0.0.1", port=8080, storage_mode=STORAGE_MODE_JSON,
+          group_commit=False):
+    """
+    Serve the reservation service until interrupted
+    """
+    service = ReservationService()
+    for record_array in (service.hotels, service.customers,
+                         service.reservations):
+        record_array.storage_mode = storage_mode
+    if group_commit:
+        service.reservations.enable_group_commit()
+    server = make_server(host, port, service)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.reservations.disable_group_commit()
+
+
+def shard_of(key, shards):
+    """
+    Return the shard of a hotel or customer id, ids are handed out
+    round the shards so consecutive ids land on different shards,
+    values which are not ids are sent to the first shard to be
+    rejected there
+    """
+    if not isinstance(key, int):
+        return 0
+    return (key - 1) % shards
+
+
+class MissingShardKeyException(Exception):
+    """A custom exception."""
+    def __init__(self, operation, key_name):
+        message = (
+            f"Operation {operation} needs the {key_name} parameter "
+            f"to find its shard"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+class ShardedIds():
+    '''
+    Class to test ids against the record ids of the shard array
+    holding them
+    '''
+    __slots__ = ('arrays',)
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def __contains__(self, key):
+        shard = shard_of(key, len(self.arrays))
+        return key in self.arrays[shard].record_ids()
+
+
+class ShardReservationArray(ReservationArray):
+    """
+    Reservations of one shard, they live in the shard of their hotel
+    so availability is checked within the shard, their customers may
+    live in any shard
+    """
+
+    def __init__(self, hotel_array, customer_arrays, *args, **kwargs):
+        customer_arrays = list(customer_arrays)
+        super().__init__(
+            hotel_array, customer_arrays[hotel_array.id_shard],
+            *args, **kwargs
+        )
+        for customer_array in customer_arrays:
+            if not isinstance(customer_array, CustomerArray):
+                raise InvalidCustomerArrayParamException()
+            if customer_array is not self.customer_array:
+                customer_array.add_referencing_array(self)
+        self.customer_arrays = customer_arrays
+
+    def _refresh_referenced_ids(self):
+        self._hotel_ids = self.hotel_array.record_ids()
+        self._customer_ids = ShardedIds(self.customer_arrays)
+
+
+def _shard_services(directory, shards, storage_mode=STORAGE_MODE_JSON,
+                    durability=DURABILITY_NONE):
+    """
+    Return a ReservationService per shard on the json files of the
+    shard-<i> directories of directory
+    """
+    def shard_array(record_array, shard):
+        shard_directory = os.path.join(directory, f"shard-{shard}")
+        os.makedirs(shard_directory, exist_ok=True)
+        record_array.id_shard = shard
+        record_array.id_shards = shards
+        record_array.hotels_json_file_name = os.path.join(
+            shard_directory, record_array.default_json_file_name
+        )
+        record_array.storage_mode = storage_mode
+        record_array.durability = durability
+        return record_array
+
+    # the reservations of a shard take the customers of their shard
+    # from the id_shard of its hotels, set before they are built
+    hotel_arrays = [
+        shard_array(HotelArray(), shard) for shard in range(shards)
+    ]
+    customer_arrays = [
+        shard_array(CustomerArray(), shard) for shard in range(shards)
+    ]
+    return [
+        ReservationService(hotels, customers, shard_array(
+            ShardReservationArray(hotels, customer_arrays), shard
+        ))
+        for shard, (hotels, customers) in enumerate(
+            zip(hotel_arrays, customer_arrays)
+        )
+    ]
+
+
+_SHARD_SERVICES = {}
+
+
+def _shard_call(directory, shards, storage_mode, method_name, arguments,
+                shard):
+    """
+    Run a reservation array method on a shard in a worker process,
+    the shards stay loaded between calls
+    """
+    services = _SHARD_SERVICES.get((directory, shards, storage_mode))
+    if services is None:
+        services = _shard_services(directory, shards, storage_mode)
+        _SHARD_SERVICES[(directory, shards, storage_mode)] = services
+    return getattr(services[shard].reservations, method_name)(*arguments)
+
+
+_AVAILABILITY_ARRAYS = {}
+
+
+def _available_hotel_ids(array_files, from_date, to_date, min_rooms,
+                         first_id, end_id):
+    """
+    Return the available hotel ids of a range of the hotels in a worker
+    process, the arrays stay loaded between calls
+    """
+    reservations = _AVAILABILITY_ARRAYS.get(array_files)
+    if reservations is None:
+        record_arrays = []
+        for array_class, (json_file_name, storage_mode) in zip(
+                (HotelArray, CustomerArray), array_files):
+            record_array = array_class()
+            record_array.hotels_json_file_name = json_file_name
+            record_array.storage_mode = storage_mode
+            record_arrays.append(record_array)
+        reservations = ReservationArray(*record_arrays)
+        json_file_name, storage_mode = array_files[2]
+        reservations.hotels_json_file_name = json_file_name
+        reservations.storage_mode = storage_mode
+        _AVAILABILITY_ARRAYS[array_files] = reservations
+    return reservations.available_hotel_ids(
+        from_date, to_date, min_rooms, first_id, end_id
+    )
+
+
+class ShardedReservationService(ReservationService):
+    """
+    ReservationService on hotel, customer and reservation arrays split
+    in shards, the shard-<i> directories of directory. Hotels and
+    customers live in the shard of their id, see shard_of, and
+    reservations in the shard of their hotel, so point operations are
+    routed to a single shard and new hotels and customers are spread
+    round the shards. The reservations of a customer are gathered from
+    every shard, in the worker processes of executor when given
+    """
+
+    def __init__(self, directory, shards=4, storage_mode=STORAGE_MODE_JSON,
+                 executor=None, durability=DURABILITY_NONE):
+        # pylint: disable=super-init-not-called
+        # the arrays of the shards replace the ones of the base class
+        self.directory = directory
+        self.storage_mode = storage_mode
+        self.executor = executor
+        self.shards = _shard_services(
+            directory, shards, storage_mode, durability
+        )
+        self._next_shards = itertools.count()
+
+    def shard(self, key):
+        """
+        Return the ReservationService of the shard holding a hotel or
+        customer id
+        """
+        return self.shards[shard_of(key, len(self.shards))]
+
+    def _method(self, operation):
+        try:
+            attribute, method_name, key_name = self.OPERATIONS[operation]
+        except (KeyError, TypeError) as exc:
+            raise UnknownOperationException(operation) from exc
+        if method_name in ("reservations_for_customer", "search_hotels",
+                           "search_customers", "available_hotels"):
+            return getattr(self, method_name)
+        if method_name in ("create_hotel", "create_customer"):
+            shard = next(self._next_shards) % len(self.shards)
+            return getattr(getattr(self.shards[shard], attribute),
+                           method_name)
+
+        def routed(*args, **kwargs):
+            # every other operation takes the hotel or customer id first,
+            # the customer methods name their id parameter hotel_id
+            if not args:
+                for name in (key_name, "hotel_id"):
+                    if name in kwargs:
+                        args = (kwargs.pop(name),)
+                        break
+                else:
+                    raise MissingShardKeyException(operation, key_name)
+            return getattr(getattr(self.shard(args[0]), attribute),
+                           method_name)(*args, **kwargs)
+        return routed
+
+    def apply_batch(self, requests):
+        """
+        Run the requests in order and return their responses
+        """
+        return [
+            self.apply(request) if isinstance(request, dict)
+            else self.response(
+                None, exception=UnknownOperationException(request)
+            )
+            for request in requests
+        ]
+
+    def reservations_for_customer(self, customer_id):
+        """
+        Return the reservations of a customer in every shard ordered
+        by dates
+        """
+        if self.executor is None:
+            parts = [
+                service.reservations.reservations_for_customer(customer_id)
+                for service in self.shards
+            ]
+        else:
+            parts = list(self.executor.map(
+                functools.partial(
+                    _shard_call, self.directory, len(self.shards),
+                    self.storage_mode, "reservations_for_customer",
+                    (customer_id,)
+                ),
+                range(len(self.shards))
+            ))
+        return list(heapq.merge(*parts, key=lambda reservation: (
+            str(reservation.from_date), str(reservation.to_date),
+            reservation.hotel_id
+        )))
+
+    def available_hotels(self, from_date, to_date, min_rooms=1):
+        """
+        Return the hotels of every shard with min_rooms free rooms on
+        every night between the dates ordered by id
+        """
+        arguments = (from_date, to_date, min_rooms)
+        if self.executor is None:
+            parts = [
+                service.reservations.available_hotels(*arguments)
+                for service in self.shards
+            ]
+        else:
+            parts = list(self.executor.map(
+                functools.partial(
+                    _shard_call, self.directory, len(self.shards),
+                    self.storage_mode, "available_hotels", arguments
+                ),
+                range(len(self.shards))
+            ))
+        return list(heapq.merge(
+            *parts, key=operator.attrgetter("hotel_id")
+        ))
+
+    def _search(self, attribute, method_name, query, limit):
+        """
+        Return the best matches of a query among the best matches of
+        every shard
+        """
+        record_array = getattr(self.shards[0], attribute)
+        query_words = search_words(query)
+        ranked = [
+            (
+                NameIndex.rank(query_words, search_words(
+                    getattr(record, record_array.search_field)
+                )),
+                record_array.record_key(record), record
+            )
+            for service in self.shards
+            for record in getattr(getattr(service, attribute), method_name)(
+                query, limit
+            )
+        ]
+        return [
+            record for _, _, record
+            in heapq.nsmallest(limit, ranked, key=lambda entry: entry[:2])
+        ]
+
+    def search_hotels(self, query, limit=10):
+        """
+        Return the hotels of every shard whose name best matches a
+        query
+        """
+        return self._search("hotels", "search_hotels", query, limit)
+
+    def search_customers(self, query, limit=10):
+        """
+        Return the customers of every shard whose name best matches a
+        query
+        """
+        return self._search("customers", "search_customers", query, limit)
+
+
+def benchmark_record_classes(records=100000):
+    """
+    Measure the records per second and the bytes per record of the
+    validated and trusted json constructors of the record classes
+    """
+    samples = {
+        Hotel: lambda number: {
+            "hotel_id": number, "hotel_name": f"Hotel {number}"
+        },
+        Customer: lambda number: {
+            "customer_id": number, "customer_name": f"Customer {number}"
+        },
+        Reservation: lambda number: {
+            "hotel_id": number % 1000 + 1, "customer_id": number + 1,
+            "from_date": datetime.date.fromordinal(
+                739000 + number % 365
+            ).isoformat(),
+            "to_date": datetime.date.fromordinal(
+                739001 + number % 365
+            ).isoformat()
+        },
+    }
+    results = {}
+    for record_class, sample in samples.items():
+        json_objects = [sample(number) for number in range(records)]
+        for constructor_name in ("from_json", "from_trusted_json"):
+            constructor = getattr(record_class, constructor_name)
+
+            started = time.perf_counter()
+            loaded = list(map(constructor, json_objects))
+            elapsed = time.perf_counter() - started
+            del loaded
+
+            tracemalloc.start()
+            loaded = list(map(constructor, json_objects))
+            allocated, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del loaded
+
+            results[f"{record_class.__name__}.{constructor_name}"] = {
+                "records_per_second": round(records / elapsed),
+                "bytes_per_record": round(allocated / records, 1),
+            }
+    return results
+
+
+def benchmark_durability(operations=200, records=1000):
+    """
+    Measure the modify_hotel_information throughput of every
+    durability level in every storage mode on a database of records
+    """
+    results = {}
+    for storage_mode in STORAGE_MODES:
+        for durability in DURABILITY_LEVELS:
+            with tempfile.TemporaryDirectory() as directory:
+                hotels = HotelArray()
+                hotels.hotels_json_file_name = os.path.join(
+                    directory, "hotels.json"
+                )
+                hotels.storage_mode = storage_mode
+                hotels.bulk_create(
+                    {"hotel_name": f"Hotel {number}"}
+                    for number in range(records)
+                )
+                hotels.durability = durability
+
+                started = time.perf_counter()
+                for number in range(operations):
+                    hotels.modify_hotel_information(
+                        number % records + 1, f"Renamed {number}"
+                    )
+                elapsed = time.perf_counter() - started
+
+            results[f"{storage_mode}.{durability}"] = {
+                "operations_per_second": round(operations / elapsed),
+                "mean_latency_ms": round(elapsed / operations * 1000, 3),
+            }
+    return results
+
+
+def benchmark_cold_start(sizes=(1000, 10000, 100000, 1000000)):
+    """
+    Measure how long a new HotelArray takes to answer its first
+    display_hotel_information from json and from a binary snapshot
+    """
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            json_file_name = os.path.join(directory, "hotels.json")
+            hotels = HotelArray()
+            hotels.hotels_json_file_name = json_file_name
+            hotels.bulk_create(
+                {"hotel_name": f"Hotel {number}"} for number in range(size)
+            )
+            json_to_binary_snapshot(
+                HotelArray, json_file_name, hotels.snapshot_file_name
+            )
+            del hotels
+
+            for storage_mode in (STORAGE_MODE_JSON, STORAGE_MODE_SNAPSHOT):
+                started = time.perf_counter()
+                hotels = HotelArray()
+                hotels.hotels_json_file_name = json_file_name
+                hotels.storage_mode = storage_mode
+                hotels.display_hotel_information(size // 2 + 1)
+                first_lookup = time.perf_counter() - started
+
+                started = time.perf_counter()
+                hotels.display_hotel_information(size // 3 + 1)
+                second_lookup = time.perf_counter() - started
+                del hotels
+                results[f"{storage_mode}[{size}]"] = {
+                    "first_lookup_ms": round(first_lookup * 1000, 3),
+                    "next_lookup_ms": round(second_lookup * 1000, 3),
+                }
+    return results
+
+
+def benchmark_group_commit(operations=1000, threads=64,
+                           storage_mode=STORAGE_MODE_WAL,
+                           durability=DURABILITY_FSYNC):
+    """
+    Compare the create_reservation throughput of one write per call
+    against group commit, fed by threads calling create_reservation
+    and by a single thread submitting futures
+    """
+    results = {}
+    for mode in ("sequential", "group_threads", "group_submit"):
+        with tempfile.TemporaryDirectory() as directory:
+            hotels = HotelArray()
+            hotels.hotels_json_file_name = os.path.join(
+                directory, "hotels.json"
+            )
+            customers = CustomerArray()
+            customers.hotels_json_file_name = os.path.join(
+                directory, "customers.json"
+            )
+            reservations = ReservationArray(hotels, customers)
+            reservations.hotels_json_file_name = os.path.join(
+                directory, "reservations.json"
+            )
+            reservations.storage_mode = storage_mode
+            reservations.durability = durability
+            hotel_id = hotels.create_hotel("Benchmark").hotel_id
+            customer_id = customers.create_customer("Benchmark").customer_id
+            start_day = datetime.date(2024, 1, 1).toordinal()
+            requests = [
+                (
+                    hotel_id, customer_id,
+                    str(datetime.date.fromordinal(start_day + number)),
+                    str(datetime.date.fromordinal(start_day + number + 1)),
+                )
+                for number in range(operations)
+            ]
+
+            started = time.perf_counter()
+            if mode == "sequential":
+                for request in requests:
+                    reservations.create_reservation(*request)
+            else:
+                reservations.enable_group_commit()
+                if mode == "group_threads":
+                    with concurrent.futures.ThreadPoolExecutor(
+                            threads) as executor:
+                        list(executor.map(
+                            lambda request: reservations.create_reservation(
+                                *request
+                            ),
+                            requests
+                        ))
+                else:
+                    futures = [
+                        reservations.submit_reservation(*request)
+                        for request in requests
+                    ]
+                    for future in futures:
+                        future.result()
+                reservations.disable_group_commit()
+            elapsed = time.perf_counter() - started
+
+            stored = ReservationArray(hotels, customers)
+            stored.hotels_json_file_name = reservations.hotels_json_file_name
+            stored.storage_mode = storage_mode
+            results[mode] = {
+                "storage_mode": storage_mode,
+                "durability": durability,
+                "operations_per_second": round(operations / elapsed),
+                "stored_reservations": len(stored.record_ids()),
+            }
+    return results
+
+
+def _shard_writer(directory, shards, storage_mode, durability, operations):
+    """
+    Create hotels through a sharded service in a benchmark worker,
+    returns when it started and finished and its failures
+    """
+    service = ShardedReservationService(
+        directory, shards, storage_mode, durability=durability
+    )
+    started = time.monotonic()
+    failures = sum(
+        not service.apply({
+            "op": "create_hotel", "params": {"hotel_name": f"Hotel {number}"}
+        })["ok"]
+        for number in range(operations)
+    )
+    return started, time.monotonic(), failures
+
+
+def benchmark_shards(shard_counts=(1, 2, 4, 8), operations=2000, workers=8,
+                     storage_mode=STORAGE_MODE_JSON,
+                     durability=DURABILITY_NONE):
+    """
+    Measure the create_hotel throughput of writer processes sharing a
+    ShardedReservationService directory for every count of shards,
+    every shard has its own files and lock so writers of different
+    shards do not wait for each other
+    """
+    results = {}
+    for shards in shard_counts:
+        with tempfile.TemporaryDirectory() as directory, \
+                concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            _shard_services(directory, shards, storage_mode)
+            futures = [
+                executor.submit(
+                    _shard_writer, directory, shards, storage_mode,
+                    durability, operations // workers
+                )
+                for _ in range(workers)
+            ]
+            runs = [future.result() for future in futures]
+            elapsed = (
+                max(finished for _, finished, _ in runs)
+                - min(started for started, _, _ in runs)
+            )
+            stored = sum(
+                len(service.hotels.record_ids())
+                for service in _shard_services(directory, shards, storage_mode)
+            )
+            writes = operations // workers * workers
+            results[shards] = {
+                "storage_mode": storage_mode,
+                "durability": durability,
+                "workers": workers,
+                "operations_per_second": round(writes / elapsed),
+                "failures": sum(failures for _, _, failures in runs),
+                "stored_hotels": stored,
+            }
+    return results
+
+
+def _stress_hotels(json_file_name, storage_mode, id_block_size=1):
+    """
+    Return a HotelArray on the stress test database
+    """
+    hotels = HotelArray()
+    hotels.hotels_json_file_name = json_file_name
+    hotels.storage_mode = storage_mode
+    hotels.id_block_size = id_block_size
+    return hotels
+
+
+def _stress_writer(json_file_name, storage_mode, operations,
+                   id_block_size):
+    """
+    Create hotels from a worker process, returns their ids
+    """
+    hotels = _stress_hotels(json_file_name, storage_mode, id_block_size)
+    return [
+        hotels.create_hotel(f"Hotel {os.getpid()} {number}").hotel_id
+        for number in range(operations)
+    ]
+
+
+def _stress_reader(json_file_name, storage_mode, operations, _):
+    """
+    Look hotels up from a worker process, returns the lookups found
+    """
+    hotels = _stress_hotels(json_file_name, storage_mode)
+    found = 0
+    for number in range(operations):
+        try:
+            hotels.display_hotel_information(number + 1)
+            found += 1
+        except HotelNotFoundException:
+            pass
+    return found
+
+
+def stress_concurrent_writers(workers=4, operations=250, readers=2,
+                              storage_mode=STORAGE_MODE_JSON,
+                              id_block_size=1):
+    """
+    Run writer and reader processes against one hotels file and
+    report the throughput, the hotels lost and the ids handed out twice
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        json_file_name = os.path.join(directory, "hotels.json")
+        arguments = (json_file_name, storage_mode, operations, id_block_size)
+        started = time.perf_counter()
+        with multiprocessing.Pool(workers + readers) as pool:
+            writes = [
+                pool.apply_async(_stress_writer, arguments)
+                for _ in range(workers)
+            ]
+            reads = [
+                pool.apply_async(_stress_reader, arguments)
+                for _ in range(readers)
+            ]
+            hotel_ids = [
+                hotel_id for write in writes for hotel_id in write.get()
+            ]
+            lookups = sum(read.get() for read in reads)
+        elapsed = time.perf_counter() - started
+
+        stored_hotels = len(
+            _stress_hotels(json_file_name, storage_mode).record_ids()
+        )
+
+    return {
+        "storage_mode": storage_mode,
+        "writers": workers,
+        "readers": readers,
+        "writes": len(hotel_ids),
+        "writes_per_second": round(len(hotel_ids) / elapsed),
+        "lookups_found": lookups,
+        "stored_hotels": stored_hotels,
+        "lost_updates": workers * operations - stored_hotels,
+        "duplicate_ids": len(hotel_ids) - len(set(hotel_ids)),
+    }
+
+
+def percentile(sorted_values, fraction):
+    """
+    Return the value below which the fraction of the sorted values lie
+    """
+    if not sorted_values:
+        return None
+    position = min(len(sorted_values) - 1,
+                   max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[position]
+
+
+def _load_connection(host, port, requests, batch_size, write_every):
+    """
+    Send requests over one keep-alive connection, returns the latency
+    of every http request and the failed operations
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    latencies = []
+    failures = 0
+    try:
+        for first in range(0, requests, max(1, batch_size)):
+            operations = [
+                {"request_id": number, "op": "create_hotel",
+                 "params": {"hotel_name": f"Load {number}"}}
+                if number % write_every == 0 else
+                {"request_id": number, "op": "display_hotel_information",
+                 "params": {"hotel_id": 1}}
+                for number in range(first,
+                                    min(requests, first + max(1, batch_size)))
+            ]
+            if batch_size > 1:
+                path = "/batch"
+                body = "".join(json.dumps(op) + "\n" for op in operations)
+            else:
+                path, body = "/op", json.dumps(operations[0])
+
+            started = time.perf_counter()
+            connection.request("POST", path, body,
+                               {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            data = response.read().decode("utf-8")
+            latencies.append(time.perf_counter() - started)
+
+            failures += sum(
+                not json.loads(line)["ok"] for line in data.splitlines()
+                if line.strip()
+            )
+    finally:
+        connection.close()
+    return latencies, failures
+
+
+def generate_load(host="127.0.0.1", port=8080, requests=2000,
+                  connections=4, batch_size=1, write_every=10):
+    """
+    Drive a running reservation service from keep-alive connections,
+    one request in write_every creates a hotel and the rest display
+    one, and report the latency percentiles and the throughput
+    """
+    setup = http.client.HTTPConnection(host, port, timeout=60)
+    setup.request("POST", "/op", json.dumps({
+        "request_id": "setup", "op": "create_hotel",
+        "params": {"hotel_name": "Load"}
+    }))
+    setup.getresponse().read()
+    setup.close()
+
+    share, extra = divmod(requests, connections)
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(connections) as executor:
+        results = list(executor.map(
+            lambda number: _load_connection(
+                host, port, share + (number < extra), batch_size,
+                write_every
+            ),
+            range(connections)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(
+        latency for latencies, _ in results for latency in latencies
+    )
+    return {
+        "operations": requests,
+        "http_requests": len(latencies),
+        "connections": connections,
+        "batch_size": batch_size,
+        "failures": sum(failures for _, failures in results),
+        "operations_per_second": round(requests / elapsed),
+        "requests_per_second": round(len(latencies) / elapsed),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+REPLAY_MODE_SINGLE = "single"
+REPLAY_MODE_THREAD = "thread"
+REPLAY_MODE_PROCESS = "process"
+REPLAY_MODES = (REPLAY_MODE_SINGLE, REPLAY_MODE_THREAD, REPLAY_MODE_PROCESS)
+
+
+class InvalidReplayModeException(Exception):
+    """A custom exception."""
+    def __init__(self, mode):
+        message = (
+            f"Replay mode {mode} is not valid, "
+            f"please use {', '.join(REPLAY_MODES)}"
+        )
+        super().__init__(message)
+        self.message = message
+
+
+def generate_workload(file_name, reservations=10000, hotels=None,
+                      customers=None, cancel_every=10, seed=0):
+    """
+    Write a json lines workload for replay_workload: the hotels, the
+    customers, reservations that never overlap and the cancellation of
+    one reservation in cancel_every, returns the operations written
+    """
+    hotels = hotels or max(1, reservations // 100)
+    customers = customers or max(1, reservations // 10)
+    generator = random.Random(seed)
+    next_free_day = [datetime.date(2024, 1, 1).toordinal()] * hotels
+    cancelled = []
+    operations = 0
+    with open(file_name, "w", encoding="utf-8") as file:
+        def write(op, params):
+            nonlocal operations
+            operations += 1
+            file.write(json.dumps({
+                "request_id": operations, "op": op, "params": params
+            }) + "\n")
+
+        for number in range(hotels):
+            write("create_hotel", {"hotel_name": f"Hotel {number}"})
+        for number in range(customers):
+            write("create_customer", {"hotel_name": f"Customer {number}"})
+        for number in range(reservations):
+            hotel = generator.randrange(hotels)
+            from_day = next_free_day[hotel] + generator.randrange(4)
+            to_day = from_day + generator.randint(1, 7)
+            next_free_day[hotel] = to_day
+            params = {
+                "hotel_id": hotel + 1,
+                "customer_id": generator.randrange(customers) + 1,
+                "from_date": str(datetime.date.fromordinal(from_day)),
+                "to_date": str(datetime.date.fromordinal(to_day)),
+            }
+            write("create_reservation", params)
+            if cancel_every and number % cancel_every == 0:
+                cancelled.append(params)
+        for params in cancelled:
+            write("cancel_reservation", params)
+    return operations
+
+
+def _io_written_bytes():
+    """
+    Return the bytes the calling thread passed to write calls, None
+    where the kernel does not count them
+    """
+    for file_name in ("/proc/thread-self/io", "/proc/self/io"):
+        try:
+            with open(file_name, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.startswith("wchar:"):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return None
+
+
+def _replay_service(directory, storage_mode):
+    """
+    Return a ReservationService on the json files of a directory
+    """
+    service = ReservationService()
+    for record_array in (service.hotels, service.customers,
+                         service.reservations):
+        record_array.hotels_json_file_name = os.path.join(
+            directory, record_array.default_json_file_name
+        )
+        record_array.storage_mode = storage_mode
+    return service
+
+
+def _replay_chunk(service, requests):
+    """
+    Run requests one by one, returns their failures, a histogram of
+    their latency in power of two microseconds and the bytes written
+    """
+    histogram = collections.Counter()
+    failures = 0
+    written = _io_written_bytes()
+    for request in requests:
+        started = time.perf_counter()
+        response = service.apply(request)
+        microseconds = int((time.perf_counter() - started) * 1000000)
+        histogram[microseconds.bit_length()] += 1
+        failures += not response["ok"]
+    if written is not None:
+        written = _io_written_bytes() - written
+    return failures, histogram, written
+
+
+_REPLAY_SERVICE = None
+
+
+def _replay_process_init(directory, storage_mode):
+    """
+    Load the service of a replay worker process
+    """
+    global _REPLAY_SERVICE  # pylint: disable=global-statement
+    _REPLAY_SERVICE = _replay_service(directory, storage_mode)
+
+
+def _replay_process_chunk(requests):
+    """
+    Run requests in a replay worker process
+    """
+    return _replay_chunk(_REPLAY_SERVICE, requests)
+
+
+def _replay_chunks(file_name, chunk_size):
+    """
+    Yield the operation and the requests of runs of consecutive
+    requests with the same operation, at most chunk_size at a time
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        requests = (json.loads(line) for line in file if line.strip())
+        for op, run in itertools.groupby(
+                requests, key=lambda request: request.get("op")):
+            while True:
+                chunk = list(itertools.islice(run, chunk_size))
+                if not chunk:
+                    break
+                yield op, chunk
+
+
+def _map_bounded(executor, function, iterable, window):
+    """
+    Yield function of every item run in the executor, with at most
+    window items in flight
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _histogram_percentile(histogram, fraction):
+    """
+    Return the upper bound in milliseconds of the histogram bucket
+    holding the fraction of the latencies
+    """
+    total = sum(histogram.values())
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= fraction * total:
+            return (1 << bucket) / 1000
+    return None
+
+
+def replay_workload(file_name, mode=REPLAY_MODE_SINGLE, workers=4,
+                    storage_mode=STORAGE_MODE_JSON, directory=None,
+                    chunk_size=1000):
+    """
+    Replay a json lines workload against the json files of directory,
+    a new temporary one by default, and report the throughput, the
+    latency histogram and the bytes written per operation. Runs of the
+    same operation are spread over the workers, a run finishes before
+    the next one starts so reservations find their hotels
+    """
+    if mode not in REPLAY_MODES:
+        raise InvalidReplayModeException(mode)
+    with contextlib.ExitStack() as stack:
+        if directory is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+        if mode == REPLAY_MODE_PROCESS:
+            executor = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=_replay_process_init,
+                    initargs=(directory, storage_mode)
+                )
+            )
+            run_chunk = _replay_process_chunk
+        else:
+            service = _replay_service(directory, storage_mode)
+            if mode == REPLAY_MODE_THREAD:
+                executor = stack.enter_context(
+                    concurrent.futures.ThreadPoolExecutor(workers)
+                )
+
+            def run_chunk(requests):
+                return _replay_chunk(service, requests)
+
+        histogram = collections.Counter()
+        failures = 0
+        written = 0
+        started = time.perf_counter()
+        for _, run in itertools.groupby(
+                _replay_chunks(file_name, chunk_size),
+                key=operator.itemgetter(0)):
+            chunks = (chunk for _, chunk in run)
+            if mode == REPLAY_MODE_SINGLE:
+                results = map(run_chunk, chunks)
+            else:
+                results = _map_bounded(executor, run_chunk, chunks,
+                                       workers * 2)
+            for chunk_failures, chunk_histogram, chunk_written in results:
+                failures += chunk_failures
+                histogram.update(chunk_histogram)
+                if written is not None and chunk_written is not None:
+                    written += chunk_written
+                else:
+                    written = None
+        elapsed = time.perf_counter() - started
+
+    total = sum(histogram.values())
+    return {
+        "mode": mode,
+        "workers": 1 if mode == REPLAY_MODE_SINGLE else workers,
+        "storage_mode": storage_mode,
+        "operations": total,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "operations_per_second": round(total / elapsed) if elapsed else None,
+        "p50_ms": _histogram_percentile(histogram, 0.5),
+        "p99_ms": _histogram_percentile(histogram, 0.99),
+        "latency_histogram_us": {
+            f"<{1 << bucket}": histogram[bucket]
+            for bucket in sorted(histogram)
+        },
+        "bytes_written_per_operation": (
+            round(written / total, 1) if written is not None and total
+            else None
+        ),
+    }
+
+
+def benchmark_hot_paths(sizes=(100, 1000, 10000), rounds=20,
+                        storage_mode=STORAGE_MODE_JSON):
+    """
+    Time create_hotel, display_hotel_information,
+    modify_customer_information, search_customers, create_reservation,
+    cancel_reservation and available_hotels on databases of every size
+    of hotels, customers and reservations, returns the median and the
+    fastest call in microseconds by "operation[size]"
+
+    The default sizes keep a run short, sizes up to 1000000 are passed
+    explicitly, TestPerformance takes them from
+    HOTEL_RESERVATIONS_BENCHMARK_SIZES
+    """
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            service = _replay_service(directory, storage_mode)
+            service.hotels.bulk_create(
+                {"hotel_name": f"Hotel {number}"} for number in range(size)
+            )
+            service.customers.bulk_create(
+                {"customer_name": f"Customer {number}"}
+                for number in range(size)
+            )
+            service.reservations.bulk_create(
+                {"hotel_id": number + 1, "customer_id": number + 1,
+                 "from_date": "2024-01-01", "to_date": "2024-01-02"}
+                for number in range(size)
+            )
+            generator = random.Random(size)
+            first_day = datetime.date(2025, 1, 1).toordinal()
+            stays = [
+                (1, 1, str(datetime.date.fromordinal(first_day + number)),
+                 str(datetime.date.fromordinal(first_day + number + 1)))
+                for number in range(rounds)
+            ]
+            calls = {
+                "create_hotel": lambda number: service.hotels.create_hotel(
+                    f"Benchmark {number}"
+                ),
+                "display_hotel_information": lambda number: (
+                    service.hotels.display_hotel_information(
+                        generator.randrange(size) + 1
+                    )
+                ),
+                "modify_customer_information": lambda number: (
+                    service.customers.modify_customer_information(
+                        generator.randrange(size) + 1, f"Renamed {number}"
+                    )
+                ),
+                "search_customers": lambda number: (
+                    service.customers.search_customers(
+                        f"customer {generator.randrange(size) + 1}"
+                    )
+                ),
+                "create_reservation": lambda number: (
+                    service.reservations.create_reservation(*stays[number])
+                ),
+                "cancel_reservation": lambda number: (
+                    service.reservations.cancel_reservation(*stays[number])
+                ),
+                "available_hotels": lambda number: (
+                    service.reservations.available_hotels(
+                        *stays[number][2:]
+                    )
+                ),
+            }
+            for operation, call in calls.items():
+                timings = []
+                for number in range(rounds):
+                    started = time.perf_counter()
+                    call(number)
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                results[f"{operation}[{size}]"] = {
+                    "median_us": round(percentile(timings, 0.5) * 1000000, 1),
+                    "min_us": round(timings[0] * 1000000, 1),
+                }
+    return results
+
+
+def benchmark_available_hotels(hotels=100000, reservations=300000, days=7,
+                               rounds=20, workers=None,
+                               storage_mode=STORAGE_MODE_JSON):
+    """
+    Time available_hotels for windows of days on a database of hotels
+    with 1 to 5 rooms and reservations of up to a week spread over a
+    year, searched by the array and by a process pool of workers, by
+    default one per processor. The first call of the pool, which loads
+    the arrays in every worker, is reported apart. Returns the median
+    and the fastest call in milliseconds by search
+    """
+    workers = workers or os.cpu_count() or 1
+    generator = random.Random(hotels)
+    first_day = datetime.date(2024, 1, 1).toordinal()
+
+    def stay(length):
+        from_day = first_day + generator.randrange(365)
+        return (str(datetime.date.fromordinal(from_day)),
+                str(datetime.date.fromordinal(from_day + length)))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        service = _replay_service(directory, storage_mode)
+        service.hotels.bulk_create(
+            {"hotel_name": f"Hotel {number}",
+             "rooms": generator.randint(1, 5)}
+            for number in range(hotels)
+        )
+        service.customers.bulk_create(
+            {"customer_name": f"Customer {number}"}
+            for number in range(1000)
+        )
+        service.reservations.bulk_create(
+            dict(zip(("hotel_id", "customer_id", "from_date", "to_date"), (
+                generator.randrange(hotels) + 1,
+                generator.randrange(1000) + 1,
+                *stay(generator.randint(1, 7))
+            )))
+            for _ in range(reservations)
+        )
+        windows = [stay(days) for _ in range(rounds)]
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            started = time.perf_counter()
+            service.reservations.available_hotels(
+                *windows[0], executor=executor
+            )
+            results["pool_first_call_ms"] = round(
+                (time.perf_counter() - started) * 1000, 1
+            )
+            for search, executor_used in (("array", None),
+                                          (f"pool[{workers}]", executor)):
+                timings = []
+                for window in windows:
+                    started = time.perf_counter()
+                    found = service.reservations.available_hotels(
+                        *window, executor=executor_used
+                    )
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                results[search] = {
+                    "median_ms": round(percentile(timings, 0.5) * 1000, 1),
+                    "min_ms": round(timings[0] * 1000, 1),
+                    "hotels_found": len(found),
+                }
+        results["reservations"] = len(service.reservations)
+    return results
+
+
+def find_regressions(results, baseline, threshold=1.5):
+    """
+    Return the measurements whose median is more than threshold times
+    the median of the baseline, with both medians
+    """
+    return {
+        name: {"median_us": result["median_us"],
+               "baseline_median_us": baseline[name]["median_us"]}
+        for name, result in results.items()
+        if name in baseline
+        and result["median_us"] > threshold * baseline[name]["median_us"]
+    }
+
+
+def build_parser():
+    """
+    Return the command line parser and its commands by name
+    """
+    parser = argparse.ArgumentParser(
+        description="Hotel reservations tools, "
+                    "the tests run when no command is given"
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    benchmark_records = commands.add_parser(
+        "benchmark-records",
+        help="measure the json constructors of the record classes"
+    )
+    benchmark_records.add_argument("--records", type=int, default=100000)
+    benchmark_records.set_defaults(
+        handler=lambda args: benchmark_record_classes(args.records)
+    )
+
+    benchmark_durability_command = commands.add_parser(
+        "benchmark-durability",
+        help="measure the write throughput of every durability level"
+    )
+    benchmark_durability_command.add_argument(
+        "--operations", type=int, default=200
+    )
+    benchmark_durability_command.add_argument(
+        "--records", type=int, default=1000
+    )
+    benchmark_durability_command.set_defaults(
+        handler=lambda args: benchmark_durability(
+            args.operations, args.records
+        )
+    )
+
+    benchmark_group_commit_command = commands.add_parser(
+        "benchmark-group-commit",
+        help="compare create_reservation with and without group commit"
+    )
+    benchmark_group_commit_command.add_argument(
+        "--operations", type=int, default=1000
+    )
+    benchmark_group_commit_command.add_argument(
+        "--threads", type=int, default=64
+    )
+    benchmark_group_commit_command.add_argument(
+        "--storage-mode", default=STORAGE_MODE_WAL,
+        choices=STORAGE_MODES
+    )
+    benchmark_group_commit_command.add_argument(
+        "--durability", default=DURABILITY_FSYNC, choices=DURABILITY_LEVELS
+    )
+    benchmark_group_commit_command.set_defaults(
+        handler=lambda args: benchmark_group_commit(
+            args.operations, args.threads, args.storage_mode,
+            args.durability
+        )
+    )
+
+    benchmark_shards_command = commands.add_parser(
+        "benchmark-shards",
+        help="measure the write throughput of every count of shards"
+    )
+    benchmark_shards_command.add_argument(
+        "--shards", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    benchmark_shards_command.add_argument(
+        "--operations", type=int, default=2000
+    )
+    benchmark_shards_command.add_argument("--workers", type=int, default=8)
+    benchmark_shards_command.add_argument(
+        "--storage-mode", default=STORAGE_MODE_JSON, choices=STORAGE_MODES
+    )
+    benchmark_shards_command.add_argument(
+        "--durability", default=DURABILITY_NONE, choices=DURABILITY_LEVELS
+    )
+    benchmark_shards_command.set_defaults(
+        handler=lambda args: benchmark_shards(
+            args.shards, args.operations, args.workers, args.storage_mode,
+            args.durability
+        )
+    )
+
+    benchmark_available_command = commands.add_parser(
+        "benchmark-available",
+        help="measure the search of hotels with free rooms for dates"
+    )
+    benchmark_available_command.add_argument(
+        "--hotels", type=int, default=100000
+    )
+    benchmark_available_command.add_argument(
+        "--reservations", type=int, default=300000
+    )
+    benchmark_available_command.add_argument("--days", type=int, default=7)
+    benchmark_available_command.add_argument("--rounds", type=int, default=20)
+    benchmark_available_command.add_argument("--workers", type=int)
+    benchmark_available_command.add_argument(
+        "--storage-mode", default=STORAGE_MODE_JSON, choices=STORAGE_MODES
+    )
+    benchmark_available_command.set_defaults(
+        handler=lambda args: benchmark_available_hotels(
+            args.hotels, args.reservations, args.days, args.rounds,
+            args.workers, args.storage_mode
+        )
+    )
+
+    benchmark_cold_start_command = commands.add_parser(
+        "benchmark-cold-start",
+        help="measure the first lookup of json and binary snapshots"
+    )
+    benchmark_cold_start_command.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    benchmark_cold_start_command.set_defaults(
+        handler=lambda args: benchmark_cold_start(args.sizes)
+    )
+
+    convert = commands.add_parser(
+        "convert-snapshot",
+        help="convert between json files and binary snapshots"
+    )
+    convert.add_argument("kind", choices=sorted(ARRAY_CLASSES))
+    convert.add_argument("source")
+    convert.add_argument("destination")
+    convert.add_argument("--to", default="snapshot",
+                         choices=("snapshot", "json"))
+    convert.set_defaults(handler=lambda args: {
+        "records": (
+            json_to_binary_snapshot if args.to == "snapshot"
+            else binary_snapshot_to_json
+        )(ARRAY_CLASSES[args.kind], args.source, args.destination)
+    })
+
+    stress = commands.add_parser(
+        "stress",
+        help="check concurrent writer processes for lost updates"
+    )
+    stress.add_argument("--workers", type=int, default=4)
+    stress.add_argument("--operations", type=int, default=250)
+    stress.add_argument("--readers", type=int, default=2)
+    stress.add_argument(
+        "--storage-mode", default=STORAGE_MODE_JSON,
+        choices=STORAGE_MODES
+    )
+    stress.add_argument("--id-block-size", type=int, default=1)
+    stress.set_defaults(handler=lambda args: stress_concurrent_writers(
+        args.workers, args.operations, args.readers, args.storage_mode,
+        args.id_block_size
+    ))
+
+    serve_command = commands.add_parser(
+        "serve", help="serve the operations over http until interrupted"
+    )
+    serve_command.add_argument("--host", default="127.0.0.1")
+    serve_command.add_argument("--port", type=int, default=8080)
+    serve_command.add_argument(
+        "--storage-mode", default=STORAGE_MODE_JSON,
+        choices=STORAGE_MODES
+    )
+    serve_command.add_argument("--group-commit", action="store_true")
+    serve_command.set_defaults(handler=lambda args: serve(
+        args.host, args.port, args.storage_mode, args.group_commit
+    ))
+
+    loadgen = commands.add_parser(
+        "loadgen", help="measure the latency and throughput of a server"
+    )
+    loadgen.add_argument("--host", default="127.0.0.1")
+    loadgen.add_argument("--port", type=int, default=8080)
+    loadgen.add_argument("--requests", type=int, default=2000)
+    loadgen.add_argument("--connections", type=int, default=4)
+    loadgen.add_argument("--batch-size", type=int, default=1)
+    loadgen.add_argument("--write-every", type=int, default=10)
+    loadgen.set_defaults(handler=lambda args: generate_load(
+        args.host, args.port, args.requests, args.connections,
+        args.batch_size, args.write_every
+    ))
+
+    generate = commands.add_parser(
+        "generate", help="write a synthetic json lines workload"
+    )
+    generate.add_argument("file_name")
+    generate.add_argument("--reservations", type=int, default=10000)
+    generate.add_argument("--hotels", type=int)
+    generate.add_argument("--customers", type=int)
+    generate.add_argument("--cancel-every", type=int, default=10)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.set_defaults(handler=lambda args: {
+        "operations": generate_workload(
+            args.file_name, args.reservations, args.hotels, args.customers,
+            args.cancel_every, args.seed
+        )
+    })
+
+    replay = commands.add_parser(
+        "replay", help="replay a json lines workload and measure it"
+    )
+    replay.add_argument("file_name")
+    replay.add_argument("--mode", default=REPLAY_MODE_SINGLE,
+                        choices=REPLAY_MODES)
+    replay.add_argument("--workers", type=int, default=4)
+    replay.add_argument(
+        "--storage-mode", default=STORAGE_MODE_JSON,
+        choices=STORAGE_MODES
+    )
+    replay.add_argument("--directory",
+                        help="directory of the json files, "
+                             "a temporary one by default")
+    replay.add_argument("--chunk-size", type=int, default=1000)
+    replay.set_defaults(handler=lambda args: replay_workload(
+        args.file_name, args.mode, args.workers, args.storage_mode,
+        args.directory, args.chunk_size
+    ))
+
+    return parser, commands.choices
+
+
+def main(argv=None):
+    """
+    Command line entry point, without a known command the tests are run
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser, commands = build_parser()
+    if not argv or argv[0] not in commands:
+        unittest.main(argv=[sys.argv[0]] + argv)
+        return
+
+    args = parser.parse_args(argv)
+    result = args.handler(args)
+    if result is not None:
+        print(json.dumps(result, indent=2))
+
+
+class TestStringMethods(unittest.TestCase):
+    '''
+    Class to test all of the classes above declared
+    '''
+
+    def setUp(self):
+        # every test runs in a directory of its own, the json files and
+        # their logs, locks and sequences never touch the working tree
+        self.directory = tempfile.TemporaryDirectory()
+        self.working_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.hotel_array = HotelArray()
+        if os.path.exists(self.hotel_array.hotels_json_file_name):
+            # Delete the file
+            os.remove(self.hotel_array.hotels_json_file_name)
+        else:
+            print("File does not exist")
+        self.customer_array = CustomerArray()
+        if os.path.exists(self.customer_array.hotels_json_file_name):
+            # Delete the file
+            os.remove(self.customer_array.hotels_json_file_name)
+        else:
+            print("File does not exist")
+        self.reservations_array = ReservationArray(
+            self.hotel_array, self.customer_array
+        )
+        if os.path.exists(self.reservations_array.hotels_json_file_name):
+            # Delete the file
+            os.remove(self.reservations_array.hotels_json_file_name)
+        else:
+            print("File does not exist")
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        self.directory.cleanup()
+
+    def test_create_hotel(self):
+        '''
+        Test if create hotel works
+        '''
+        result = self.hotel_array.create_hotel("Transilvania")
+        self.assertEqual(isinstance(result, Hotel), True,
+                         'wrong instance of variable')
+
+    def test_create_hotel_json_exists(self):
+        '''
+        Test if create hotel works
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        self.hotel_array.create_hotel("Luigi's mansion")
+        self.assertEqual(len(self.hotel_array), 2,
+                         'wrong instance of variable')
+
+    def test_delete_hotel(self):
+        '''
+        Test if create hotel works
+        '''
+        passed = True
+        try:
+            self.hotel_array.create_hotel("Transilvania")
+            self.hotel_array.delete_hotel(1)
+        except HotelNotFoundException:
+            passed = False
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_delete_hotel_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.hotel_array.create_hotel("Transilvania")
+            self.hotel_array.delete_hotel(2)
+        except HotelNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_display_hotel(self):
+        '''
+        Test if create hotel works
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        result = self.hotel_array.display_hotel_information(1)
+        self.assertEqual(isinstance(result, Hotel), True,
+                         'wrong instance of variable')
+        self.assertEqual(result.hotel_name, 'Transilvania',
+                         'wrong instance of variable')
+
+    def test_display_hotel_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.hotel_array.create_hotel("Transilvania")
+            self.hotel_array.display_hotel_information(2)
+        except HotelNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_modify_hotel(self):
+        '''
+        Test if create hotel works
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        result = self.hotel_array.modify_hotel_information(
+            1, "Caesar's Palace"
+        )
+        self.assertEqual(isinstance(result, Hotel), True,
+                         'wrong instance of variable')
+        self.assertEqual(result.hotel_id, 1,
+                         'wrong instance of variable')
+        self.assertEqual(result.hotel_name, "Caesar's Palace",
+                         'wrong instance of variable')
+
+    def test_modify_hotel_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.hotel_array.create_hotel("Transilvania")
+            self.hotel_array.modify_hotel_information(2, "Caesar's Palace")
+        except HotelNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_display_hotel_uses_index(self):
+        '''
+        Test if lookups are served without parsing the file again
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        first = self.hotel_array.display_hotel_information(1)
+        second = self.hotel_array.display_hotel_information(1)
+        self.assertIs(first, second, 'index was rebuilt')
+
+    def test_display_hotel_reloads_changed_file(self):
+        '''
+        Test if the index is reloaded when another writer changes the file
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        other_array = HotelArray()
+        other_array.create_hotel("Luigi's mansion")
+        result = self.hotel_array.display_hotel_information(2)
+        self.assertEqual(result.hotel_name, "Luigi's mansion",
+                         'stale index was used')
+
+    def test_create_customer(self):
+        '''
+        Test if create hotel works
+        '''
+        result = self.customer_array.create_customer("Elvis")
+        self.assertEqual(isinstance(result, Customer), True,
+                         'wrong instance of variable')
+
+    def test_create_customer_json_exists(self):
+        '''
+        Test if create hotel works
+        '''
+        self.customer_array.create_customer("Elvis")
+        self.customer_array.create_customer("Frank")
+        self.assertEqual(len(self.customer_array), 2,
+                         'wrong instance of variable')
+
+    def test_delete_customer(self):
+        '''
+        Test if create hotel works
+        '''
+        passed = True
+        try:
+            self.customer_array.create_customer("Elvis")
+            self.customer_array.delete_customer(1)
+        except CustomerNotFoundException:
+            passed = False
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_delete_customer_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.customer_array.create_customer("Elvis")
+            self.customer_array.delete_customer(2)
+        except CustomerNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_display_customer(self):
+        '''
+        Test if create hotel works
+        '''
+        self.customer_array.create_customer("Elvis")
+        result = self.customer_array.display_customer_information(1)
+        self.assertEqual(isinstance(result, Customer), True,
+                         'wrong instance of variable')
+        self.assertEqual(result.customer_name, 'Elvis',
+                         'wrong instance of variable')
+
+    def test_display_customer_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.customer_array.create_customer("Elvis")
+            self.customer_array.display_customer_information(2)
+        except CustomerNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_modify_customer(self):
+        '''
+        Test if create hotel works
+        '''
+        self.customer_array.create_customer("Elvis")
+        result = self.customer_array.modify_customer_information(
+            1, "Elvis Presley"
+        )
+        self.assertEqual(isinstance(result, Customer), True,
+                         'wrong instance of variable')
+        self.assertEqual(result.customer_id, 1,
+                         'wrong instance of variable')
+        self.assertEqual(result.customer_name, "Elvis Presley",
+                         'wrong instance of variable')
+
+    def test_modify_customer_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.customer_array.create_customer("Elvis")
+            self.customer_array.modify_customer_information(2, "Elvis Presley")
+        except CustomerNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_create_reservation(self):
+        '''
+        Test if create hotel works
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        result = self.reservations_array.create_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-02", "2024-11-03"
+        )
+        self.assertEqual(isinstance(result, Reservation), True,
+                         'wrong instance of variable')
+
+    def test_create_reservation_json_exists(self):
+        '''
+        Test if create hotel works
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        self.reservations_array.create_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-02", "2024-11-03"
+        )
+        self.reservations_array.create_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-03", "2024-11-04"
+        )
+        self.assertEqual(len(self.reservations_array), 2,
+                         'wrong instance of variable')
+
+    def test_cancel_reservation(self):
+        '''
+        Test if create hotel works
+        '''
+        passed = True
+        try:
+            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+            created_customer = self.customer_array.create_customer("Elvis")
+            result = self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-02", "2024-11-03"
+            )
+            self.reservations_array.cancel_reservation(
+                result.hotel_id, result.customer_id,
+                result.from_date, result.to_date
+            )
+        except ReservationNotFoundException:
+            passed = False
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_cancel_reservation_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+            created_customer = self.customer_array.create_customer("Elvis")
+            result = self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-02", "2024-11-03"
+            )
+            self.reservations_array.cancel_reservation(
+                2, result.customer_id, result.from_date, result.to_date
+            )
+        except ReservationNotFoundException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_wal_create_hotel(self):
+        '''
+        Test if wal mode appends to the log and other arrays replay it
+        '''
+        self.hotel_array.storage_mode = STORAGE_MODE_WAL
+        self.hotel_array.create_hotel("Transilvania")
+        self.hotel_array.create_hotel("Luigi's mansion")
+        self.assertEqual(
+            os.path.exists(self.hotel_array.hotels_json_file_name), False,
+            'snapshot was rewritten')
+        other_array = HotelArray()
+        other_array.storage_mode = STORAGE_MODE_WAL
+        result = other_array.display_hotel_information(2)
+        self.assertEqual(result.hotel_name, "Luigi's mansion",
+                         'log was not replayed')
+        self.hotel_array.create_hotel("Caesar's Palace")
+        result = other_array.display_hotel_information(3)
+        self.assertEqual(result.hotel_name, "Caesar's Palace",
+                         'log tail was not replayed')
+
+    def test_wal_compact(self):
+        '''
+        Test if compaction folds the log into the json snapshot
+        '''
+        self.customer_array.storage_mode = STORAGE_MODE_WAL
+        self.customer_array.create_customer("Elvis")
+        self.customer_array.create_customer("Frank")
+        self.customer_array.modify_customer_information(1, "Elvis Presley")
+        self.customer_array.delete_customer(2)
+        self.customer_array.compact()
+        self.assertEqual(
+            os.path.exists(self.customer_array.log_file_name), False,
+            'log was not folded')
+        other_array = CustomerArray()
+        result = other_array.display_customer_information(1)
+        self.assertEqual(result.customer_name, "Elvis Presley",
+                         'wrong instance of variable')
+        self.assertEqual(len(other_array), 1,
+                         'deleted customer was kept')
+
+    def test_wal_background_compaction(self):
+        '''
+        Test if reaching the threshold compacts in the background
+        '''
+        self.hotel_array.storage_mode = STORAGE_MODE_WAL
+        self.hotel_array.compaction_threshold = 3
+        for hotel_name in ("Transilvania", "Luigi's mansion", "Ritz"):
+            self.hotel_array.create_hotel(hotel_name)
+        self.hotel_array.start_compaction().join()
+        other_array = HotelArray()
+        result = other_array.display_hotel_information(3)
+        self.assertEqual(result.hotel_name, "Ritz",
+                         'wrong instance of variable')
+        self.assertEqual(len(other_array), 3,
+                         'wrong instance of variable')
+
+    def test_wal_reservations(self):
+        '''
+        Test if reservations are replayed and torn lines ignored
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        self.reservations_array.storage_mode = STORAGE_MODE_WAL
+        for from_date, to_date in (
+            ("2024-11-02", "2024-11-03"), ("2024-11-03", "2024-11-04")
+        ):
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                from_date, to_date
+            )
+        self.reservations_array.cancel_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-02", "2024-11-03"
+        )
+        with open(self.reservations_array.log_file_name, "a",
+                  encoding="utf-8") as file:
+            file.write('{"op": "put", "rec')
+        other_array = ReservationArray(self.hotel_array, self.customer_array)
+        other_array.storage_mode = STORAGE_MODE_WAL
+        other_array.cancel_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-03", "2024-11-04"
+        )
+        self.assertEqual(len(other_array), 0,
+                         'wrong instance of variable')
+        third_array = ReservationArray(self.hotel_array, self.customer_array)
+        third_array.storage_mode = STORAGE_MODE_WAL
+        with self.assertRaises(ReservationNotFoundException):
+            third_array.cancel_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-03", "2024-11-04"
+            )
+
+    def test_create_reservation_overlap_fail(self):
+        '''
+        Test if custom exception is triggered for overlapping bookings
+        '''
+        passed = False
+        try:
+            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+            created_customer = self.customer_array.create_customer("Elvis")
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-02", "2024-11-05"
+            )
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-04", "2024-11-06"
+            )
+        except ReservationOverlapException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_create_reservation_dates_fail(self):
+        '''
+        Test if custom exception is triggered for invalid dates
+        '''
+        passed = False
+        try:
+            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+            created_customer = self.customer_array.create_customer("Elvis")
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-05", "2024-11-02"
+            )
+        except InvalidReservationDatesException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_overlapping_reservations(self):
+        '''
+        Test if availability and overlap queries use the reserved dates
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        for from_date, to_date in (
+            ("2024-11-02", "2024-11-03"), ("2024-11-10", "2024-11-20"),
+            ("2024-11-21", "2024-11-22")
+        ):
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                from_date, to_date
+            )
+        result = self.reservations_array.overlapping_reservations(
+            created_hotel.hotel_id, "2024-11-15", "2024-11-22"
+        )
+        self.assertEqual(
+            [reservation.from_date for reservation in result],
+            ["2024-11-10", "2024-11-21"], 'wrong overlapping reservations')
+        self.assertEqual(
+            self.reservations_array.is_hotel_available(
+                created_hotel.hotel_id, "2024-11-03", "2024-11-10"
+            ), True, 'free window reported as reserved')
+        self.assertEqual(
+            self.reservations_array.is_hotel_available(
+                created_hotel.hotel_id, "2024-11-19", "2024-11-21"
+            ), False, 'reserved window reported as free')
+
+    def test_reservation_intervals_remove_longest(self):
+        '''
+        Test if the longest interval is known again after removing it
+        '''
+        lengths = collections.Counter({3: 1, 7: 2})
+        self.assertEqual(remove_length(lengths, 7, 7), 7,
+                         'wrong instance of variable')
+        self.assertEqual(remove_length(lengths, 7, 7), 3,
+                         'wrong instance of variable')
+        self.assertEqual(remove_length(lengths, 3, 3), 0,
+                         'wrong instance of variable')
+
+        intervals = ReservationIntervals()
+        intervals.add(100, 3750, "long")
+        for day in range(3800, 3900, 2):
+            intervals.add(day, day + 1, day)
+        intervals.remove(100, 3750, "long")
+        self.assertEqual(list(intervals.overlapping(3850, 3853)),
+                         [3850, 3852], 'wrong overlapping intervals')
+        self.assertEqual(intervals.is_free(100, 3750), True,
+                         'removed interval still reserved')
+
+    def test_bulk_create_hotels(self):
+        '''
+        Test if bulk create assigns ids and reports rejected rows
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        bulk_result = self.hotel_array.bulk_create([
+            {"hotel_name": "Luigi's mansion"}, {"name": "Ritz"},
+            '{"hotel_name": "Caesar\'s Palace"}'
+        ])
+        self.assertEqual(
+            [hotel.hotel_id for hotel in bulk_result.created], [2, 3],
+            'wrong ids assigned')
+        self.assertEqual(
+            [error.row_number for error in bulk_result.errors], [2],
+            'wrong rows rejected')
+        other_array = HotelArray()
+        result = other_array.display_hotel_information(3)
+        self.assertEqual(result.hotel_name, "Caesar's Palace",
+                         'wrong instance of variable')
+
+    def test_bulk_create_reservations_jsonl(self):
+        '''
+        Test if reservations are imported from a JSONL file
+        '''
+        self.hotel_array.bulk_create([{"hotel_name": "Caesar's Palace"}])
+        self.customer_array.bulk_create(
+            [{"customer_name": "Elvis"}, {"customer_name": "Frank"}]
+        )
+        rows_file_name = "reservations_import.jsonl"
+        with open(rows_file_name, "w", encoding="utf-8") as file:
+            file.write(
+                '{"hotel_id": 1, "customer_id": 1, '
+                '"from_date": "2024-11-02", "to_date": "2024-11-04"}\n'
+                '{"hotel_id": 1, "customer_id": 2, '
+                '"from_date": "2024-11-03", "to_date": "2024-11-05"}\n'
+                '{"hotel_id": 9, "customer_id": 2, '
+                '"from_date": "2024-11-03", "to_date": "2024-11-05"}\n'
+                'not json\n'
+                '\n'
+                '{"hotel_id": "1", "customer_id": "2", '
+                '"from_date": "2024-11-04", "to_date": "2024-11-05"}\n'
+            )
+        result = self.reservations_array.bulk_create(
+            rows_file_name, batch_size=2
+        )
+        self.assertEqual(len(result.created), 2,
+                         'wrong instance of variable')
+        self.assertEqual(
+            [type(error.exception) for error in result.errors],
+            [ReservationOverlapException, InvalidHotelForReservException,
+             json.JSONDecodeError], 'wrong rows rejected')
+        other_array = ReservationArray(self.hotel_array, self.customer_array)
+        other_array.cancel_reservation(1, 2, "2024-11-04", "2024-11-05")
+
+    def test_create_reservation_customer_fail(self):
+        '''
+        Test if custom exception is triggered for unknown customers
+        '''
+        passed = False
+        try:
+            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, 1, "2024-11-02", "2024-11-03"
+            )
+        except InvalidCustomerForReservException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_create_reservation_deleted_hotel_fail(self):
+        '''
+        Test if the cached hotel ids follow deletes of other arrays
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        self.reservations_array.create_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-02", "2024-11-03"
+        )
+        HotelArray().delete_hotel(created_hotel.hotel_id)
+        passed = False
+        try:
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                "2024-11-03", "2024-11-04"
+            )
+        except InvalidHotelForReservException:
+            passed = True
+
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+    def test_cancel_reservation_typed_key(self):
+        '''
+        Test if cancel matches equivalent ids and dates
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        for from_date, to_date in (
+            ("2024-11-02", "2024-11-03"), ("2024-11-03", "2024-11-04"),
+            ("2024-11-04", "2024-11-05")
+        ):
+            self.reservations_array.create_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                from_date, to_date
+            )
+        self.reservations_array.cancel_reservation(
+            str(created_hotel.hotel_id), created_customer.customer_id,
+            datetime.date(2024, 11, 2), "2024-11-03"
+        )
+        self.assertEqual(
+            sorted(reservation.from_date
+                   for reservation in self.reservations_array),
+            ["2024-11-03", "2024-11-04"], 'wrong reservation cancelled')
+        other_array = ReservationArray(self.hotel_array, self.customer_array)
+        other_array.cancel_reservation(1, 1, "2024-11-04", "2024-11-05")
+        other_array.cancel_reservation(1, 1, "2024-11-03", "2024-11-04")
+        self.assertEqual(len(other_array), 0,
+                         'wrong instance of variable')
+
+    def test_reservations_for_hotel_and_customer(self):
+        '''
+        Test if the secondary indexes return the matching reservations
+        '''
+        self.hotel_array.bulk_create(
+            [{"hotel_name": "Caesar's Palace"}, {"hotel_name": "Ritz"}]
+        )
+        self.customer_array.bulk_create(
+            [{"customer_name": "Elvis"}, {"customer_name": "Frank"}]
+        )
+        self.reservations_array.bulk_create([
+            {"hotel_id": 1, "customer_id": 1,
+             "from_date": "2024-11-05", "to_date": "2024-11-06"},
+            {"hotel_id": 2, "customer_id": 1,
+             "from_date": "2024-11-02", "to_date": "2024-11-03"},
+            {"hotel_id": 1, "customer_id": 2,
+             "from_date": "2024-11-02", "to_date": "2024-11-03"},
+        ])
+        self.assertEqual(
+            [reservation.customer_id for reservation
+             in self.reservations_array.reservations_for_hotel(1)],
+            [2, 1], 'wrong reservations for hotel')
+        self.assertEqual(
+            [reservation.hotel_id for reservation
+             in self.reservations_array.reservations_for_customer(1)],
+            [2, 1], 'wrong reservations for customer')
+        self.assertEqual(
+            self.reservations_array.reservations_for_customer(3), [],
+            'wrong reservations for customer')
+
+    def test_delete_referenced_hotel(self):
+        '''
+        Test if deleting a referenced hotel fails unless cascading
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        self.reservations_array.create_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-02", "2024-11-03"
+        )
+        passed = False
+        try:
+            self.hotel_array.delete_hotel(created_hotel.hotel_id)
+        except HotelHasReservationsException:
+            passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+        self.customer_array.delete_customer(
+            created_customer.customer_id, cascade=True
+        )
+        self.assertEqual(len(self.reservations_array), 0,
+                         'reservations were not cancelled')
+        self.hotel_array.delete_hotel(created_hotel.hotel_id)
+
+    def test_record_classes_are_slotted(self):
+        '''
+        Test if records carry no per instance dict
+        '''
+        for record in (
+            Hotel.from_trusted_json({"hotel_id": 1, "hotel_name": "Ritz"}),
+            Customer(), Reservation()
+        ):
+            self.assertEqual(hasattr(record, "__dict__"), False,
+                             'record has a per instance dict')
+        result = benchmark_record_classes(records=10)
+        self.assertEqual(len(result), 6,
+                         'wrong instance of variable')
+
+    def test_reservation_columns(self):
+        '''
+        Test if the column queries match the reservations
+        '''
+        self.hotel_array.bulk_create(
+            [{"hotel_name": "Caesar's Palace"}, {"hotel_name": "Ritz"}]
+        )
+        self.customer_array.create_customer("Elvis")
+        self.reservations_array.bulk_create([
+            {"hotel_id": 1, "customer_id": 1,
+             "from_date": "2024-11-01", "to_date": "2024-11-04"},
+            {"hotel_id": 2, "customer_id": 1,
+             "from_date": "2024-11-03", "to_date": "2024-11-05"},
+            {"hotel_id": 1, "customer_id": 1,
+             "from_date": "2024-11-06", "to_date": "2024-11-08"},
+        ])
+        self.assertEqual(
+            self.reservations_array.overlap_mask("2024-11-03", "2024-11-07"),
+            bytes([1, 1, 1]), 'wrong overlap mask')
+        self.assertEqual(
+            self.reservations_array.overlap_mask(
+                "2024-11-04", "2024-11-06", hotel_id=1
+            ), bytes([0, 0, 0]), 'wrong overlap mask')
+        occupancy = self.reservations_array.occupancy(
+            "2024-11-02", "2024-11-08"
+        )
+        self.assertEqual(list(occupancy[1]), [1, 1, 0, 0, 1, 1],
+                         'wrong occupancy')
+        self.assertEqual(list(occupancy[2]), [0, 1, 1, 0, 0, 0],
+                         'wrong occupancy')
+
+        mask = self.reservations_array.overlap_mask(
+            "2024-11-01", "2024-11-05", hotel_id=1
+        )
+        cancelled = self.reservations_array.cancel_where(mask)
+        self.assertEqual([reservation.from_date for reservation in cancelled],
+                         ["2024-11-01"], 'wrong reservations cancelled')
+        columns = ReservationColumns.from_json_file(
+            self.reservations_array.hotels_json_file_name
+        )
+        self.assertEqual(len(columns), 2, 'wrong instance of variable')
+        self.assertEqual(columns.cancel_where(columns.overlap_mask(
+            "2024-11-01", "2024-11-30", hotel_id=2
+        )), 1, 'wrong instance of variable')
+        self.assertEqual(list(columns.hotel_ids), [1],
+                         'wrong instance of variable')
+        columns.append(2 ** 40, 1, "2024-11-01", "2024-11-02")
+        self.assertEqual(columns.hotel_ids[-1], 2 ** 40,
+                         'wrong instance of variable')
+
+        columns = self.reservations_array.columns()
+        self.reservations_array.create_reservation(
+            2, 1, "2024-11-10", "2024-11-12"
+        )
+        self.reservations_array.cancel_reservation(
+            2, 1, "2024-11-03", "2024-11-05"
+        )
+        self.assertIs(self.reservations_array.columns(), columns,
+                      'columns were built again')
+        expected = ReservationColumns.from_records(self.reservations_array)
+        for column, expected_column in (
+            (columns.hotel_ids, expected.hotel_ids),
+            (columns.customer_ids, expected.customer_ids),
+            (columns.from_days, expected.from_days),
+            (columns.to_days, expected.to_days),
+        ):
+            self.assertEqual(column, expected_column,
+                             'columns do not follow the reservations')
+
+    def test_reservation_report(self):
+        '''
+        Test if the report figures follow the reservations
+        '''
+        self.hotel_array.bulk_create(
+            [{"hotel_name": "Caesar's Palace"}, {"hotel_name": "Ritz"}]
+        )
+        self.customer_array.bulk_create(
+            [{"customer_name": "Elvis"}, {"customer_name": "Frank"}]
+        )
+        self.reservations_array.storage_mode = STORAGE_MODE_WAL
+        self.reservations_array.bulk_create([
+            {"hotel_id": 1, "customer_id": 1,
+             "from_date": "2024-11-01", "to_date": "2024-11-04"},
+            {"hotel_id": 2, "customer_id": 1,
+             "from_date": "2024-11-03", "to_date": "2024-11-04"},
+        ])
+        report = self.reservations_array.report()
+        self.assertEqual(report.bookings_per_customer(), {1: 2},
+                         'wrong bookings per customer')
+        self.assertEqual(report.average_length_of_stay(), 2,
+                         'wrong average length of stay')
+
+        other_array = ReservationArray(self.hotel_array, self.customer_array)
+        other_array.storage_mode = STORAGE_MODE_WAL
+        other_array.create_reservation(1, 2, "2024-11-05", "2024-11-06")
+        report = self.reservations_array.report()
+        self.assertEqual(report.bookings_per_customer(), {1: 2, 2: 1},
+                         'appended reservation was not aggregated')
+        self.assertEqual(
+            [occupied for _, occupied in report.daily_occupancy(1)],
+            [1, 1, 1, 0, 1], 'wrong daily occupancy')
+        self.assertEqual(report.average_length_of_stay(1), 2,
+                         'wrong average length of stay')
+
+        self.reservations_array.cancel_reservation(
+            1, 1, "2024-11-01", "2024-11-04"
+        )
+        self.reservations_array.compact()
+        file_report = ReservationReport.from_json_file(
+            self.reservations_array.hotels_json_file_name
+        )
+        for result in (report, file_report):
+            self.assertEqual(
+                result.occupancy_by_hotel(),
+                {1: [(datetime.date(2024, 11, 5), 1)],
+                 2: [(datetime.date(2024, 11, 3), 1)]},
+                'wrong occupancy by hotel')
+
+    def test_modify_hotel_version_conflict(self):
+        '''
+        Test if custom exception is triggered for a stale version
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        version = self.hotel_array.version
+        HotelArray().modify_hotel_information(1, "Luigi's mansion")
+        passed = False
+        try:
+            self.hotel_array.modify_hotel_information(
+                1, "Caesar's Palace", expected_version=version
+            )
+        except VersionConflictException:
+            passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+        result = self.hotel_array.modify_hotel_information(
+            1, "Caesar's Palace", expected_version=version + 1
+        )
+        self.assertEqual(result.hotel_name, "Caesar's Palace",
+                         'wrong instance of variable')
+
+    def test_concurrent_writers(self):
+        '''
+        Test if concurrent writer processes lose no update
+        '''
+        for storage_mode, id_block_size in zip(STORAGE_MODES, (1, 16, 1, 8)):
+            result = stress_concurrent_writers(
+                workers=3, operations=30, readers=1,
+                storage_mode=storage_mode, id_block_size=id_block_size
+            )
+            self.assertEqual(result["lost_updates"], 0, 'updates were lost')
+            self.assertEqual(result["duplicate_ids"], 0,
+                             'ids were handed out twice')
+
+    def test_atomic_write_keeps_file_on_failure(self):
+        '''
+        Test if a failed write leaves the previous file intact
+        '''
+        self.hotel_array.durability = DURABILITY_FSYNC_DIRECTORY
+        self.hotel_array.create_hotel("Transilvania")
+        passed = False
+        try:
+            self.hotel_array.modify_hotel_information(1, object())
+        except TypeError:
+            passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+        for hotel_array in (self.hotel_array, HotelArray()):
+            result = hotel_array.display_hotel_information(1)
+            self.assertEqual(result.hotel_name, "Transilvania",
+                             'file was truncated')
+        self.assertEqual(
+            [name for name in os.listdir(".") if name.endswith(".tmp")], [],
+            'temporary file was left behind')
+
+    def test_invalid_durability_fail(self):
+        '''
+        Test if custom exception is triggered
+        '''
+        passed = False
+        try:
+            self.hotel_array.durability = "sometimes"
+        except InvalidDurabilityException:
+            passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+        self.assertEqual(len(benchmark_durability(operations=2, records=2)),
+                         len(STORAGE_MODES) * len(DURABILITY_LEVELS),
+                         'wrong instance of variable')
+
+    def test_group_commit_reservations(self):
+        '''
+        Test if group commit persists every queued reservation
+        '''
+        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
+        created_customer = self.customer_array.create_customer("Elvis")
+        self.reservations_array.storage_mode = STORAGE_MODE_WAL
+        self.reservations_array.enable_group_commit(max_delay=0.05)
+        futures = [
+            self.reservations_array.submit_reservation(
+                created_hotel.hotel_id, created_customer.customer_id,
+                f"2024-11-{day:02}", f"2024-11-{day + 1:02}"
+            )
+            for day in range(1, 11)
+        ]
+        overlapping = self.reservations_array.submit_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-04", "2024-11-06"
+        )
+        result = self.reservations_array.create_reservation(
+            created_hotel.hotel_id, created_customer.customer_id,
+            "2024-11-20", "2024-11-22"
+        )
+        self.reservations_array.disable_group_commit()
+        self.assertEqual(isinstance(result, Reservation), True,
+                         'wrong instance of variable')
+        for future in futures:
+            self.assertEqual(isinstance(future.result(), Reservation), True,
+                             'wrong instance of variable')
+        passed = False
+        try:
+            overlapping.result()
+        except ReservationOverlapException:
+            passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+        other_array = ReservationArray(self.hotel_array, self.customer_array)
+        other_array.storage_mode = STORAGE_MODE_WAL
+        self.assertEqual(len(other_array.record_ids()), 11,
+                         'wrong instance of variable')
+
+    def test_group_commit_benchmark(self):
+        '''
+        Test if the group commit benchmark stores every reservation
+        '''
+        results = benchmark_group_commit(operations=20, threads=4)
+        for result in results.values():
+            self.assertEqual(result["stored_reservations"], 20,
+                             'reservations were lost')
+
+    def test_async_arrays(self):
+        '''
+        Test if the awaitable arrays create and read records
+        '''
+        async def scenario():
+            hotels = AsyncHotelArray(self.hotel_array)
+            customers = AsyncCustomerArray(self.customer_array)
+            reservations = AsyncReservationArray(self.reservations_array)
+            created = await asyncio.gather(*(
+                hotels.create_hotel(f"Hotel {number}")
+                for number in range(5)
+            ))
+            customer = await customers.create_customer("Elvis")
+            await reservations.create_reservation(
+                created[0].hotel_id, customer.customer_id,
+                "2024-11-02", "2024-11-05"
+            )
+            self.reservations_array.enable_group_commit()
+            await asyncio.gather(*(
+                reservations.create_reservation(
+                    hotel.hotel_id, customer.customer_id,
+                    "2024-12-02", "2024-12-05"
+                )
+                for hotel in created
+            ))
+            self.reservations_array.disable_group_commit()
+            found = await asyncio.gather(*(
+                hotels.display_hotel_information(hotel.hotel_id)
+                for hotel in created
+            ))
+            booked = await reservations.reservations_for_customer(
+                customer.customer_id
+            )
+            return created, found, booked
+
+        created, found, booked = asyncio.run(scenario())
+        self.assertEqual(sorted(hotel.hotel_id for hotel in created),
+                         [1, 2, 3, 4, 5], 'ids were handed out twice')
+        self.assertEqual([hotel.hotel_name for hotel in found],
+                         [hotel.hotel_name for hotel in created],
+                         'wrong instance of variable')
+        self.assertEqual(len(booked), 6, 'wrong instance of variable')
+
+    def test_async_read_write_lock(self):
+        '''
+        Test if readers share the lock and writers hold it alone
+        '''
+        events = []
+
+        async def reader(lock, name):
+            async with lock.read():
+                events.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} out")
+
+        async def writer(lock):
+            async with lock.write():
+                events.append("writer in")
+                await asyncio.sleep(0)
+                events.append("writer out")
+
+        async def scenario():
+            lock = AsyncReadWriteLock()
+            await asyncio.gather(
+                reader(lock, "a"), reader(lock, "b"), writer(lock)
+            )
+
+        asyncio.run(scenario())
+        self.assertEqual(events[:2], ["a in", "b in"],
+                         'readers did not share the lock')
+        self.assertEqual(events[-2:], ["writer in", "writer out"],
+                         'writer did not hold the lock alone')
+
+    def test_service_batch(self):
+        '''
+        Test if the service answers every request of a batch in order
+        '''
+        service = ReservationService(
+            self.hotel_array, self.customer_array, self.reservations_array
+        )
+        self.reservations_array.enable_group_commit()
+        responses = service.apply_batch([
+            {"request_id": 1, "op": "create_hotel",
+             "params": {"hotel_name": "Transilvania"}},
+            {"request_id": 2, "op": "create_customer",
+             "params": {"hotel_name": "Elvis"}},
+            {"request_id": 3, "op": "create_reservation",
+             "params": {"hotel_id": 1, "customer_id": 1,
+                        "from_date": "2024-11-02", "to_date": "2024-11-05"}},
+            {"request_id": 4, "op": "create_reservation",
+             "params": {"hotel_id": 1, "customer_id": 1,
+                        "from_date": "2024-11-04", "to_date": "2024-11-06"}},
+            {"request_id": 5, "op": "reservations_for_hotel",
+             "params": {"hotel_id": 1}},
+            {"request_id": 6, "op": "drop_tables"},
+        ])
+        self.reservations_array.disable_group_commit()
+        self.assertEqual([response["request_id"] for response in responses],
+                         [1, 2, 3, 4, 5, 6], 'responses out of order')
+        self.assertEqual([response["ok"] for response in responses],
+                         [True, True, True, False, True, False],
                          'wrong instance of variable')
+        self.assertEqual(responses[3]["error"], "ReservationOverlapException",
+                         'unkown exception thrown')
+        self.assertEqual(responses[5]["error"], "UnknownOperationException",
+                         'unkown exception thrown')
+        self.assertEqual(
+            json.loads(service.dumps(responses[4]))["result"],
+            [{"hotel_id": 1, "customer_id": 1,
+              "from_date": "2024-11-02", "to_date": "2024-11-05"}],
+            'wrong instance of variable')
 
-    def test_delete_hotel(self):
+    def test_service_http(self):
         '''
-        Test if create hotel works
+        Test if the http service and the load generator agree
         '''
-        passed = True
+        server = make_server("127.0.0.1", 0, ReservationService(
+            self.hotel_array, self.customer_array, self.reservations_array
+        ))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
         try:
-            self.hotel_array.create_hotel("Transilvania")
-            self.hotel_array.delete_hotel(1)
-        except HotelNotFoundException:
-            passed = False
-
-        self.assertEqual(passed, True,
-                         'unkown exception thrown')
-
-    def test_delete_hotel_fail(self):
+            port = server.server_address[1]
+            for batch_size in (1, 5):
+                result = generate_load(
+                    "127.0.0.1", port, requests=40, connections=2,
+                    batch_size=batch_size, write_every=4
+                )
+                self.assertEqual(result["failures"], 0,
+                                 'requests failed')
+            self.assertEqual(result["http_requests"], 8,
+                             'wrong instance of variable')
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            connection.request("POST", "/op", "not json")
+            self.assertEqual(connection.getresponse().status, 400,
+                             'wrong instance of variable')
+            connection.close()
+            for body, length in ((b"\xff\xfe", "2"), (b"{}", "two")):
+                connection = http.client.HTTPConnection("127.0.0.1", port)
+                connection.putrequest("POST", "/op")
+                connection.putheader("Content-Length", length)
+                connection.endheaders(body)
+                response = connection.getresponse()
+                self.assertEqual(response.status, 400,
+                                 'wrong instance of variable')
+                self.assertEqual(json.loads(response.read())["ok"], False,
+                                 'wrong instance of variable')
+                connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(len(self.hotel_array.record_ids()), 22,
+                         'hotels were lost')
+
+    def test_replay_workload(self):
+        '''
+        Test if every replay mode runs a generated workload cleanly
+        '''
+        operations = generate_workload("workload.jsonl", reservations=60,
+                                       hotels=3, customers=5)
+        self.assertEqual(operations, 3 + 5 + 60 + 6,
+                         'wrong instance of variable')
+        for mode in REPLAY_MODES:
+            result = replay_workload("workload.jsonl", mode=mode, workers=2,
+                                     storage_mode=STORAGE_MODE_WAL,
+                                     chunk_size=7)
+            self.assertEqual(result["operations"], operations,
+                             'operations were skipped')
+            self.assertEqual(result["failures"], 0, 'operations failed')
+            self.assertEqual(
+                sum(result["latency_histogram_us"].values()), operations,
+                'wrong instance of variable')
+        os.remove("workload.jsonl")
+
+    def test_replay_mode_fail(self):
         '''
         Test if custom exception is triggered
         '''
         passed = False
         try:
-            self.hotel_array.create_hotel("Transilvania")
-            self.hotel_array.delete_hotel(2)
-        except HotelNotFoundException:
+            replay_workload("workload.jsonl", mode="fibers")
+        except InvalidReplayModeException:
             passed = True
-
         self.assertEqual(passed, True,
                          'unkown exception thrown')
 
-    def test_display_hotel(self):
+    def test_sqlite_storage(self):
         '''
-        Test if create hotel works
+        Test if the sqlite storage keeps the records across arrays
         '''
+        for record_array in (self.hotel_array, self.customer_array,
+                             self.reservations_array):
+            record_array.storage_mode = STORAGE_MODE_SQLITE
         self.hotel_array.create_hotel("Transilvania")
-        result = self.hotel_array.display_hotel_information(1)
-        self.assertEqual(isinstance(result, Hotel), True,
-                         'wrong instance of variable')
-        self.assertEqual(result.hotel_name, 'Transilvania',
+        self.hotel_array.create_hotel("Luigi's mansion")
+        self.customer_array.create_customer("Elvis")
+        self.reservations_array.create_reservation(
+            1, 1, "2024-11-02", "2024-11-05"
+        )
+        self.reservations_array.create_reservation(
+            2, 1, "2024-11-02", "2024-11-05"
+        )
+        self.hotel_array.modify_hotel_information(2, "Caesar's Palace")
+        self.assertEqual(
+            os.path.exists(self.hotel_array.hotels_json_file_name), False,
+            'json file was written')
+
+        other_hotels = HotelArray()
+        other_hotels.storage_mode = STORAGE_MODE_SQLITE
+        other_customers = CustomerArray()
+        other_customers.storage_mode = STORAGE_MODE_SQLITE
+        other_array = ReservationArray(other_hotels, other_customers)
+        other_array.storage_mode = STORAGE_MODE_SQLITE
+        self.assertEqual(
+            other_hotels.display_hotel_information(2).hotel_name,
+            "Caesar's Palace", 'wrong instance of variable')
+        self.assertEqual(len(other_array.reservations_for_customer(1)), 2,
                          'wrong instance of variable')
 
-    def test_display_hotel_fail(self):
-        '''
-        Test if custom exception is triggered
-        '''
+        # changes of another connection are loaded incrementally
+        other_array.cancel_reservation(1, 1, "2024-11-02", "2024-11-05")
+        other_hotels.create_hotel("Overlook")
+        self.assertEqual(len(self.reservations_array.record_ids()), 1,
+                         'wrong instance of variable')
+        self.assertEqual(
+            self.hotel_array.display_hotel_information(3).hotel_name,
+            "Overlook", 'wrong instance of variable')
         passed = False
         try:
-            self.hotel_array.create_hotel("Transilvania")
-            self.hotel_array.display_hotel_information(2)
-        except HotelNotFoundException:
+            self.reservations_array.create_reservation(
+                2, 1, "2024-11-04", "2024-11-06"
+            )
+        except ReservationOverlapException:
             passed = True
-
         self.assertEqual(passed, True,
                          'unkown exception thrown')
 
-    def test_modify_hotel(self):
+    def test_sqlite_storage_trimmed_changes(self):
         '''
-        Test if create hotel works
+        Test if an array behind the kept changes loads every row
         '''
+        self.hotel_array.storage_mode = STORAGE_MODE_SQLITE
+        self.hotel_array.compaction_threshold = 2
         self.hotel_array.create_hotel("Transilvania")
-        result = self.hotel_array.modify_hotel_information(
-            1, "Caesar's Palace"
-        )
-        self.assertEqual(isinstance(result, Hotel), True,
+        other_array = HotelArray()
+        other_array.storage_mode = STORAGE_MODE_SQLITE
+        self.assertEqual(len(other_array.record_ids()), 1,
                          'wrong instance of variable')
-        self.assertEqual(result.hotel_id, 1,
+        for number in range(4):
+            self.hotel_array.create_hotel(f"Hotel {number}")
+        self.hotel_array.delete_hotel(1)
+        self.hotel_array.compact()
+        self.assertEqual(sorted(other_array.record_ids()), [2, 3, 4, 5],
+                         'wrong instance of variable')
+
+    def test_migrate_storage(self):
+        '''
+        Test if the records follow the array to another storage mode
+        '''
+        self.hotel_array.create_hotel("Transilvania")
+        self.hotel_array.create_hotel("Luigi's mansion")
+        self.hotel_array.migrate_storage(STORAGE_MODE_SQLITE)
+        self.hotel_array.delete_hotel(1)
+        other_array = HotelArray()
+        other_array.storage_mode = STORAGE_MODE_SQLITE
+        self.assertEqual(list(other_array.record_ids()), [2],
                          'wrong instance of variable')
+        other_array.create_hotel("Caesar's Palace")
+        other_array.migrate_storage(STORAGE_MODE_JSON)
+        result = HotelArray().display_hotel_information(3)
         self.assertEqual(result.hotel_name, "Caesar's Palace",
                          'wrong instance of variable')
+        self.assertEqual(len(HotelArray().record_ids()), 2,
+                         'wrong instance of variable')
 
-    def test_modify_hotel_fail(self):
+    def test_binary_snapshot(self):
         '''
-        Test if custom exception is triggered
+        Test if binary snapshots answer lookups before the index loads
         '''
+        for record_array in (self.hotel_array, self.customer_array,
+                             self.reservations_array):
+            record_array.storage_mode = STORAGE_MODE_SNAPSHOT
+        self.hotel_array.create_hotel("Transilvania")
+        self.hotel_array.create_hotel("Luigi's mansion")
+        self.customer_array.create_customer("Elvis")
+        self.reservations_array.create_reservation(
+            2, 1, "2024-11-02", "2024-11-05"
+        )
+        for record_array in (self.hotel_array, self.customer_array,
+                             self.reservations_array):
+            record_array.compact()
+            self.assertEqual(
+                os.path.exists(record_array.log_file_name), False,
+                'log was not folded')
+
+        other_array = HotelArray()
+        other_array.storage_mode = STORAGE_MODE_SNAPSHOT
+        result = other_array.display_hotel_information(2)
+        self.assertEqual(result.hotel_name, "Luigi's mansion",
+                         'wrong instance of variable')
+        self.assertEqual(len(other_array), 0, 'index was loaded')
         passed = False
         try:
-            self.hotel_array.create_hotel("Transilvania")
-            self.hotel_array.modify_hotel_information(2, "Caesar's Palace")
+            other_array.display_hotel_information(3)
         except HotelNotFoundException:
             passed = True
-
         self.assertEqual(passed, True,
                          'unkown exception thrown')
 
-    def test_create_customer(self):
-        '''
-        Test if create hotel works
-        '''
-        result = self.customer_array.create_customer("Elvis")
-        self.assertEqual(isinstance(result, Customer), True,
+        other_array.create_hotel("Caesar's Palace")
+        self.assertEqual(
+            self.hotel_array.display_hotel_information(3).hotel_name,
+            "Caesar's Palace", 'wrong instance of variable')
+        other_reservations = ReservationArray(
+            self.hotel_array, self.customer_array
+        )
+        other_reservations.storage_mode = STORAGE_MODE_SNAPSHOT
+        other_reservations.cancel_reservation(
+            2, 1, "2024-11-02", "2024-11-05"
+        )
+        self.assertEqual(len(self.reservations_array.record_ids()), 0,
                          'wrong instance of variable')
 
-    def test_create_customer_json_exists(self):
+    def test_binary_snapshot_conversion(self):
         '''
-        Test if create hotel works
+        Test if json files and binary snapshots convert both ways
         '''
-        self.customer_array.create_customer("Elvis")
-        self.customer_array.create_customer("Frank")
-        self.assertEqual(len(self.customer_array), 2,
-                         'wrong instance of variable')
+        self.hotel_array.create_hotel("Transilvania")
+        self.hotel_array.create_hotel("Ñandú Inn")
+        records = json_to_binary_snapshot(
+            HotelArray, self.hotel_array.hotels_json_file_name,
+            self.hotel_array.snapshot_file_name
+        )
+        self.assertEqual(records, 2, 'wrong instance of variable')
+        with open(self.hotel_array.hotels_json_file_name, 'rb') as file:
+            original = file.read()
+        os.remove(self.hotel_array.hotels_json_file_name)
+        binary_snapshot_to_json(
+            HotelArray, self.hotel_array.snapshot_file_name,
+            self.hotel_array.hotels_json_file_name
+        )
+        with open(self.hotel_array.hotels_json_file_name, 'rb') as file:
+            self.assertEqual(file.read(), original,
+                             'wrong instance of variable')
 
-    def test_delete_customer(self):
-        '''
-        Test if create hotel works
-        '''
-        passed = True
+        with open(self.hotel_array.snapshot_file_name, 'r+b') as file:
+            file.write(b"NOTASNAP")
+        passed = False
         try:
-            self.customer_array.create_customer("Elvis")
-            self.customer_array.delete_customer(1)
-        except CustomerNotFoundException:
-            passed = False
-
+            binary_snapshot_to_json(
+                HotelArray, self.hotel_array.snapshot_file_name,
+                "copy.json"
+            )
+        except CorruptedJsonDBException:
+            passed = True
         self.assertEqual(passed, True,
                          'unkown exception thrown')
 
-    def test_delete_customer_fail(self):
+    def test_stream_json_records(self):
         '''
-        Test if custom exception is triggered
+        Test if json files are streamed one record at a time
         '''
+        self.hotel_array.create_hotel("Caesar's Palace")
+        self.customer_array.create_customer("Elvis")
+        for day in range(1, 8):
+            self.reservations_array.create_reservation(
+                1, 1, f"2024-11-{day:02}", f"2024-11-{day + 1:02}"
+            )
+        json_file_name = self.reservations_array.hotels_json_file_name
+        for chunk_size in (1, 7, 65536):
+            records = list(iter_json_records(
+                json_file_name, Reservation, chunk_size
+            ))
+            self.assertEqual(
+                [ReservationArray.record_key(record) for record in records],
+                [ReservationArray.record_key(record)
+                 for record in self.reservations_array],
+                'wrong instance of variable')
+
+        key = ReservationKey.of(1, 1, "2024-11-03", "2024-11-04")
+        result = find_json_record(json_file_name, ReservationArray, key)
+        self.assertEqual(ReservationArray.record_key(result), key,
+                         'wrong instance of variable')
+        self.assertEqual(
+            find_json_record(json_file_name, ReservationArray,
+                             ReservationKey.of(2, 1, "2024-11-03",
+                                               "2024-11-04")),
+            None, 'wrong instance of variable')
+
+        with open(json_file_name, "a", encoding="utf-8") as file:
+            file.write("[")
         passed = False
         try:
-            self.customer_array.create_customer("Elvis")
-            self.customer_array.delete_customer(2)
-        except CustomerNotFoundException:
+            list(iter_json_records(json_file_name, Reservation))
+        except CorruptedJsonDBException:
             passed = True
-
         self.assertEqual(passed, True,
                          'unkown exception thrown')
 
-    def test_display_customer(self):
+    def test_id_sequence(self):
         '''
-        Test if create hotel works
+        Test if ids are never handed out twice, also in blocks
         '''
-        self.customer_array.create_customer("Elvis")
-        result = self.customer_array.display_customer_information(1)
-        self.assertEqual(isinstance(result, Customer), True,
+        self.hotel_array.create_hotel("Transilvania")
+        self.hotel_array.create_hotel("Luigi's mansion")
+        self.hotel_array.delete_hotel(2)
+        result = self.hotel_array.create_hotel("Caesar's Palace")
+        self.assertEqual(result.hotel_id, 3, 'deleted id was handed out')
+
+        other_array = HotelArray()
+        other_array.id_block_size = 10
+        self.hotel_array.id_block_size = 10
+        created = [
+            array.create_hotel(f"Hotel {number}").hotel_id
+            for number in range(6)
+            for array in (self.hotel_array, other_array)
+        ]
+        self.assertEqual(len(set(created)), len(created),
+                         'ids were handed out twice')
+        self.assertEqual(min(created), 4, 'wrong instance of variable')
+        self.assertEqual(HotelArray().create_hotel("Overlook").hotel_id, 24,
+                         'reserved id was handed out')
+
+        self.customer_array.bulk_create(
+            [{"customer_name": "Elvis"}, {"name": "Priscilla"},
+             {"customer_name": "Lisa"}]
+        )
+        os.remove(self.customer_array.sequence_file_name)
+        result = CustomerArray().create_customer("Vernon")
+        self.assertEqual(result.customer_id, 3,
                          'wrong instance of variable')
-        self.assertEqual(result.customer_name, 'Elvis',
+
+    def test_sharded_service(self):
+        '''
+        Test if the sharded service routes records to their shard and
+        gathers the reservations of a customer from every shard
+        '''
+        with tempfile.TemporaryDirectory() as directory:
+            service = ShardedReservationService(directory, shards=3)
+            hotel_ids = [
+                service.apply({
+                    "op": "create_hotel",
+                    "params": {"hotel_name": f"Hotel {number}"}
+                })["result"].hotel_id
+                for number in range(6)
+            ]
+            self.assertEqual(sorted(hotel_ids), [1, 2, 3, 4, 5, 6],
+                             'wrong instance of variable')
+            for hotel_id in hotel_ids:
+                self.assertIn(hotel_id,
+                              service.shard(hotel_id).hotels.record_ids(),
+                              'hotel stored in the wrong shard')
+            for shard, shard_service in enumerate(service.shards):
+                self.assertIs(shard_service.reservations.customer_array,
+                              shard_service.customers,
+                              'customers of another shard')
+                self.assertEqual(
+                    shard_service.reservations.array_files()[1][0],
+                    os.path.join(directory, f"shard-{shard}",
+                                 "customers.json"),
+                    'wrong instance of variable')
+            customer_id = service.apply({
+                "op": "create_customer", "params": {"hotel_name": "Elvis"}
+            })["result"].customer_id
+            other_ids = [
+                service.apply({
+                    "op": "create_customer",
+                    "params": {"hotel_name": f"Customer {number}"}
+                })["result"].customer_id
+                for number in range(3)
+            ]
+            for other_id in other_ids:
+                for params in ({"customer_id": other_id},
+                               {"hotel_id": other_id}):
+                    result = service.apply({
+                        "op": "display_customer_information",
+                        "params": params
+                    })["result"]
+                    self.assertEqual(result.customer_id, other_id,
+                                     'customer looked up in the wrong shard')
+            response = service.apply({
+                "op": "modify_hotel_information",
+                "params": {"hotel_name": "Nowhere"}
+            })
+            self.assertEqual(response["error"], "MissingShardKeyException",
+                             'wrong instance of variable')
+            for number, hotel_id in enumerate(hotel_ids):
+                response = service.apply({
+                    "op": "create_reservation",
+                    "params": {
+                        "hotel_id": hotel_id, "customer_id": customer_id,
+                        "from_date": f"2024-01-0{number + 1}",
+                        "to_date": f"2024-01-0{number + 2}",
+                    }
+                })
+                self.assertEqual(response["ok"], True,
+                                 'wrong instance of variable')
+            response = service.apply({
+                "op": "create_reservation",
+                "params": {"hotel_id": 1, "customer_id": 99,
+                           "from_date": "2024-02-01",
+                           "to_date": "2024-02-02"}
+            })
+            self.assertEqual(response["error"],
+                             "InvalidCustomerForReservException",
+                             'wrong instance of variable')
+            response = service.apply({
+                "op": "delete_customer", "params": {"hotel_id": customer_id}
+            })
+            self.assertEqual(response["error"],
+                             "CustomerHasReservationsException",
+                             'wrong instance of variable')
+
+            with concurrent.futures.ProcessPoolExecutor(2) as executor:
+                service.executor = executor
+                result = service.apply({
+                    "op": "reservations_for_customer",
+                    "params": {"customer_id": customer_id}
+                })["result"]
+            self.assertEqual(
+                [reservation.hotel_id for reservation in result], hotel_ids,
+                'reservations were not ordered by dates')
+
+    def test_available_hotels_benchmark(self):
+        '''
+        Test if the array and the pool find the same hotels
+        '''
+        results = benchmark_available_hotels(hotels=30, reservations=60,
+                                             rounds=3, workers=2)
+        self.assertEqual(results["array"]["hotels_found"],
+                         results["pool[2]"]["hotels_found"],
+                         'pool found other hotels')
+        self.assertEqual(results["reservations"] > 0, True,
                          'wrong instance of variable')
 
-    def test_display_customer_fail(self):
+    def test_shards_benchmark(self):
         '''
-        Test if custom exception is triggered
+        Test if the shards benchmark stores every hotel
+        '''
+        results = benchmark_shards(shard_counts=(1, 2), operations=20,
+                                   workers=2)
+        for result in results.values():
+            self.assertEqual(result["stored_hotels"], 20, 'hotels were lost')
+            self.assertEqual(result["failures"], 0, 'hotels were lost')
+
+    def test_search_hotels(self):
+        '''
+        Test if the hotels are found by the start of their name, the
+        start of their words and inside their words, as they change
+        '''
+        for name in ("Luigi's mansion", "Transilvania", "Grand Transit",
+                     "Hotel Transilvania", "Caesar's Palace"):
+            self.hotel_array.create_hotel(name)
+        result = self.hotel_array.search_hotels("trans")
+        self.assertEqual(
+            [hotel.hotel_name for hotel in result],
+            ["Transilvania", "Grand Transit", "Hotel Transilvania"],
+            'wrong instance of variable')
+        result = self.hotel_array.search_hotels("SILV", limit=1)
+        self.assertEqual([hotel.hotel_id for hotel in result], [2],
+                         'wrong instance of variable')
+        self.assertEqual(self.hotel_array.search_hotels("tr zz"), [],
+                         'wrong instance of variable')
+
+        self.hotel_array.modify_hotel_information(2, "Pálace Hôtel")
+        self.hotel_array.delete_hotel(5)
+        result = self.hotel_array.search_hotels("palace hotel")
+        self.assertEqual([hotel.hotel_id for hotel in result], [2],
+                         'wrong instance of variable')
+        result = self.hotel_array.search_hotels("tr")
+        self.assertEqual([hotel.hotel_id for hotel in result], [3, 4],
+                         'wrong instance of variable')
+
+        other_array = HotelArray()
+        other_array.create_hotel("Trans Am")
+        result = self.hotel_array.search_hotels("tr")
+        self.assertEqual([hotel.hotel_id for hotel in result], [6, 3, 4],
+                         'changes of other writers were not indexed')
+
+    def test_search_customers(self):
+        '''
+        Test if the service searches the customers of every shard
+        '''
+        self.customer_array.bulk_create(
+            {"customer_name": name}
+            for name in ("Elvis Presley", "Priscilla Presley", "Elvira")
+        )
+        result = ReservationService(
+            self.hotel_array, self.customer_array, self.reservations_array
+        ).apply({"op": "search_customers", "params": {"query": "el"}})
+        self.assertEqual(
+            [customer.customer_id for customer in result["result"]],
+            [3, 1], 'wrong instance of variable')
+
+        with tempfile.TemporaryDirectory() as directory:
+            service = ShardedReservationService(directory, shards=2)
+            for name in ("Elvis Presley", "Priscilla Presley", "Elvira"):
+                service.apply({"op": "create_customer",
+                               "params": {"hotel_name": name}})
+            result = service.apply({
+                "op": "search_customers",
+                "params": {"query": "pres", "limit": 1}
+            })["result"]
+            self.assertEqual(
+                [customer.customer_name for customer in result],
+                ["Elvis Presley"], 'wrong instance of variable')
+
+    def test_hotel_rooms(self):
+        '''
+        Test if reservations are accepted while the hotel has a room
+        free on every night and rooms cannot go below the reserved ones
         '''
+        self.hotel_array.create_hotel("Transilvania", rooms=2)
+        self.customer_array.create_customer("Elvis")
+        for from_date, to_date in (("2024-11-01", "2024-11-05"),
+                                   ("2024-11-03", "2024-11-08"),
+                                   ("2024-11-05", "2024-11-06")):
+            self.reservations_array.create_reservation(
+                1, 1, from_date, to_date
+            )
+        self.assertEqual(
+            self.reservations_array.reserved_rooms(
+                1, "2024-11-01", "2024-11-10"
+            ), 2, 'wrong instance of variable')
+        self.assertEqual(
+            self.reservations_array.is_hotel_available(
+                1, "2024-11-06", "2024-11-10"
+            ), True, 'free room reported as reserved')
+        self.assertEqual(
+            self.reservations_array.is_hotel_available(
+                1, "2024-11-06", "2024-11-10", rooms=2
+            ), False, 'reserved room reported as free')
         passed = False
         try:
-            self.customer_array.create_customer("Elvis")
-            self.customer_array.display_customer_information(2)
-        except CustomerNotFoundException:
+            self.reservations_array.create_reservation(
+                1, 1, "2024-11-04", "2024-11-06"
+            )
+        except ReservationOverlapException:
             passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
 
+        passed = False
+        try:
+            self.hotel_array.modify_hotel_information(1, "Transilvania",
+                                                      rooms=1)
+        except HotelRoomsReservedException:
+            passed = True
         self.assertEqual(passed, True,
                          'unkown exception thrown')
+        self.reservations_array.cancel_reservation(
+            1, 1, "2024-11-03", "2024-11-08"
+        )
+        result = self.hotel_array.modify_hotel_information(
+            1, "Transilvania", rooms=1
+        )
+        self.assertEqual(result.rooms, 1, 'wrong instance of variable')
+        result = self.hotel_array.modify_hotel_information(1, "Dracula")
+        self.assertEqual(result.rooms, 1, 'rooms were not kept')
 
-    def test_modify_customer(self):
+    def test_create_reservation_twice_fail(self):
         '''
-        Test if create hotel works
+        Test if custom exception is triggered when the same stay is
+        booked again, alone or within a bulk create
         '''
+        self.hotel_array.create_hotel("Transilvania", rooms=3)
         self.customer_array.create_customer("Elvis")
-        result = self.customer_array.modify_customer_information(
-            1, "Elvis Presley"
+        self.customer_array.create_customer("Frank")
+        self.reservations_array.create_reservation(
+            1, 1, "2024-11-02", "2024-11-05"
         )
-        self.assertEqual(isinstance(result, Customer), True,
-                         'wrong instance of variable')
-        self.assertEqual(result.customer_id, 1,
+        passed = False
+        try:
+            self.reservations_array.create_reservation(
+                1, 1, "2024-11-02", "2024-11-05"
+            )
+        except ReservationExistsException:
+            passed = True
+        self.assertEqual(passed, True,
+                         'unkown exception thrown')
+
+        row = {"hotel_id": 1, "customer_id": 2,
+               "from_date": "2024-11-02", "to_date": "2024-11-05"}
+        bulk_result = self.reservations_array.bulk_create([row, row])
+        self.assertEqual(len(bulk_result.created), 1,
                          'wrong instance of variable')
-        self.assertEqual(result.customer_name, "Elvis Presley",
+        self.assertEqual(
+            [error.row_number for error in bulk_result.errors], [2],
+            'wrong rows rejected')
+        self.assertEqual(len(self.reservations_array), 2,
                          'wrong instance of variable')
+        self.assertEqual(
+            self.reservations_array.reserved_rooms(
+                1, "2024-11-02", "2024-11-05"
+            ), 2, 'wrong instance of variable')
 
-    def test_modify_customer_fail(self):
+    def test_hotel_rooms_fail(self):
         '''
         Test if custom exception is triggered
         '''
         passed = False
         try:
-            self.customer_array.create_customer("Elvis")
-            self.customer_array.modify_customer_information(2, "Elvis Presley")
-        except CustomerNotFoundException:
+            self.hotel_array.create_hotel("Transilvania", rooms=0)
+        except InvalidRoomsException:
             passed = True
-
         self.assertEqual(passed, True,
                          'unkown exception thrown')
-
-    def test_create_reservation(self):
+        result = self.hotel_array.bulk_create(
+            [{"hotel_name": "Ritz", "rooms": 300},
+             {"hotel_name": "Overlook", "rooms": "many"}]
+        )
+        self.assertEqual(
+            [(hotel.hotel_name, hotel.rooms) for hotel in result.created],
+            [("Ritz", 300)], 'wrong instance of variable')
+        self.assertEqual(
+            [type(error.exception) for error in result.errors],
+            [InvalidRoomsException], 'wrong instance of variable')
+
+    def test_hotel_rooms_stored_before(self):
         '''
-        Test if create hotel works
+        Test if hotels stored before rooms existed have a single room
         '''
-        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
-        created_customer = self.customer_array.create_customer("Elvis")
-        result = self.reservations_array.create_reservation(
-            created_hotel.hotel_id, created_customer.customer_id,
-            "2024-11-02", "2024-11-03"
-        )
-        self.assertEqual(isinstance(result, Reservation), True,
+        with open(self.hotel_array.hotels_json_file_name, "w",
+                  encoding="utf-8") as file:
+            json.dump([{"hotel_id": 1, "hotel_name": "Transilvania"}], file)
+        self.assertEqual(
+            self.hotel_array.display_hotel_information(1).rooms, 1,
+            'wrong instance of variable')
+
+        hotel = Hotel()
+        hotel.hotel_id = 2
+        hotel.hotel_name = "Ritz"
+        with open("hotels.json.snap", "wb") as file:
+            file.write(BinarySnapshot.data(
+                [hotel], HotelArray.snapshot_fields[:2],
+                HotelArray.record_key, HotelEncoder()
+            ))
+        snapshot = BinarySnapshot("hotels.json.snap", Hotel,
+                                  HotelArray.snapshot_fields)
+        self.assertEqual([(hotel.hotel_name, hotel.rooms)
+                          for hotel in snapshot], [("Ritz", 1)],
                          'wrong instance of variable')
+        snapshot.close()
 
-    def test_create_reservation_json_exists(self):
+        with contextlib.closing(sqlite3.connect(
+                self.hotel_array.database_file_name)) as connection:
+            connection.execute(
+                "CREATE TABLE hotels (hotel_id INTEGER NOT NULL, "
+                "hotel_name TEXT NOT NULL, PRIMARY KEY (hotel_id))"
+            )
+            connection.execute("INSERT INTO hotels VALUES (3, 'Overlook')")
+            connection.commit()
+        self.hotel_array.storage_mode = STORAGE_MODE_SQLITE
+        self.hotel_array.create_hotel("Caesar's Palace", rooms=4)
+        other_array = HotelArray()
+        other_array.storage_mode = STORAGE_MODE_SQLITE
+        self.assertEqual(
+            [other_array.display_hotel_information(hotel_id).rooms
+             for hotel_id in (3, 4)],
+            [1, 4], 'wrong instance of variable')
+
+    def test_available_hotels(self):
         '''
-        Test if create hotel works
+        Test if the hotels with enough free rooms on every night of the
+        dates are found, by the array, by a process pool and by shards
         '''
-        created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
-        created_customer = self.customer_array.create_customer("Elvis")
+        for hotel_name, rooms in (("Transilvania", 2), ("Dracula", 1),
+                                  ("Mavis", 3), ("Ritz", 1)):
+            self.hotel_array.create_hotel(hotel_name, rooms=rooms)
+        self.customer_array.create_customer("Elvis")
+        for hotel_id, from_date, to_date in ((1, "2024-11-01", "2024-11-05"),
+                                             (2, "2024-11-04", "2024-11-06"),
+                                             (3, "2024-11-01", "2024-11-03"),
+                                             (3, "2024-11-02", "2024-11-09")):
+            self.reservations_array.create_reservation(
+                hotel_id, 1, from_date, to_date
+            )
+        found = {}
+        for min_rooms in (1, 2, 3):
+            found[min_rooms] = [
+                hotel.hotel_id
+                for hotel in self.reservations_array.available_hotels(
+                    "2024-11-02", "2024-11-05", min_rooms
+                )
+            ]
+        self.assertEqual(found, {1: [1, 3, 4], 2: [], 3: []},
+                         'wrong instance of variable')
+        self.assertEqual(
+            [hotel.hotel_id
+             for hotel in self.reservations_array.available_hotels(
+                 "2024-11-09", "2024-11-12", 3)],
+            [3], 'wrong instance of variable')
+        self.assertEqual(self.hotel_array.hotel_ids_in(2, 4), [2, 3],
+                         'wrong instance of variable')
+        self.assertEqual(self.hotel_array.hotel_ids_with_fewer_rooms(2),
+                         {2, 4}, 'wrong instance of variable')
+        visited = []
+
+        class RecordedRooms(dict):
+            '''
+            Rooms of the hotels recording the hotels looked up
+            '''
+            def get(self, key, default=None):
+                visited.append(key)
+                return super().get(key, default)
+        hotel_rooms = RecordedRooms(self.hotel_array.hotel_rooms())
+        self.hotel_array.hotel_rooms = lambda: hotel_rooms
+        self.assertEqual(
+            self.reservations_array.available_hotel_ids(
+                "2024-11-02", "2024-11-05", first_id=2, end_id=4
+            ), [3], 'wrong instance of variable')
+        self.assertEqual(sorted(set(visited)), [2, 3],
+                         'hotels of other ranges were visited')
+        del self.hotel_array.hotel_rooms
+
         self.reservations_array.create_reservation(
-            created_hotel.hotel_id, created_customer.customer_id,
-            "2024-11-02", "2024-11-03"
+            4, 1, "2020-01-01", "2030-01-01"
         )
-        self.reservations_array.create_reservation(
-            created_hotel.hotel_id, created_customer.customer_id,
-            "2024-11-03", "2024-11-04"
+        self.assertEqual(
+            self.reservations_array.available_hotel_ids(
+                "2024-11-02", "2024-11-05"
+            ), [1, 3], 'wrong instance of variable')
+        self.reservations_array.cancel_reservation(
+            4, 1, "2020-01-01", "2030-01-01"
         )
-        self.assertEqual(len(self.reservations_array), 2,
-                         'wrong instance of variable')
-
-    def test_cancel_reservation(self):
-        '''
-        Test if create hotel works
-        '''
-        passed = True
-        try:
-            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
-            created_customer = self.customer_array.create_customer("Elvis")
-            result = self.reservations_array.create_reservation(
-                created_hotel.hotel_id, created_customer.customer_id,
-                "2024-11-02", "2024-11-03"
-            )
-            self.reservations_array.cancel_reservation(
-                result.hotel_id, result.customer_id,
-                result.from_date, result.to_date
+        self.assertEqual(
+            self.reservations_array.available_hotel_ids(
+                "2024-11-02", "2024-11-05"
+            ), found[1], 'cancelled stay still reserved')
+
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            result = self.reservations_array.available_hotels(
+                "2024-11-02", "2024-11-05", executor=executor, parts=3
             )
-        except ReservationNotFoundException:
-            passed = False
-
+        self.assertEqual([hotel.hotel_id for hotel in result], found[1],
+                         'pool found other hotels')
+        passed = False
+        try:
+            self.reservations_array.available_hotels("2024-11-05",
+                                                     "2024-11-02")
+        except InvalidReservationDatesException:
+            passed = True
         self.assertEqual(passed, True,
                          'unkown exception thrown')
 
-    def test_cancel_reservation_fail(self):
+        with tempfile.TemporaryDirectory() as directory:
+            service = ShardedReservationService(directory, shards=2)
+            for number in range(4):
+                service.apply({
+                    "op": "create_hotel",
+                    "params": {"hotel_name": f"Hotel {number}"}
+                })
+            customer_id = service.apply({
+                "op": "create_customer", "params": {"hotel_name": "Elvis"}
+            })["result"].customer_id
+            service.apply({
+                "op": "create_reservation",
+                "params": {"hotel_id": 2, "customer_id": customer_id,
+                           "from_date": "2024-01-01",
+                           "to_date": "2024-01-03"}
+            })
+            result = service.apply({
+                "op": "available_hotels",
+                "params": {"from_date": "2024-01-02",
+                           "to_date": "2024-01-04"}
+            })["result"]
+            self.assertEqual([hotel.hotel_id for hotel in result],
+                             [1, 3, 4], 'wrong instance of variable')
+
+
+BENCHMARK_ENVIRONMENT = "HOTEL_RESERVATIONS_BENCHMARK"
+
+
+class TestPerformance(unittest.TestCase):
+    '''
+    Benchmarks of the hot paths, run when HOTEL_RESERVATIONS_BENCHMARK
+    is set. HOTEL_RESERVATIONS_BENCHMARK_SIZES takes the database sizes
+    (100,1000,10000 by default, up to 1000000), the results are
+    compared with HOTEL_RESERVATIONS_BENCHMARK_BASELINE and written to
+    it when it is missing or HOTEL_RESERVATIONS_BENCHMARK_SAVE is set
+    '''
+
+    @unittest.skipUnless(os.environ.get(BENCHMARK_ENVIRONMENT),
+                         f"set {BENCHMARK_ENVIRONMENT} to run the benchmarks")
+    def test_hot_paths(self):
         '''
-        Test if custom exception is triggered
+        Test if no hot path got slower than the baseline
         '''
-        passed = False
+        environment = os.environ
+        sizes = [
+            int(float(size)) for size in environment.get(
+                f"{BENCHMARK_ENVIRONMENT}_SIZES", "100,1000,10000"
+            ).split(",")
+        ]
+        rounds = int(environment.get(f"{BENCHMARK_ENVIRONMENT}_ROUNDS", 20))
+        threshold = float(
+            environment.get(f"{BENCHMARK_ENVIRONMENT}_THRESHOLD", 1.5)
+        )
+        storage_mode = environment.get(
+            f"{BENCHMARK_ENVIRONMENT}_STORAGE_MODE", STORAGE_MODE_JSON
+        )
+        baseline_file_name = environment.get(
+            f"{BENCHMARK_ENVIRONMENT}_BASELINE", "benchmark_baseline.json"
+        )
+
+        results = benchmark_hot_paths(sizes, rounds, storage_mode)
         try:
-            created_hotel = self.hotel_array.create_hotel("Caesar's Palace")
-            created_customer = self.customer_array.create_customer("Elvis")
-            result = self.reservations_array.create_reservation(
-                created_hotel.hotel_id, created_customer.customer_id,
-                "2024-11-02", "2024-11-03"
-            )
-            self.reservations_array.cancel_reservation(
-                2, result.customer_id, result.from_date, result.to_date
+            with open(baseline_file_name, 'r', encoding="utf-8") as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            baseline = None
+        if baseline is None or environment.get(
+                f"{BENCHMARK_ENVIRONMENT}_SAVE"):
+            write_file_atomically(
+                baseline_file_name,
+                json.dumps(dict(baseline or {}, **results),
+                           indent=2).encode("utf-8"),
+                DURABILITY_NONE
             )
-        except ReservationNotFoundException:
-            passed = True
+        regressions = find_regressions(results, baseline or {}, threshold)
+        self.assertEqual(regressions, {}, 'hot paths got slower')
 
-        self.assertEqual(passed, True,
-                         'unkown exception thrown')
+    def test_find_regressions(self):
+        '''
+        Test if only the medians beyond the threshold are reported
+        '''
+        baseline = {
+            "create_hotel[100]": {"median_us": 100.0, "min_us": 90.0},
+            "create_hotel[1000]": {"median_us": 100.0, "min_us": 90.0},
+        }
+        results = {
+            "create_hotel[100]": {"median_us": 140.0, "min_us": 90.0},
+            "create_hotel[1000]": {"median_us": 160.0, "min_us": 90.0},
+            "create_hotel[10000]": {"median_us": 900.0, "min_us": 90.0},
+        }
+        self.assertEqual(
+            find_regressions(results, baseline, 1.5),
+            {"create_hotel[1000]": {"median_us": 160.0,
+                                    "baseline_median_us": 100.0}},
+            'wrong instance of variable')
+        self.assertEqual(
+            len(benchmark_hot_paths(sizes=(10,), rounds=2)), 7,
+            'wrong instance of variable')
 
 
 if __name__ == '__main__':
-    unittest.main()
+    main()